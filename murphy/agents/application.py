@@ -7,17 +7,21 @@ The Agent loops over the current state until either all possible paths
 have been explored or a timeout is reached.
 
 To limit the exploration, a maximum depth parameter is set.
-If the travelled path reaches the maximum depth, the Agent will start
-from the beginning exploring another one.
+If the travelled path reaches the maximum depth, the Agent will walk
+the known paths towards the nearest unexplored action or, if none
+can be reached, start from the beginning exploring another one.
 
 """
 
 import time
-import random
 import logging
 
 from murphy.journal import Node
-from murphy.model import State, Action, Button
+from murphy.agents.snapshots import SnapshotTree
+from murphy.agents.reset import ResetStrategy
+from murphy.agents.explorer import JournalExplorer, MaxDepthReachedError
+from murphy.journal.scheduler import RenderScheduler
+from murphy.model import State, Button
 
 
 MAX_DEPTH = 8
@@ -26,12 +30,7 @@ STATE_TIMEOUT = 30
 """How many seconds to wait if the application window is out of focus."""
 
 
-class MaxDepthReachedError(RuntimeError):
-    """Raised when the max exploration depth has been reached."""
-    pass
-
-
-class ApplicationExplorer:
+class ApplicationExplorer(JournalExplorer):
     """Application Explorer Agent.
 
     The max_depth controls how many buttons the explorer will click
@@ -41,20 +40,17 @@ class ApplicationExplorer:
     content is scanned. If the frequency is too high, the window content
     might not be rendered completely affecting the results.
 
-    """
-    action = None
-    resetted = False
-    wait_time = 0
-    start_time = 0
-    max_depth = MAX_DEPTH
-    frequency = FREQUENCY
+    See JournalExplorer for the Journal walking logic.
 
+    """
     def __init__(self, interpreter, journal,
-                 max_depth: int = MAX_DEPTH, frequency: int = FREQUENCY):
-        self.journal = journal
-        self.interpreter = interpreter
-        self.max_depth = max_depth
-        self.frequency = frequency
+                 max_depth: int = MAX_DEPTH, frequency: int = FREQUENCY,
+                 renderer: RenderScheduler = None,
+                 snapshots: SnapshotTree = None,
+                 reset_strategy: ResetStrategy = None):
+        super().__init__(interpreter, journal, available_actions,
+                         max_depth, frequency, renderer=renderer,
+                         snapshots=snapshots, reset_strategy=reset_strategy)
 
     def explore(self, timeout: int):
         """Explore the application under focus.
@@ -83,14 +79,22 @@ class ApplicationExplorer:
                     action = None
                     continue
 
-                if available_actions(self.journal.current_node.state):
+                if self.route:
+                    action = self.follow_route(node)
+                elif available_actions(self.journal.current_node.state):
                     action = self.choose_new_action()
-                    action.perform()
-                    logging.info(
-                        "Performed %s, score %d", action.text, action.score)
+                    if action is not None and self.perform(action):
+                        logging.info("Performed %s, score %d",
+                                     action.text, action.score)
+                    elif action is not None:
+                        self.withdraw(action)
+                        action = None
+                elif self.plan_route():
+                    action = None
                 elif self.journal.current_node == self.journal.initial_node:
-                    logging.info("All possible paths have been explored.")
-                    return
+                    if self.explored():
+                        logging.info("All possible paths have been explored.")
+                        return
                 else:
                     logging.info("No available actions for this node.")
                     self.reset()
@@ -100,11 +104,18 @@ class ApplicationExplorer:
                 self.switch_focus()
                 self.reset_if_timeout(STATE_TIMEOUT)
 
+    def explored(self) -> bool:
+        """Called once no route is known from the initial Node,
+        True if all the possible paths have been explored.
+
+        """
+        return True
+
     def current_state(self):
         """Interpret the current state."""
         if self.resetted:
             self.resetted = False
-            return self.journal.initial_node.state
+            return self.reset_node.state
 
         try:
             return self.interpreter.interpret_state()
@@ -144,82 +155,6 @@ class ApplicationExplorer:
                 "Timeout (%ds) when waiting for window focus.", waited_time)
             self.reset()
 
-    def reset(self):
-        """Reset the explorer to the initial state."""
-        self.wait_time = 0
-        self.resetted = True
-        self.journal.initial_node.state.restore()
-
-        logging.info("Reset to initial state.")
-
-    def update_journal(self, node: Node, action: Action, max_depth: int):
-        """Update the current position within the Journal and render it.
-
-        Check if the max depth has been reached and raise
-        MaxDepthReachedError if so.
-
-        """
-        if len(self.journal.nodes) == 1:
-            # First node in journal, save state so it can be reverted to
-            try:
-                self.journal.initial_node.state.save()
-            except RuntimeError:  # state already saved
-                pass
-        elif action is not None:
-            if action not in self.journal.current_node:
-                # Draw a new edge between the old and the new node
-                self.journal.current_node.new_edge(action, node)
-            else:
-                # An already performed action led to a new node,
-                # this may happen if windows have dynamic content
-                # or highlighing effects are placed on different objects
-                edge = self.journal.current_node.find_edge(action)
-                if edge.tail != node:
-                    logging.debug(
-                        "Expecting Edge %s to lead to Node %s, got %s instead.",
-                        edge, edge.tail, node)
-
-                    self.journal.current_node.new_edge(action, node)
-
-        self.journal.current_node = node
-        self.journal.render(format='html_embedded')
-
-        if self.journal.initial_node.distance(node) >= max_depth:
-            logging.info("Max depth %d reached", max_depth)
-
-            self.reset()
-
-            raise MaxDepthReachedError("Max depth %d reached" % max_depth)
-
-    def choose_new_action(self) -> Action:
-        """Return the new action to be performed.
-
-        Actions are chosen based on their score (highest score first).
-
-        The chosen action will have its score reduced by one unit.
-
-        """
-        actions = available_actions(self.journal.current_node.state)
-        candidate = max(actions, key=lambda a: a.score)
-        candidates = [a for a in actions if a.score == candidate.score]
-        action = random.choice(candidates)
-
-        action.score -= 1
-
-        return action
-
-    def continue_exploring(self, timeout: int, frequency: int) -> bool:
-        if self.start_time == 0:
-            self.start_time = time.time()
-
-        if time.time() - self.start_time < timeout:
-            time.sleep(frequency)
-            return True
-
-        logging.info("Exploration timeout (%ds) reached.", timeout)
-
-        return False
-
     def switch_focus(self):
         """Issue an ALT+ESC command to switch focus to the next window."""
         with self.interpreter.control.keyboard.hold('alt'):
@@ -0,0 +1,229 @@
+"""Journal walking logic shared by the Agents.
+
+The Agents differ in how they score the Actions and how they
+react to the device state, the way they record their travels
+within the Journal, walk it and reset the device is common.
+
+"""
+
+import time
+import random
+import logging
+from collections import deque
+from typing import Callable
+
+from murphy.journal import Node
+from murphy.agents.frontier import Frontier
+from murphy.agents.snapshots import SnapshotTree, SnapshotPolicy
+from murphy.agents.reset import ResetStrategy, SnapshotReset
+from murphy.journal.scheduler import RenderScheduler
+from murphy.model import Action
+
+
+class MaxDepthReachedError(RuntimeError):
+    """Raised when the max exploration depth has been reached."""
+    pass
+
+
+class JournalExplorer:
+    """Base class of the Agents exploring the application via the Journal.
+
+    The available_actions callable returns the untried Actions
+    of a State according to the Agent policy.
+
+    If a renderer is given, the Journal is rendered in background
+    instead of after every step.
+
+    Once the actions of a Node are exhausted, the Agent walks the known
+    Journal Edges towards the nearest Node with untried actions.
+    The initial state is restored only if no route is known
+    or if the route diverges.
+
+    If a snapshot tree is given, the device state is saved at few
+    deep Nodes and resets restore the saved Node closest to the Nodes
+    with untried actions instead of the initial one.
+
+    If a reset strategy is given, it is used in place of restoring
+    the saved device state.
+
+    """
+    resetted = False
+    wait_time = 0
+    start_time = 0
+    renderer = None
+    frontier = None
+    snapshots = None
+    reset_node = None
+    reset_strategy = None
+
+    def __init__(self, interpreter, journal, available_actions: Callable,
+                 max_depth: int, frequency: int,
+                 renderer: RenderScheduler = None,
+                 snapshots: SnapshotTree = None,
+                 reset_strategy: ResetStrategy = None):
+        self.journal = journal
+        self.interpreter = interpreter
+        self.available_actions = available_actions
+        self.max_depth = max_depth
+        self.frequency = frequency
+        self.renderer = renderer
+        self.route = deque()
+        self.frontier = Frontier(journal, available_actions)
+        self.snapshots = snapshots if snapshots is not None else SnapshotTree(
+            journal, SnapshotPolicy(max_snapshots=0))
+        self.reset_strategy = (reset_strategy if reset_strategy is not None
+                               else SnapshotReset(self.snapshots))
+
+    def reset(self):
+        """Reset the explorer to a known state close to the Nodes
+        with untried actions and plan the route towards them.
+
+        """
+        self.wait_time = 0
+        self.resetted = True
+        self.route.clear()
+        start = time.monotonic()
+
+        self.reset_node, route = self.reset_strategy.reset(
+            self.frontier.nodes(self.max_depth))
+        self.route.extend(route)
+
+        logging.info("Reset to %s in %.1fs.",
+                     self.reset_node, time.monotonic() - start)
+
+    def update_journal(self, node: Node, action: Action, max_depth: int):
+        """Update the current position within the Journal and render it.
+
+        Check if the max depth has been reached and raise
+        MaxDepthReachedError if so. Otherwise, save the device state
+        if the Node is worth a snapshot.
+
+        """
+        if len(self.journal.nodes) == 1:
+            # First node in journal, save state so it can be reverted to
+            try:
+                self.journal.initial_node.state.save()
+            except RuntimeError:  # state already saved
+                pass
+            else:
+                self.journal.update_node(self.journal.initial_node)
+        elif action is not None:
+            _, new = self.journal.find_or_new_edge(
+                self.journal.current_node, action, node)
+            edges = self.journal.current_node.find_edges(action)
+
+            if new and len(edges) > 1:
+                # An already performed action led to a new node,
+                # this may happen if the content is dynamic
+                # or highlighing effects are placed on different objects
+                logging.debug(
+                    "Expecting Edge %s to lead to Node %s, got %s instead.",
+                    edges[0], edges[0].tail, node)
+
+        self.journal.current_node = node
+        self.render_journal()
+
+        # depth is not checked while following a planned route
+        if not self.route and self.journal.depth(node) >= max_depth:
+            logging.info("Max depth %d reached", max_depth)
+
+            if not self.plan_route():
+                self.reset()
+
+            raise MaxDepthReachedError("Max depth %d reached" % max_depth)
+
+        self.snapshots.save(node, len(self.available_actions(node.state)))
+
+    def plan_route(self) -> bool:
+        """Plan the route towards the nearest Node with untried actions.
+
+        False is returned if no route is known.
+
+        """
+        route = self.frontier.route(self.journal.current_node, self.max_depth)
+        if not route:
+            return False
+
+        self.route.extend(route)
+        logging.info("Route to %s, %d steps.", route[-1].tail, len(route))
+
+        return True
+
+    def follow_route(self, node: Node) -> (Action, None):
+        """Perform the next action of the planned route.
+
+        If the route diverged from the Journal, reset the explorer.
+
+        """
+        edge = self.route.popleft()
+        if edge.head != node:
+            logging.info(
+                "Route diverged, expected %s got %s.", edge.head, node)
+            self.reset()
+            return None
+
+        if not self.perform(edge.action):
+            self.reset()
+            return None
+
+        logging.info("Replayed %s", edge.action.text)
+
+        return edge.action
+
+    def perform(self, action: Action) -> bool:
+        """Perform the Action on the device.
+
+        False is returned if the Action could not be performed.
+
+        """
+        action.perform()
+
+        return True
+
+    def withdraw(self, action: Action):
+        """Give back the score of the chosen Action
+        which could not be performed and reset the explorer.
+
+        """
+        action.score += 1
+        self.reset()
+
+    def render_journal(self):
+        """Render the Journal in background if a renderer is available."""
+        if self.renderer is not None:
+            self.renderer.request()
+        else:
+            self.journal.render(format='html_embedded')
+
+    def choose_new_action(self) -> (Action, None):
+        """Return the new action to be performed,
+        None if no action is available.
+
+        Actions are chosen based on their score (highest score first).
+
+        The chosen action will have its score reduced by one unit.
+
+        """
+        actions = self.available_actions(self.journal.current_node.state)
+        if not actions:
+            return None
+
+        candidate = max(actions, key=lambda a: a.score)
+        candidates = [a for a in actions if a.score == candidate.score]
+        action = random.choice(candidates)
+
+        action.score -= 1
+
+        return action
+
+    def continue_exploring(self, timeout: int, frequency: int) -> bool:
+        if self.start_time == 0:
+            self.start_time = time.time()
+
+        if time.time() - self.start_time < timeout:
+            time.sleep(frequency)
+            return True
+
+        logging.info("Exploration timeout (%ds) reached.", timeout)
+
+        return False
@@ -0,0 +1,102 @@
+"""Exploration frontier shared by the Agents.
+
+The frontier tracks the Journal Nodes which still have untried Actions.
+Instead of reverting the device to its initial state once a path
+is exhausted, the Agents can walk the known Journal Edges
+towards the nearest Node of the frontier.
+
+"""
+
+from collections import deque
+from typing import Callable
+
+from murphy.journal import Journal, Node
+
+
+class Frontier:
+    """Frontier of the exploration.
+
+    The available_actions callable returns the untried Actions
+    of a State according to the Agent policy.
+
+    """
+    def __init__(self, journal: Journal, available_actions: Callable):
+        self.journal = journal
+        """The explored Journal."""
+        self.available_actions = available_actions
+        """Returns the untried Actions of a State."""
+
+        self._nodes = set()
+        self._known = 0
+
+    def __contains__(self, node: Node) -> bool:
+        """True if the Node has untried Actions."""
+        self._update()
+
+        if node in self._nodes and not self.available_actions(node.state):
+            self._nodes.discard(node)
+
+        return node in self._nodes
+
+    def __len__(self):
+        self._update()
+
+        return len(self._nodes)
+
+    def nodes(self, max_depth: int) -> list:
+        """Nodes with untried Actions within `max_depth`
+        from the initial Node.
+
+        """
+        self._update()
+
+        return [n for n in list(self._nodes)
+                if n in self and self._within(n, max_depth)]
+
+    def route(self, node: Node, max_depth: int) -> (tuple, None):
+        """Cheapest known route from the given Node to the nearest Node
+        with untried Actions within `max_depth` from the initial Node.
+
+        The route is returned as a tuple of Edges.
+        None is returned if no route is known.
+
+        """
+        visited = {node: None}
+        queue = deque((node, ))
+
+        while queue:
+            current = queue.popleft()
+
+            if current in self and self._within(current, max_depth):
+                return route_edges(visited, current)
+
+            for edge in current.edges:
+                if edge.tail not in visited:
+                    visited[edge.tail] = edge
+                    queue.append(edge.tail)
+
+        return None
+
+    def _update(self):
+        """Add the Nodes added to the Journal since the last update."""
+        nodes = self.journal.nodes
+
+        self._nodes.update(nodes[self._known:])
+        self._known = len(nodes)
+
+    def _within(self, node: Node, max_depth: int) -> bool:
+        try:
+            return self.journal.depth(node) < max_depth
+        except LookupError:
+            return False
+
+
+def route_edges(visited: dict, node: Node) -> tuple:
+    """Walk back the visited Edges from the Node to the route start."""
+    edges = deque()
+
+    while visited[node] is not None:
+        edges.appendleft(visited[node])
+        node = visited[node].head
+
+    return tuple(edges)
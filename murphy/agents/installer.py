@@ -10,8 +10,9 @@ The Agent loops over the current state until either all possible paths
 have been explored or a timeout is reached.
 
 To limit the exploration, a maximum depth parameter is set.
-If the travelled path reaches the maximum depth, the Agent will start
-from the beginning exploring another one.
+If the travelled path reaches the maximum depth, the Agent will walk
+the known paths towards the nearest unexplored action or, if none
+can be reached, start from the beginning exploring another one.
 
 The following heuristics are applied when choosing a possible path:
 
@@ -25,10 +26,13 @@ going out of focus or long lasting installations.
 """
 
 import time
-import random
 import logging
 
 from murphy.journal import Node
+from murphy.agents.snapshots import SnapshotTree
+from murphy.agents.reset import ResetStrategy
+from murphy.agents.explorer import JournalExplorer, MaxDepthReachedError
+from murphy.journal.scheduler import RenderScheduler
 from murphy.model import State, Action, Button, Coordinates
 
 
@@ -42,12 +46,7 @@ the installer window is out of focus.
 """
 
 
-class MaxDepthReachedError(RuntimeError):
-    """Raised when the max exploration depth has been reached."""
-    pass
-
-
-class ApplicationInstaller:
+class ApplicationInstaller(JournalExplorer):
     """Installer Agent.
 
     Drives generic application installers.
@@ -60,20 +59,17 @@ class ApplicationInstaller:
     content is scanned. If the frequency is too high, the window content
     might not be rendered completely affecting the results.
 
-    """
-    action = None
-    resetted = False
-    wait_time = 0
-    start_time = 0
-    max_depth = MAX_DEPTH
-    frequency = FREQUENCY
+    See JournalExplorer for the Journal walking logic.
 
+    """
     def __init__(self, interpreter, journal,
-                 max_depth: int = MAX_DEPTH, frequency: int = FREQUENCY):
-        self.journal = journal
-        self.interpreter = interpreter
-        self.max_depth = max_depth
-        self.frequency = frequency
+                 max_depth: int = MAX_DEPTH, frequency: int = FREQUENCY,
+                 renderer: RenderScheduler = None,
+                 snapshots: SnapshotTree = None,
+                 reset_strategy: ResetStrategy = None):
+        super().__init__(interpreter, journal, available_actions,
+                         max_depth, frequency, renderer=renderer,
+                         snapshots=snapshots, reset_strategy=reset_strategy)
 
     def explore(self, timeout: int):
         """Explore the application installer.
@@ -102,11 +98,18 @@ class ApplicationInstaller:
                     action = None
                     continue
 
-                if available_actions(self.journal.current_node.state):
+                if self.route:
+                    action = self.follow_route(node)
+                elif available_actions(self.journal.current_node.state):
                     action = self.choose_new_action()
-                    action.perform()
-                    logging.info(
-                        "Performed %s, score %d", action.text, action.score)
+                    if action is not None and self.perform(action):
+                        logging.info("Performed %s, score %d",
+                                     action.text, action.score)
+                    elif action is not None:
+                        self.withdraw(action)
+                        action = None
+                elif self.plan_route():
+                    action = None
                 elif self.journal.current_node == self.journal.initial_node:
                     logging.info("All possible paths have been explored.")
                     return
@@ -131,7 +134,7 @@ class ApplicationInstaller:
         """Interpret the current state."""
         if self.resetted:
             self.resetted = False
-            return self.journal.initial_node.state
+            return self.reset_node.state
 
         try:
             return self.interpreter.interpret_state()
@@ -172,82 +175,6 @@ class ApplicationInstaller:
                 'window focus' if timeout == FOCUS_TIMEOUT else 'device idle')
             self.reset()
 
-    def reset(self):
-        """Reset the explorer to the initial state."""
-        self.wait_time = 0
-        self.resetted = True
-        self.journal.initial_node.state.restore()
-
-        logging.info("Reset to initial state.")
-
-    def update_journal(self, node: Node, action: Action, max_depth: int):
-        """Update the current position within the Journal and render it.
-
-        Check if the max depth has been reached and raise
-        MaxDepthReachedError if so.
-
-        """
-        if len(self.journal.nodes) == 1:
-            # First node in journal, save state so it can be reverted to
-            try:
-                self.journal.initial_node.state.save()
-            except RuntimeError:  # state already saved
-                pass
-        elif action is not None:
-            if action not in self.journal.current_node:
-                # Draw a new edge between the old and the new node
-                self.journal.current_node.new_edge(action, node)
-            else:
-                # An already performed action led to a new node,
-                # this may happen if windows have dynamic content
-                # or highlighing effects are placed on different objects
-                edge = self.journal.current_node.find_edge(action)
-                if edge.tail != node:
-                    logging.debug(
-                        "Expecting Edge %s to lead to Node %s, got %s instead.",
-                        edge, edge.tail, node)
-
-                    self.journal.current_node.new_edge(action, node)
-
-        self.journal.current_node = node
-        self.journal.render(format='html_embedded')
-
-        if self.journal.initial_node.distance(node) >= max_depth:
-            logging.info("Max depth %d reached", max_depth)
-
-            self.reset()
-
-            raise MaxDepthReachedError("Max depth %d reached" % max_depth)
-
-    def choose_new_action(self) -> Action:
-        """Return the new action to be performed.
-
-        Actions are chosen based on their score (highest score first).
-
-        The chosen action will have its score reduced by one unit.
-
-        """
-        actions = available_actions(self.journal.current_node.state)
-        candidate = max(actions, key=lambda a: a.score)
-        candidates = [a for a in actions if a.score == candidate.score]
-        action = random.choice(candidates)
-
-        action.score -= 1
-
-        return action
-
-    def continue_exploring(self, timeout: int, frequency: int) -> bool:
-        if self.start_time == 0:
-            self.start_time = time.time()
-
-        if time.time() - self.start_time < timeout:
-            time.sleep(frequency)
-            return True
-
-        logging.info("Exploration timeout (%ds) reached.", timeout)
-
-        return False
-
     def switch_focus(self):
         """Issue an ALT+ESC command to switch focus to the next window."""
         with self.interpreter.control.keyboard.hold('Alt'):
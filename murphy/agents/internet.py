@@ -7,17 +7,21 @@ The Agent loops over the current state until either all possible paths
 have been explored or a timeout is reached.
 
 To limit the exploration, a maximum depth parameter is set.
-If the travelled path reaches the maximum depth, the Agent will start
-from the beginning exploring another one.
+If the travelled path reaches the maximum depth, the Agent will walk
+the known paths towards the nearest unexplored action or, if none
+can be reached, start from the beginning exploring another one.
 
 """
 
 import time
-import random
 import logging
 
 from murphy.journal import Node
-from murphy.model import State, Action, Link
+from murphy.agents.snapshots import SnapshotTree
+from murphy.agents.reset import ResetStrategy
+from murphy.agents.explorer import JournalExplorer, MaxDepthReachedError
+from murphy.journal.scheduler import RenderScheduler
+from murphy.model import State, Link
 
 
 MAX_DEPTH = 6
@@ -26,12 +30,7 @@ STATE_TIMEOUT = 30
 """How many seconds to wait if the browser window is out of focus."""
 
 
-class MaxDepthReachedError(RuntimeError):
-    """Raised when the max exploration depth has been reached."""
-    pass
-
-
-class InternetExplorer:
+class InternetExplorer(JournalExplorer):
     """Not the Internet Explorer you are thinking about.
 
     The max_depth controls how many links the explorer will follow
@@ -42,20 +41,17 @@ class InternetExplorer:
     content is scanned. If the frequency is too high, the web content
     might not be dowloaded/rendered completely affecting the results.
 
-    """
-    action = None
-    resetted = False
-    wait_time = 0
-    start_time = 0
-    max_depth = MAX_DEPTH
-    frequency = FREQUENCY
+    See JournalExplorer for the Journal walking logic.
 
+    """
     def __init__(self, interpreter, journal,
-                 max_depth: int = MAX_DEPTH, frequency: int = FREQUENCY):
-        self.journal = journal
-        self.interpreter = interpreter
-        self.max_depth = max_depth
-        self.frequency = frequency
+                 max_depth: int = MAX_DEPTH, frequency: int = FREQUENCY,
+                 renderer: RenderScheduler = None,
+                 snapshots: SnapshotTree = None,
+                 reset_strategy: ResetStrategy = None):
+        super().__init__(interpreter, journal, available_actions,
+                         max_depth, frequency, renderer=renderer,
+                         snapshots=snapshots, reset_strategy=reset_strategy)
 
     def explore(self, timeout: int):
         """Explore "The Internet®" but just for a while.
@@ -84,10 +80,17 @@ class InternetExplorer:
                     action = None
                     continue
 
-                if available_actions(self.journal.current_node.state):
+                if self.route:
+                    action = self.follow_route(node)
+                elif available_actions(self.journal.current_node.state):
                     action = self.choose_new_action()
-                    action.perform()
-                    logging.info("Performed %s", action.text)
+                    if action is not None and self.perform(action):
+                        logging.info("Performed %s", action.text)
+                    elif action is not None:
+                        self.withdraw(action)
+                        action = None
+                elif self.plan_route():
+                    action = None
                 elif self.journal.current_node == self.journal.initial_node:
                     logging.info("All possible paths have been explored.")
                     return
@@ -101,7 +104,7 @@ class InternetExplorer:
         """Interpret the current state."""
         if self.resetted:
             self.resetted = False
-            return self.journal.initial_node.state
+            return self.reset_node.state
 
         try:
             return self.interpreter.interpret_state()
@@ -141,77 +144,6 @@ class InternetExplorer:
                 "Timeout (%ds) when waiting for window focus.", waited_time)
             self.reset()
 
-    def reset(self):
-        """Reset the explorer to the initial state."""
-        self.wait_time = 0
-        self.resetted = True
-        self.journal.initial_node.state.restore()
-
-        logging.info("Reset to initial state.")
-
-    def update_journal(self, node: Node, action: Action, max_depth: int):
-        """Update the current position within the Journal and render it.
-
-        Check if the max depth has been reached and raise
-        MaxDepthReachedError if so.
-
-        """
-        if len(self.journal.nodes) == 1:
-            # First node in journal, save state so it can be reverted to
-            try:
-                self.journal.initial_node.state.save()
-            except RuntimeError:  # state already saved
-                pass
-        elif action is not None:
-            if action not in self.journal.current_node:
-                # Draw a new edge between the old and the new node
-                self.journal.current_node.new_edge(action, node)
-            else:
-                # An already performed action led to a new node,
-                # this may happen if websites have dynamic content
-                edge = self.journal.current_node.find_edge(action)
-                if edge.tail != node:
-                    self.journal.current_node.new_edge(action, node)
-
-        self.journal.current_node = node
-        self.journal.render(format='html_embedded')
-
-        if self.journal.initial_node.distance(node) >= max_depth:
-            logging.info("Max depth %d reached", max_depth)
-
-            self.reset()
-
-            raise MaxDepthReachedError("Max depth %d reached" % max_depth)
-
-    def choose_new_action(self) -> Action:
-        """Return the new action to be performed.
-
-        Actions are chosen based on their score (highest score first).
-
-        The chosen action will have its score reduced by one unit.
-
-        """
-        actions = available_actions(self.journal.current_node.state)
-        candidate = max(actions, key=lambda a: a.score)
-        candidates = [a for a in actions if a.score == candidate.score]
-        action = random.choice(candidates)
-
-        action.score -= 1
-
-        return action
-
-    def continue_exploring(self, timeout: int, frequency: int) -> bool:
-        if self.start_time == 0:
-            self.start_time = time.time()
-
-        if time.time() - self.start_time < timeout:
-            time.sleep(frequency)
-            return True
-
-        logging.info("Exploration timeout (%ds) reached.", timeout)
-
-        return False
-
     def switch_focus(self):
         """Issue an ALT+ESC command to switch focus to the next window."""
         with self.interpreter.control.keyboard.hold('alt'):
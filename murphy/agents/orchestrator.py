@@ -0,0 +1,283 @@
+"""Parallel exploration of an application over several devices.
+
+The Orchestrator drives one Worker per device, each with its own
+Interpreter, all sharing the same Journal. States found by different
+Workers are deduplicated within the shared Journal and the Action scores
+are shared as well, so no transition is explored more often
+than by a single Agent.
+
+Workers claim the frontier Node they are heading to,
+the other Workers route towards the unclaimed ones. A Worker left
+without routes waits for the claims of the others to be released
+as their exploration might uncover new Nodes.
+
+As the Journal Node States belong to the device which found them,
+Workers perform the equivalent Actions of their own States
+and reset by restoring their own initial State.
+
+"""
+
+import time
+import logging
+import threading
+from typing import Sequence
+
+from murphy.journal import ConcurrentJournal, Node
+from murphy.journal.node import action_key
+from murphy.journal.scheduler import RenderScheduler
+from murphy.model import State, Action
+from murphy.agents.frontier import Frontier
+from murphy.agents.reset import ResetStrategy, StateReset
+from murphy.agents.application import ApplicationExplorer
+from murphy.agents.application import available_actions, out_of_focus
+from murphy.agents.application import MAX_DEPTH, FREQUENCY
+
+
+class SharedJournal:
+    """View over a ConcurrentJournal shared among several Workers.
+
+    Each view tracks its own current Node,
+    other attributes are those of the shared Journal.
+
+    """
+    def __init__(self, journal: ConcurrentJournal):
+        self.journal = journal
+        self.current_node = None
+        """Current position of the Worker within the Journal."""
+
+    def __getattr__(self, name: str):
+        return getattr(self.journal, name)
+
+    def __contains__(self, element: (Node, State)) -> bool:
+        return element in self.journal
+
+
+class Claims:
+    """Frontier Nodes claimed by the Workers, one per Worker."""
+    def __init__(self):
+        self._claims = {}
+        self._lock = threading.Lock()
+
+    def claim(self, node: Node, owner: object):
+        """Claim the Node releasing the previous claim of the owner."""
+        with self._lock:
+            self._claims[owner] = node
+
+    def release(self, owner: object):
+        with self._lock:
+            self._claims.pop(owner, None)
+
+    def outstanding(self, owner: object) -> bool:
+        """True if any Node is claimed by another owner."""
+        with self._lock:
+            return any(o is not owner for o in self._claims)
+
+    def taken(self, node: Node, owner: object) -> bool:
+        """True if the Node is claimed by another owner."""
+        with self._lock:
+            return any(n is node for o, n in self._claims.items()
+                       if o is not owner)
+
+
+class ClaimedFrontier(Frontier):
+    """Frontier excluding the Nodes claimed by other Workers."""
+    def __init__(self, journal: SharedJournal, available_actions,
+                 claims: Claims, owner: object):
+        super().__init__(journal, available_actions)
+        self.claims = claims
+        self.owner = owner
+
+    def __contains__(self, node: Node) -> bool:
+        if self.claims.taken(node, self.owner):
+            return False
+
+        return super().__contains__(node)
+
+
+class Worker(ApplicationExplorer):
+    """Application Explorer exploring a Journal shared with other Workers.
+
+    The Worker saves its device initial State which is restored on reset
+    unless a different reset strategy is given.
+
+    """
+    state = None
+    initial_state = None
+    discovered = 0
+
+    def __init__(self, interpreter, journal: SharedJournal, claims: Claims,
+                 max_depth: int = MAX_DEPTH, frequency: int = FREQUENCY,
+                 renderer: RenderScheduler = None,
+                 reset_strategy: ResetStrategy = None):
+        super().__init__(interpreter, journal, max_depth=max_depth,
+                         frequency=frequency, renderer=renderer)
+        self.claims = claims
+        self.frontier = ClaimedFrontier(
+            journal, available_actions, claims, self)
+        self.reset_strategy = reset_strategy
+
+    def setup(self):
+        """Save the device initial State and find its Node."""
+        self.state = self.initial_state = self.interpreter.interpret_state()
+        self.initial_state.save()
+
+        node, new = self.journal.find_or_new_node(self.initial_state)
+        if new:
+            self.discovered += 1
+        if self.reset_strategy is None:
+            self.reset_strategy = StateReset(
+                self.journal, self.initial_state, node)
+
+    def teardown(self):
+        """Release the claims and discard the saved initial State."""
+        self.claims.release(self)
+
+        if self.initial_state is not None:
+            self.initial_state.discard()
+
+    def current_state(self):
+        """Interpret the current state of the Worker device."""
+        self.resetted = False
+        self.state = super().current_state()
+
+        return self.state
+
+    def journal_position(self, state: State) -> (Node, None):
+        """Find the State within the shared Journal,
+        the lookup and the insertion are atomic.
+
+        """
+        node = self.journal.find_node(state)
+
+        if node is not None:
+            logging.info("Old Node: %s", node)
+        elif not out_of_focus(state) and available_actions(state):
+            node, new = self.journal.find_or_new_node(state)
+            self.discovered += new
+            logging.info("%s Node: %s", 'New' if new else 'Old', node)
+
+        return node
+
+    def plan_route(self) -> bool:
+        if not super().plan_route():
+            return False
+
+        self.claims.claim(self.route[-1].tail, self)
+
+        return True
+
+    def reset(self):
+        super().reset()
+
+        if self.route:
+            self.claims.claim(self.route[-1].tail, self)
+
+    def explored(self) -> bool:
+        """Release the claim of the Worker, the paths are explored
+        only once no other Worker holds a claim.
+
+        """
+        self.claims.release(self)
+
+        if self.claims.outstanding(self):
+            logging.info("Waiting for the other Workers.")
+            return False
+
+        return True
+
+    def choose_new_action(self) -> (Action, None):
+        """Choose the Action under the Node lock
+        as the scores are shared among the Workers.
+
+        """
+        with self.journal.node_lock(self.journal.current_node):
+            return super().choose_new_action()
+
+    def perform(self, action: Action) -> bool:
+        """Perform the equivalent Action of the Worker device State.
+
+        False is returned if the device State lacks the Action.
+
+        """
+        key = action_key(action)
+
+        for local in self.state.actions:
+            if action_key(local) == key:
+                local.perform()
+                return True
+
+        logging.info("%s not available on this device.", action.text)
+
+        return False
+
+    def withdraw(self, action: Action):
+        """Give back the score under the Node lock and reset."""
+        with self.journal.node_lock(self.journal.current_node):
+            action.score += 1
+
+        self.reset()
+
+
+class Orchestrator:
+    """Drive one Worker per Interpreter over the shared Journal.
+
+    Each Interpreter must control a distinct device in the same
+    initial State, see murphy.automation.libvirt.LinkedClones.
+
+    """
+    def __init__(self, interpreters: Sequence, journal: ConcurrentJournal,
+                 max_depth: int = MAX_DEPTH, frequency: int = FREQUENCY,
+                 renderer: RenderScheduler = None):
+        self.journal = journal
+        self.claims = Claims()
+        self.workers = [Worker(interpreter, SharedJournal(journal),
+                               self.claims, max_depth=max_depth,
+                               frequency=frequency, renderer=renderer)
+                        for interpreter in interpreters]
+
+        self._logger = logging.getLogger("%s.%s" % (self.__module__,
+                                                    self.__class__.__name__))
+
+    def explore(self, timeout: int):
+        """Run the Workers in parallel until the timeout expires
+        or all of them are done.
+
+        """
+        for worker in self.workers:
+            worker.setup()
+
+        start = time.monotonic()
+        threads = [threading.Thread(target=self._explore, args=(w, timeout),
+                                    name='Worker-%d' % i)
+                   for i, w in enumerate(self.workers)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self._log_throughput(time.monotonic() - start)
+
+    def close(self):
+        for worker in self.workers:
+            worker.teardown()
+
+    def _explore(self, worker: Worker, timeout: int):
+        try:
+            worker.explore(timeout)
+        except Exception as error:
+            self._logger.exception("Worker failed: %s", error)
+        finally:
+            self.claims.release(worker)
+
+    def _log_throughput(self, elapsed: float):
+        hours = max(elapsed, 1) / 3600
+
+        for index, worker in enumerate(self.workers):
+            self._logger.info("Worker %d: %d states, %.1f states/hour",
+                              index, worker.discovered,
+                              worker.discovered / hours)
+
+        self._logger.info("Total: %d states, %.1f states/hour",
+                          len(self.journal.nodes),
+                          len(self.journal.nodes) / hours)
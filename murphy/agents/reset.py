@@ -0,0 +1,269 @@
+"""Strategies for bringing the device back to a known Journal Node.
+
+Restoring a device snapshot always works but it is slow.
+Many applications can be brought back to a known state faster,
+by dismissing their dialogs or by closing and relaunching them.
+
+The CheapestReset measures the latency and the success rate
+of a set of strategies and resets through the cheapest one,
+falling back to the next ones on failure.
+
+"""
+
+import time
+import logging
+from typing import Sequence
+
+from murphy.model import State
+from murphy.journal import Journal, Node
+from murphy.agents.snapshots import SnapshotTree
+
+
+ESCAPE_ATTEMPTS = 3
+ESCAPE_DELAY = 2
+RELAUNCH_ATTEMPTS = 5
+RELAUNCH_DELAY = 6
+
+
+class ResetStrategy:
+    """Interface of the reset strategies.
+
+    The reset method brings the device to a known Journal Node
+    and returns it together with the route, as a tuple of Edges,
+    leading to the closest of the target Nodes.
+
+    RuntimeError is raised if the strategy failed.
+
+    """
+    name = 'reset'
+
+    def reset(self, targets: Sequence) -> tuple:
+        raise NotImplementedError()
+
+
+class SnapshotReset(ResetStrategy):
+    """Restore the saved device state closest to the targets."""
+    name = 'snapshot'
+
+    def __init__(self, snapshots: SnapshotTree):
+        self.snapshots = snapshots
+
+    def reset(self, targets: Sequence) -> tuple:
+        return self.snapshots.restore(targets)
+
+
+class StateReset(ResetStrategy):
+    """Restore a device State saved outside of the Journal.
+
+    Useful when the Journal is shared among several devices
+    and the Node States belong to the device which found them.
+    The State must represent the given Node.
+
+    """
+    name = 'state'
+
+    def __init__(self, journal: Journal, state: State, node: Node):
+        self.journal = journal
+        self.state = state
+        self.node = node
+
+    def reset(self, targets: Sequence) -> tuple:
+        self.state.restore()
+
+        return self.node, closest_route(self.journal, self.node, targets) or ()
+
+
+class InputReset(ResetStrategy):
+    """Base class of the strategies driving the device via its inputs.
+
+    The reset succeeds if, within the given attempts, the interpreted
+    state is a known Node leading to any of the targets.
+    If no target is given, only the initial Node is accepted.
+
+    """
+    def __init__(self, journal: Journal, interpreter,
+                 attempts: int, delay: float):
+        self.journal = journal
+        self.interpreter = interpreter
+        self.attempts = attempts
+        """How many times to check for a known Node."""
+        self.delay = delay
+        """Seconds to wait before each check."""
+
+    @property
+    def keyboard(self):
+        return self.interpreter.control.keyboard
+
+    def known_node(self, targets: Sequence) -> (tuple, None):
+        """Return the known Node the device is in and the route
+        to the targets, None if the Node is unknown or useless.
+
+        """
+        try:
+            state = self.interpreter.interpret_state()
+        except RuntimeError:
+            return None
+
+        if state not in self.journal:
+            return None
+
+        node = self.journal.find_node(state)
+        route = closest_route(self.journal, node, targets)
+        if route is None and node is not self.journal.initial_node:
+            return None
+
+        return node, route or ()
+
+
+class EscapeReset(InputReset):
+    """Press Escape until a known Node appears."""
+    name = 'escape'
+
+    def __init__(self, journal: Journal, interpreter,
+                 attempts: int = ESCAPE_ATTEMPTS, delay: float = ESCAPE_DELAY,
+                 key: str = 'esc'):
+        super().__init__(journal, interpreter, attempts, delay)
+        self.key = key
+
+    def reset(self, targets: Sequence) -> tuple:
+        for _ in range(self.attempts):
+            self.keyboard.press(self.key)
+            time.sleep(self.delay)
+
+            known = self.known_node(targets)
+            if known is not None:
+                return known
+
+        raise RuntimeError("No known state after %d %s presses" %
+                           (self.attempts, self.key))
+
+
+class RelaunchReset(InputReset):
+    """Close the application under focus and relaunch it
+    through the Windows Run dialog.
+
+    The close and run key combinations are implementation specific.
+
+    """
+    name = 'relaunch'
+
+    def __init__(self, journal: Journal, interpreter, command: str,
+                 attempts: int = RELAUNCH_ATTEMPTS,
+                 delay: float = RELAUNCH_DELAY,
+                 close_keys: tuple = ('alt', 'f4'),
+                 run_keys: tuple = ('lsuper', 'r')):
+        super().__init__(journal, interpreter, attempts, delay)
+        self.command = command
+        self.close_keys = close_keys
+        self.run_keys = run_keys
+
+    def reset(self, targets: Sequence) -> tuple:
+        self.press(self.close_keys)
+        time.sleep(self.delay)
+        self.press(self.run_keys)
+        time.sleep(ESCAPE_DELAY)
+        self.keyboard.type(self.command)
+        self.keyboard.press('enter')
+
+        for _ in range(self.attempts):
+            time.sleep(self.delay)
+
+            known = self.known_node(targets)
+            if known is not None:
+                return known
+
+        raise RuntimeError("No known state after relaunching %s" %
+                           self.command)
+
+    def press(self, keys: tuple):
+        with self.keyboard.hold(list(keys[:-1])):
+            self.keyboard.press(keys[-1])
+
+
+class ResetStats:
+    """Latency and outcome of the resets done through a strategy."""
+    def __init__(self):
+        self.attempts = 0
+        self.successes = 0
+        self.latency = 0.0
+        """Total seconds spent resetting, failures included."""
+
+    @property
+    def success_rate(self) -> float:
+        """Smoothed success rate, an untried strategy is given 0.5."""
+        return (self.successes + 1) / (self.attempts + 2)
+
+    @property
+    def mean_latency(self) -> float:
+        return self.latency / self.attempts if self.attempts else 0.0
+
+    @property
+    def cost(self) -> float:
+        """Expected seconds needed for a successful reset."""
+        return self.mean_latency / self.success_rate
+
+    def record(self, latency: float, success: bool):
+        self.attempts += 1
+        self.successes += success
+        self.latency += latency
+
+
+class CheapestReset(ResetStrategy):
+    """Reset through the strategy with the lowest expected cost.
+
+    Untried strategies are tried first, in the given order.
+    If a strategy fails, the next cheapest one is tried,
+    the last strategy should be the most reliable one.
+
+    """
+    name = 'cheapest'
+
+    def __init__(self, strategies: Sequence):
+        self.strategies = tuple(strategies)
+        self.stats = {s: ResetStats() for s in self.strategies}
+        """Measured latency and success rate of each strategy."""
+
+        self._logger = logging.getLogger("%s.%s" % (self.__module__,
+                                                    self.__class__.__name__))
+
+    def ranking(self) -> list:
+        """Strategies sorted by expected cost."""
+        return sorted(self.strategies, key=lambda s: self.stats[s].cost)
+
+    def reset(self, targets: Sequence) -> tuple:
+        for strategy in self.ranking():
+            stats = self.stats[strategy]
+            start = time.monotonic()
+
+            try:
+                node, route = strategy.reset(targets)
+            except RuntimeError as error:
+                stats.record(time.monotonic() - start, False)
+                self._logger.warning(
+                    "Reset via %s failed: %s", strategy.name, error)
+                continue
+
+            stats.record(time.monotonic() - start, True)
+            self._logger.info(
+                "Reset via %s in %.1fs, success rate %.2f",
+                strategy.name, stats.mean_latency, stats.success_rate)
+
+            return node, route
+
+        raise RuntimeError("All reset strategies failed")
+
+
+def closest_route(journal: Journal, node: Node,
+                  targets: Sequence) -> (tuple, None):
+    """Shortest route from the Node to the closest target,
+    None if no target can be reached.
+
+    """
+    distances = journal.index.distances(node)
+    reachable = [t for t in targets if t in distances]
+
+    if not reachable:
+        return None
+
+    return journal.index.find_path(
+        node, min(reachable, key=lambda t: distances[t]))
@@ -0,0 +1,218 @@
+"""Device snapshots of selected Journal Nodes.
+
+Saving the device state is expensive, restoring it even more.
+Yet restoring the initial state throws away all the progress
+made towards the deepest Nodes of the Journal.
+
+The snapshot tree saves the device state at few deep Nodes
+chosen by a cost/benefit policy. When the Agent needs to reset,
+the saved ancestor closest to the exploration frontier is restored
+bounding the amount of Actions to replay.
+
+"""
+
+import logging
+from itertools import count
+from typing import Sequence
+from collections import OrderedDict
+
+from murphy.journal import Journal, Node
+
+
+MIN_DEPTH = 2
+MIN_SPACING = 2
+MIN_ACTIONS = 2
+MAX_SNAPSHOTS = 4
+
+
+class SnapshotPolicy:
+    """Cost/benefit policy for saving the device state at a Node.
+
+    Deep Nodes are expensive to reach again and Nodes with many
+    untried Actions will be returned to several times.
+
+    A Node is worth a snapshot if its depth is at least `min_depth`,
+    it is at least `min_spacing` Actions away from the nearest saved
+    ancestor and it has at least `min_actions` untried Actions.
+    No more than `max_snapshots` are taken besides the initial one.
+
+    The policy is checked at every step, it relies on the Journal
+    depths, updated on insertion, and visits only the Nodes within
+    `min_spacing` Actions from the saved ones.
+
+    """
+    def __init__(self, min_depth: int = MIN_DEPTH,
+                 min_spacing: int = MIN_SPACING,
+                 min_actions: int = MIN_ACTIONS,
+                 max_snapshots: int = MAX_SNAPSHOTS):
+        self.min_depth = min_depth
+        self.min_spacing = min_spacing
+        self.min_actions = min_actions
+        self.max_snapshots = max_snapshots
+
+    def worth(self, tree: 'SnapshotTree', node: Node, actions: int) -> bool:
+        """Return True if the Node is worth a snapshot within the tree.
+
+        `actions` is the amount of untried Actions of the Node.
+
+        """
+        if len(tree.parents) >= self.max_snapshots:
+            return False
+        if actions < self.min_actions:
+            return False
+
+        try:
+            if tree.journal.depth(node) < self.min_depth:
+                return False
+        except LookupError:
+            return False
+
+        try:
+            tree.nearest_ancestor(node, self.min_spacing - 1)
+        except LookupError:  # no saved ancestor closer than min_spacing
+            return True
+
+        return False
+
+
+class SnapshotTree:
+    """Tree of the Journal Nodes whose device state was saved.
+
+    The initial Node is the root of the tree,
+    its state must be saved by the Agent.
+
+    """
+    def __init__(self, journal: Journal, policy: SnapshotPolicy = None):
+        self.journal = journal
+        """The explored Journal."""
+        self.policy = policy if policy is not None else SnapshotPolicy()
+        """Policy deciding which Nodes are worth a snapshot."""
+        self.parents = {}
+        """Saved Nodes mapped to their nearest saved ancestor."""
+
+        self._logger = logging.getLogger("%s.%s" % (self.__module__,
+                                                    self.__class__.__name__))
+
+    @property
+    def nodes(self) -> list:
+        """The Nodes whose state is saved, the initial one first."""
+        return [self.journal.initial_node] + list(self.parents)
+
+    def save(self, node: Node, actions: int) -> bool:
+        """Save the device state at the given Node if worth it.
+
+        The device must be in the state represented by the Node.
+        `actions` is the amount of untried Actions of the Node.
+
+        """
+        if node is self.journal.initial_node or node in self.parents:
+            return False
+        if not self.policy.worth(self, node, actions):
+            return False
+
+        try:
+            node.state.save()
+        except RuntimeError as error:
+            self._logger.warning("Unable to save %s: %s", node, error)
+            return False
+
+        self.journal.update_node(node)
+        self.parents[node] = self.nearest_ancestor(node)[0]
+        self._logger.info("Snapshot of %s saved", node)
+
+        return True
+
+    def nearest_ancestor(self, node: Node, max_distance: int = None) -> tuple:
+        """Return the saved Node closest to the given one
+        together with its distance.
+
+        The saved Nodes are expanded together breadth first,
+        up to `max_distance` Actions away if given, so that
+        the Journal index is not rebuilt as the Journal grows.
+
+        LookupError is raised if no saved Node leads to the given one.
+
+        """
+        level = OrderedDict((saved, saved) for saved in self.nodes)
+        visited = set(level)
+
+        for distance in count():
+            if node in level:
+                return level[node], distance
+            if not level or distance == max_distance:
+                break
+
+            following = OrderedDict()
+            for reached, ancestor in level.items():
+                for edge in reached.edges:
+                    if edge.tail not in visited:
+                        visited.add(edge.tail)
+                        following[edge.tail] = ancestor
+            level = following
+
+        raise LookupError("No saved ancestor found for %s" % node)
+
+    def restore(self, targets: Sequence) -> tuple:
+        """Restore the saved Node closest to any of the target Nodes.
+
+        The restored Node is returned together with the route,
+        as a tuple of Edges, leading to the closest target.
+
+        If no target can be reached, the initial Node is restored.
+
+        Snapshots which cannot be restored, as evicted by the device,
+        are dropped from the tree and the next closest one is tried.
+
+        """
+        while True:
+            node, route = self._closest(targets)
+
+            try:
+                node.state.restore()
+            except RuntimeError as error:
+                if node is self.journal.initial_node:
+                    raise
+
+                self._logger.warning("Unable to restore %s: %s", node, error)
+                self._drop(node)
+            else:
+                return node, route
+
+    def discard(self):
+        """Discard the snapshots besides the initial one."""
+        for node in self.parents:
+            try:
+                node.state.discard()
+            except RuntimeError as error:
+                self._logger.warning("Unable to discard %s: %s", node, error)
+
+        self.parents.clear()
+
+    def _closest(self, targets: Sequence) -> tuple:
+        """Saved Node closest to any of the targets and the route to it."""
+        index = self.journal.index
+        closest = None
+
+        for node in self.nodes:
+            distances = index.distances(node)
+
+            for target in targets:
+                distance = distances.get(target)
+                if distance is not None and (closest is None or
+                                             distance < closest[0]):
+                    closest = distance, node, target
+
+        if closest is None:
+            return self.journal.initial_node, ()
+
+        _, node, target = closest
+
+        return node, index.find_path(node, target)
+
+    def _drop(self, node: Node):
+        """Remove the Node from the tree re-linking its children."""
+        parent = self.parents.pop(node)
+
+        for child, ancestor in self.parents.items():
+            if ancestor is node:
+                self.parents[child] = parent
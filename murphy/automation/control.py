@@ -1,4 +1,5 @@
-from murphy.automation import Control
+from murphy.automation import Control, DeviceState
+from murphy.automation.snapshots import SnapshotManager, SnapshotBudget
 
 from murphy.automation.libvirt import LibvirtFactory, LibvirtState
 from murphy.automation.vnc import VNCFactory, VNCMouse, VNCKeyboard
@@ -7,9 +8,18 @@ from murphy.automation.virtualbox import VirtualboxMouse, VirtualboxKeyboard
 
 
 class LibvirtControl(Control):
-    """Libvirt based Control implementation."""
-    def __init__(self, vnc_server: str, domain_identifier: (int, str)):
+    """Libvirt based Control implementation.
+
+    If a snapshot `budget` is given, the snapshots are managed
+    by a SnapshotManager and the input devices wait for the pending
+    snapshots to be taken the first time they are used after
+    a snapshot request.
+
+    """
+    def __init__(self, vnc_server: str, domain_identifier: (int, str),
+                 budget: SnapshotBudget = None):
         self._state = None
+        self._budget = budget
         self._mouse = None
         self._keyboard = None
         self._vnc = VNCFactory(vnc_server)
@@ -20,6 +30,8 @@ class LibvirtControl(Control):
         if self._mouse is None:
             self._mouse = VNCMouse(self._vnc)
 
+        wait_snapshots(self._state)
+
         return self._mouse
 
     @property
@@ -27,20 +39,32 @@ class LibvirtControl(Control):
         if self._keyboard is None:
             self._keyboard = VNCKeyboard(self._vnc)
 
+        wait_snapshots(self._state)
+
         return self._keyboard
 
     @property
-    def state(self) -> LibvirtState:
+    def state(self) -> (LibvirtState, SnapshotManager):
         if self._state is None:
-            self._state = LibvirtState(self._libvirt)
+            self._state = managed_state(
+                LibvirtState(self._libvirt), self._budget)
 
         return self._state
 
 
 class VirtualboxControl(Control):
-    """Virtualbox based Control implementation."""
-    def __init__(self, machine_identifier: str):
+    """Virtualbox based Control implementation.
+
+    If a snapshot `budget` is given, the snapshots are managed
+    by a SnapshotManager and the input devices wait for the pending
+    snapshots to be taken the first time they are used after
+    a snapshot request.
+
+    """
+    def __init__(self, machine_identifier: str,
+                 budget: SnapshotBudget = None):
         self._state = None
+        self._budget = budget
         self._mouse = None
         self._keyboard = None
         self._virtualbox = VirtualboxFactory(machine_identifier)
@@ -50,6 +74,8 @@ class VirtualboxControl(Control):
         if self._mouse is None:
             self._mouse = VirtualboxMouse(self._virtualbox)
 
+        wait_snapshots(self._state)
+
         return self._mouse
 
     @property
@@ -57,11 +83,35 @@ class VirtualboxControl(Control):
         if self._keyboard is None:
             self._keyboard = VirtualboxKeyboard(self._virtualbox)
 
+        wait_snapshots(self._state)
+
         return self._keyboard
 
     @property
-    def state(self) -> VirtualboxState:
+    def state(self) -> (VirtualboxState, SnapshotManager):
         if self._state is None:
-            self._state = VirtualboxState(self._virtualbox)
+            self._state = managed_state(
+                VirtualboxState(self._virtualbox), self._budget)
 
         return self._state
+
+
+def managed_state(state: DeviceState,
+                  budget: SnapshotBudget) -> (DeviceState, SnapshotManager):
+    """Wrap the DeviceState within a SnapshotManager if a budget is given."""
+    if budget is not None:
+        return SnapshotManager(state, budget=budget)
+
+    return state
+
+
+def wait_snapshots(state: DeviceState):
+    """Notify the manager before altering the device and wait
+    for the pending snapshots.
+
+    An Action uses the input devices several times, only the first use
+    following a snapshot request waits for the snapshots to be taken.
+
+    """
+    if isinstance(state, SnapshotManager) and state.touch():
+        state.wait()
@@ -72,10 +72,11 @@ class DeviceState:
     def __init__(self, factory: MurphyFactory):
         pass
 
-    def save(self) -> Any:
+    def save(self, name: str = None) -> Any:
         """Save the state of the device.
 
-        The returned type is opaque.
+        The implementations supporting it use the given name,
+        if any, for the saved state. The returned type is opaque.
 
         """
         raise NotImplementedError()
@@ -96,6 +97,14 @@ class DeviceState:
         """
         raise NotImplementedError()
 
+    def size(self, state: Any) -> int:
+        """Disk space occupied by the device saved state in bytes.
+
+        The state type is opaque.
+
+        """
+        raise NotImplementedError()
+
 
 class Screen:
     """Class representing the screen of the device."""
@@ -1,7 +1,9 @@
 from murphy.automation.libvirt.load import LibvirtLoad
 from murphy.automation.libvirt.state import LibvirtState
 from murphy.automation.libvirt.screen import LibvirtScreen
+from murphy.automation.libvirt.clones import LinkedClones
 from murphy.automation.libvirt.factory import LibvirtFactory
 
 
-__all__ = 'LibvirtLoad', 'LibvirtState', 'LibvirtScreen', 'LibvirtFactory'
+__all__ = ('LibvirtLoad', 'LibvirtState', 'LibvirtScreen',
+           'LinkedClones', 'LibvirtFactory')
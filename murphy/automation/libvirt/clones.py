@@ -0,0 +1,225 @@
+"""Copy-on-write clones of a libvirt domain.
+
+Each clone runs on qcow2 overlays backed by the disk images
+of the source domain, its MAC addresses are unique and its VNC
+server port is allocated by libvirt. The clones form a pool
+of identical devices which can be explored in parallel.
+
+The source disks are first extracted at the state of the given
+snapshot, the current one by default, into read-only qcow2 base images
+shared by the clones. Disks in formats without internal snapshots,
+such as raw, are extracted at their current state. The source domain
+can keep running meanwhile.
+
+"""
+
+import os
+import random
+import logging
+import subprocess
+from pathlib import Path
+from xml.etree import ElementTree
+
+import libvirt
+
+
+class LinkedClones:
+    """Pool of linked clones of the given libvirt domain.
+
+    The libvirt connection is used to look up the source domain
+    and to define the clones. The overlays and the base images
+    are stored within the given directory.
+
+    """
+    def __init__(self, connection: libvirt.virConnect, domain: str,
+                 directory: Path, qemu_img: str = None):
+        self.connection = connection
+        self.domain = domain
+        """Name of the source domain."""
+        self.directory = directory
+        """Where the overlays and base images are stored."""
+        self.qemu_img = qemu_img if qemu_img is not None else QEMU_IMG
+        self.domains = []
+        """The cloned domains."""
+
+        self._images = []
+        self._logger = logging.getLogger("%s.%s" % (self.__module__,
+                                                    self.__class__.__name__))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.teardown()
+
+    def create(self, count: int, snapshot: str = None,
+               start: bool = True) -> list:
+        """Create `count` clones of the domain at the given snapshot,
+        the current snapshot of the domain if None.
+
+        The new domains are returned, started if `start` is True.
+
+        """
+        source = self.connection.lookupByName(self.domain)
+        tree = ElementTree.fromstring(source.XMLDesc(0))
+        bases = self._base_images(source, tree, snapshot)
+        addresses = set(mac.get('address')
+                        for mac in tree.iterfind('./devices/interface/mac'))
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        for index in range(len(self.domains), len(self.domains) + count):
+            name = '%s-clone-%d' % (self.domain, index)
+            clone = clone_tree(tree, name)
+
+            for disk, (base, backing_format) in zip(disk_sources(clone),
+                                                    bases):
+                overlay = self.directory.joinpath(
+                    '%s-%s.qcow2' % (name, Path(base).stem))
+                self._run('create', '-f', 'qcow2', '-F', backing_format,
+                          '-b', base, str(overlay))
+                self._images.append(overlay)
+                set_disk_source(disk, str(overlay))
+
+            for mac in clone.iterfind('./devices/interface/mac'):
+                mac.set('address', unique_mac(addresses))
+
+            domain = self.connection.defineXML(
+                ElementTree.tostring(clone, encoding='unicode'))
+            self.domains.append(domain)
+
+            if start:
+                domain.create()
+
+            self._logger.info("Clone %s created", name)
+
+        return self.domains[-count:] if count else []
+
+    def teardown(self):
+        """Destroy and undefine the clones, delete their images."""
+        for domain in self.domains:
+            try:
+                if domain.isActive():
+                    domain.destroy()
+                domain.undefine()
+            except libvirt.libvirtError as error:
+                self._logger.warning("Unable to remove clone: %s", error)
+
+        for image in reversed(self._images):
+            try:
+                image.unlink()
+            except FileNotFoundError:
+                pass
+
+        self.domains.clear()
+        self._images.clear()
+
+    def _base_images(self, source: libvirt.virDomain,
+                     tree: ElementTree.Element, snapshot: str) -> list:
+        """Paths and formats of the read-only images backing the clones
+        disks, extracted from the source disks at the given snapshot.
+
+        """
+        if snapshot is None:
+            snapshot = current_snapshot(source)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        bases = []
+        for index, disk in enumerate(disk_sources(tree)):
+            path = disk.find('source').get('file')
+            base = self.directory.joinpath(
+                '%s-disk%d-%s.qcow2' % (self.domain, index, snapshot))
+
+            if base not in self._images:
+                self._convert(path, disk_format(disk), str(base), snapshot)
+                self._images.insert(0, base)
+
+            bases.append((str(base), 'qcow2'))
+
+        return bases
+
+    def _convert(self, path: str, disk_format: str, base: str,
+                 snapshot: str):
+        """Convert the disk into a qcow2 base image.
+
+        Only qcow2 disks hold internal snapshots, other formats
+        are extracted at their current state.
+
+        """
+        arguments = ['convert', '-U', '-f', disk_format, '-O', 'qcow2']
+        if disk_format == 'qcow2':
+            arguments += ['-l', 'snapshot.name=%s' % snapshot]
+
+        self._run(*(arguments + [path, base]))
+
+    def _run(self, *arguments: str):
+        subprocess.run((self.qemu_img, ) + arguments, check=True,
+                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+
+def clone_tree(tree: ElementTree.Element,
+               name: str) -> ElementTree.Element:
+    """Copy the domain definition dropping its unique identifiers."""
+    clone = ElementTree.fromstring(ElementTree.tostring(tree))
+    clone.find('name').text = name
+
+    for uuid in clone.findall('uuid'):
+        clone.remove(uuid)
+    for disk in clone.iterfind('./devices/disk'):
+        for backing_store in disk.findall('backingStore'):
+            disk.remove(backing_store)
+
+    for graphics in clone.iterfind("./devices/graphics[@type='vnc']"):
+        for attribute in ('port', 'websocket', 'socket'):
+            graphics.attrib.pop(attribute, None)
+        graphics.set('autoport', 'yes')
+
+    return clone
+
+
+def current_snapshot(domain: libvirt.virDomain) -> str:
+    """Name of the current snapshot of the domain."""
+    try:
+        return domain.snapshotCurrent().getName()
+    except libvirt.libvirtError as error:
+        raise RuntimeError("Domain %s has no current snapshot" %
+                           domain.name()) from error
+
+
+def disk_format(disk: ElementTree.Element) -> str:
+    """Format of the disk image as declared by its driver."""
+    driver = disk.find('driver')
+    if driver is not None and driver.get('type') is not None:
+        return driver.get('type')
+
+    return 'raw'
+
+
+def disk_sources(tree: ElementTree.Element) -> list:
+    """The file backed disks of the domain definition."""
+    return [disk for disk in tree.iterfind("./devices/disk[@device='disk']")
+            if disk.find('source') is not None and
+            disk.find('source').get('file') is not None]
+
+
+def set_disk_source(disk: ElementTree.Element, path: str):
+    disk.find('source').set('file', path)
+
+    driver = disk.find('driver')
+    if driver is not None:
+        driver.set('type', 'qcow2')
+
+
+def unique_mac(addresses: set) -> str:
+    """Generate a locally administered MAC address in the QEMU range."""
+    while True:
+        address = '52:54:00:%02x:%02x:%02x' % tuple(
+            random.getrandbits(8) for _ in range(3))
+
+        if address not in addresses:
+            addresses.add(address)
+            return address
+
+
+QEMU_IMG = os.getenv('QEMU_IMG', default='qemu-img')
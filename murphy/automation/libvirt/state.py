@@ -1,4 +1,10 @@
+import os
+import json
+import subprocess
 from datetime import datetime
+from xml.etree import ElementTree
+
+import libvirt
 
 from murphy.automation import MurphyFactory, DeviceState
 
@@ -12,12 +18,19 @@ class LibvirtState(DeviceState):
     </domainsnapshot>
     """
 
-    def __init__(self, factory: MurphyFactory):
+    def __init__(self, factory: MurphyFactory, qemu_img: str = None):
         self._domain = factory()
+        self._qemu_img = qemu_img if qemu_img is not None else QEMU_IMG
+        self._allocated = {}  # disk -> allocated bytes at last measure
+
+    def save(self, name: str = None) -> str:
+        """Take a libvirt snapshot of the device state.
 
-    def save(self) -> str:
-        """Take a libvirt snapshot of the device state."""
-        snapshot_name = datetime.now().isoformat()
+        The snapshot is named after the current time if no name is given.
+
+        """
+        snapshot_name = (name if name is not None
+                         else datetime.now().isoformat())
 
         snapshot_xml = self.SNAPSHOT_XML.format(
             snapshot_name, 'Disk Checkpoint')
@@ -34,3 +47,43 @@ class LibvirtState(DeviceState):
         """Discard the given device state deleting its libvirt snapshot."""
         snapshot = self._domain.snapshotLookupByName(state)
         snapshot.delete()
+
+    def size(self, state: str) -> int:
+        """Disk space occupied by the libvirt snapshot.
+
+        The device memory and the disk changes are stored within
+        the same qcow2 images. The growth of the images since the previous
+        measure, which includes the saved memory, estimates the disk
+        space taken by the snapshot. The size must be measured
+        right after taking the snapshot.
+
+        """
+        size = 0
+
+        for disk in domain_disks(self._domain):
+            output = subprocess.check_output(
+                (self._qemu_img, 'info', '-U', '--output=json', disk))
+            info = json.loads(output.decode())
+
+            memory = sum(s.get('vm-state-size', 0)
+                         for s in info.get('snapshots', ())
+                         if s.get('name') == state)
+            allocated = info.get('actual-size', 0)
+            growth = allocated - self._allocated.get(disk, allocated)
+            self._allocated[disk] = allocated
+
+            size += max(memory, growth)
+
+        return size
+
+
+def domain_disks(domain: libvirt.virDomain) -> list:
+    """Paths of the file backed disks of the libvirt domain."""
+    tree = ElementTree.fromstring(domain.XMLDesc(0))
+
+    return [source.get('file')
+            for source in tree.findall("./devices/disk[@device='disk']/source")
+            if source.get('file') is not None]
+
+
+QEMU_IMG = os.getenv('QEMU_IMG', default='qemu-img')
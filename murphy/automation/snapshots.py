@@ -0,0 +1,391 @@
+"""Asynchronous management of the device snapshots.
+
+Taking a snapshot of the device blocks until completion
+and each snapshot occupies disk space until it is discarded.
+
+The SnapshotManager wraps a DeviceState implementation taking
+the snapshots in a background thread and keeping them within
+a count and disk space budget. Once the budget is exceeded,
+the least useful snapshots are evicted.
+
+Checkpoints of the device state can be pre-created while the agent
+keeps working, a later save of the same device state claims
+the checkpoint instead of waiting for a new snapshot. The Agents
+shipped with Murphy save the device state right after interpreting it,
+they do not create checkpoints themselves.
+
+"""
+
+import time
+import uuid
+import logging
+import threading
+from queue import Queue
+from collections import deque
+from typing import Any, NamedTuple
+
+from murphy.automation.interfaces import DeviceState
+
+
+POOL_SIZE = 4
+"""Maximum amount of snapshots waiting to be taken."""
+CHECKPOINTS = 2
+"""Maximum amount of unclaimed checkpoints kept."""
+
+
+SnapshotBudget = NamedTuple('SnapshotBudget', (('count', int),
+                                               ('size', int)))
+"""Maximum amount of snapshots and of disk space in bytes,
+None for no limit.
+
+"""
+
+
+class Snapshot:
+    """Snapshot of the device state tracked by the SnapshotManager."""
+
+    __slots__ = ('name', 'state', 'size', 'created', 'last_used',
+                 'restores', 'pinned', 'evicted', 'error', 'ready',
+                 'generation', 'checkpoint')
+
+    def __init__(self, name: str, generation: int, pinned: bool = False,
+                 checkpoint: bool = False):
+        self.name = name
+        """Identifier of the snapshot, the device snapshot name
+        if the DeviceState implementation supports naming them.
+
+        """
+        self.state = None       # type: Any
+        """Opaque state returned by the DeviceState implementation."""
+        self.size = 0
+        """Disk space occupied by the snapshot in bytes."""
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.restores = 0
+        """How many times the snapshot was restored."""
+        self.pinned = pinned
+        """Pinned snapshots are never evicted."""
+        self.evicted = False
+        self.error = None       # type: Exception
+        self.ready = threading.Event()
+        self.generation = generation
+        """Device alterations notified before the snapshot request."""
+        self.checkpoint = checkpoint
+        """Pre-created checkpoint not claimed yet."""
+
+    @property
+    def age(self) -> float:
+        """Seconds elapsed since the snapshot was requested."""
+        return time.monotonic() - self.created
+
+    @property
+    def usefulness(self) -> tuple:
+        """Unclaimed checkpoints and snapshots restored less
+        and less recently are less useful.
+
+        """
+        return not self.checkpoint, self.restores, self.last_used
+
+
+class SnapshotManager(DeviceState):
+    """DeviceState taking the snapshots in a background thread.
+
+    The save method returns immediately the identifier of the snapshot
+    while the snapshot is taken in background. Up to `pool_size`
+    snapshots can be pending, further requests block the caller.
+    It is the caller's responsibility to leave the device untouched
+    until the pending snapshots are taken and to notify the manager
+    before altering the device, see the wait and touch methods.
+
+    The checkpoint method pre-creates a snapshot of the device state
+    in background. If the device was not altered in between, the next
+    save claims the latest checkpoint instead of taking a new snapshot.
+    Up to `checkpoints` unclaimed checkpoints are kept,
+    the oldest ones are discarded.
+
+    Restoring a snapshot waits for the pending ones to be taken.
+
+    Once the `budget` is exceeded, the unclaimed checkpoints first
+    and then the least restored and least recently used snapshots
+    are discarded. The first saved snapshot, usually the initial
+    device state, and the pinned ones are never evicted.
+    Restoring an evicted snapshot raises RuntimeError.
+
+    The device snapshots are named after their identifiers if the
+    DeviceState implementation supports it. Snapshots unknown
+    to the manager, such as the ones recorded by a previous run,
+    are restored by name.
+
+    The disk space occupied by the snapshots is tracked only
+    if the DeviceState implementation provides their size.
+
+    """
+    def __init__(self, state: DeviceState, budget: SnapshotBudget = None,
+                 pool_size: int = POOL_SIZE, checkpoints: int = CHECKPOINTS):
+        self.budget = budget if budget is not None else UNLIMITED
+        """Maximum amount of snapshots and of disk space."""
+        self.checkpoints = checkpoints
+        """Maximum amount of unclaimed checkpoints kept."""
+        self.snapshots = {}
+        """Snapshots tracked by the manager by identifier."""
+
+        self._state = state
+        self._pool = deque()
+        self._removed = set()
+        self._generation = 0
+        self._touched = True
+        self._queue = Queue(maxsize=pool_size)
+        # bookkeeping, never held while operating the device
+        self._lock = threading.RLock()
+        self._device_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name='SnapshotManager')
+        self._logger = logging.getLogger("%s.%s" % (self.__module__,
+                                                    self.__class__.__name__))
+
+        self._thread.start()
+
+    @property
+    def size(self) -> int:
+        """Disk space occupied by the tracked snapshots in bytes."""
+        with self._lock:
+            return sum(s.size for s in self.snapshots.values())
+
+    def save(self) -> str:
+        """Request a snapshot of the device state to be taken.
+
+        The latest checkpoint is claimed if the device
+        was not altered since. The snapshot identifier is returned.
+
+        """
+        with self._lock:
+            pinned = all(s.checkpoint for s in self.snapshots.values())
+
+            if self._pool and self._pool[-1].generation == self._generation:
+                snapshot = self._pool.pop()
+                snapshot.checkpoint = False
+                snapshot.pinned = snapshot.pinned or pinned
+
+                return snapshot.name
+
+            snapshot = self._new_snapshot(pinned=pinned)
+
+        self._queue.put((self._take, snapshot))
+
+        return snapshot.name
+
+    def checkpoint(self) -> str:
+        """Pre-create a checkpoint of the device state in background.
+
+        The checkpoint identifier is returned, the latest checkpoint
+        is reused if the device was not altered since.
+
+        """
+        with self._lock:
+            if self._pool and self._pool[-1].generation == self._generation:
+                return self._pool[-1].name
+
+            snapshot = self._new_snapshot(checkpoint=True)
+            self._pool.append(snapshot)
+
+            stale = []
+            while len(self._pool) > max(self.checkpoints, 1):
+                stale.append(self._pool.popleft())
+                self._remove(stale[-1])
+
+        self._queue.put((self._take, snapshot))
+        for expired in stale:
+            self._queue.put((self._discard, expired))
+
+        return snapshot.name
+
+    def touch(self) -> bool:
+        """Notify the manager that the device is about to be altered,
+        the current checkpoints will not be claimed by the next save.
+
+        Only the first notification following a snapshot request
+        is relevant, True is returned if the notification was.
+
+        """
+        with self._lock:
+            if self._touched:
+                return False
+
+            self._generation += 1
+            self._touched = True
+
+            return True
+
+    def restore(self, state: str):
+        """Restore the device to the given snapshot.
+
+        The pending snapshots are taken before restoring.
+
+        """
+        self.touch()
+        self.wait()
+
+        # the device lock prevents the snapshot eviction while restoring
+        with self._device_lock:
+            with self._lock:
+                snapshot = self._restorable(state)
+
+            self._state.restore(
+                snapshot.state if snapshot is not None else state)
+
+        if snapshot is not None:
+            with self._lock:
+                snapshot.restores += 1
+                snapshot.last_used = time.monotonic()
+
+    def discard(self, state: str):
+        """Discard the given snapshot once taken."""
+        with self._lock:
+            snapshot = self._snapshot(state)
+            self._remove(snapshot)
+
+        self._queue.put((self._discard, snapshot))
+
+    def pin(self, state: str):
+        """Prevent the given snapshot from being evicted."""
+        with self._lock:
+            self._snapshot(state).pinned = True
+
+    def wait(self):
+        """Wait for the pending snapshots to be taken."""
+        self._queue.join()
+
+    def close(self):
+        """Wait for the pending requests and stop the background thread."""
+        self.wait()
+        self._queue.put(None)
+        self._thread.join()
+
+    def _new_snapshot(self, pinned: bool = False,
+                      checkpoint: bool = False) -> Snapshot:
+        snapshot = Snapshot(uuid.uuid4().hex, self._generation,
+                            pinned=pinned, checkpoint=checkpoint)
+        self.snapshots[snapshot.name] = snapshot
+        self._touched = False
+
+        return snapshot
+
+    def _snapshot(self, state: str) -> Snapshot:
+        try:
+            return self.snapshots[state]
+        except KeyError:
+            raise RuntimeError(
+                "Unknown or evicted snapshot %s" % state) from None
+
+    def _restorable(self, state: str) -> (Snapshot, None):
+        """Return the tracked snapshot to be restored,
+        None if unknown to the manager.
+
+        A restored checkpoint is claimed.
+
+        """
+        if state in self._removed:
+            raise RuntimeError("Snapshot %s was evicted or discarded" % state)
+        if state not in self.snapshots:
+            return None
+
+        snapshot = self.snapshots[state]
+        if snapshot.error is not None:
+            raise RuntimeError(
+                "Snapshot %s not taken" % state) from snapshot.error
+
+        if snapshot.checkpoint:
+            snapshot.checkpoint = False
+            self._pool.remove(snapshot)
+
+        return snapshot
+
+    def _remove(self, snapshot: Snapshot):
+        """Stop tracking the snapshot."""
+        del self.snapshots[snapshot.name]
+        self._removed.add(snapshot.name)
+
+        if snapshot.checkpoint:
+            snapshot.checkpoint = False
+            if snapshot in self._pool:
+                self._pool.remove(snapshot)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+
+            try:
+                if job is None:
+                    return
+
+                operation, snapshot = job
+                operation(snapshot)
+            except Exception as error:
+                self._logger.exception("Snapshot %s error", snapshot.name)
+                snapshot.error = error
+            finally:
+                if job is not None:
+                    snapshot.ready.set()
+                self._queue.task_done()
+
+    def _take(self, snapshot: Snapshot):
+        with self._device_lock:
+            state = self._state.save(snapshot.name)
+            size = self._size(state)
+
+        with self._lock:
+            snapshot.state = state
+            snapshot.size = size
+            snapshot.last_used = time.monotonic()
+
+            self._logger.debug("Snapshot %s taken, %d bytes",
+                               snapshot.name, snapshot.size)
+
+            evicted = self._evict()
+
+        for expired in evicted:
+            with self._device_lock:
+                self._state.discard(expired.state)
+
+            self._logger.info("Snapshot %s evicted, age %ds",
+                              expired.name, expired.age)
+
+    def _discard(self, snapshot: Snapshot):
+        if snapshot.error is None and not snapshot.evicted:
+            with self._device_lock:
+                self._state.discard(snapshot.state)
+
+    def _evict(self) -> list:
+        """Select the least useful snapshots to be discarded
+        until within budget.
+
+        """
+        evicted = []
+        candidates = sorted((s for s in self.snapshots.values()
+                             if not s.pinned and s.ready.is_set() and
+                             s.error is None),
+                            key=lambda s: s.usefulness)
+
+        while candidates and self._over_budget():
+            snapshot = candidates.pop(0)
+            snapshot.evicted = True
+            self._remove(snapshot)
+            evicted.append(snapshot)
+
+        return evicted
+
+    def _over_budget(self) -> bool:
+        count, size = self.budget
+        snapshots = [s for s in self.snapshots.values() if s.error is None]
+
+        return ((count is not None and len(snapshots) > count) or
+                (size is not None and sum(s.size for s in snapshots) > size))
+
+    def _size(self, state: Any) -> int:
+        try:
+            return self._state.size(state)
+        except NotImplementedError:
+            return 0
+
+
+UNLIMITED = SnapshotBudget(None, None)
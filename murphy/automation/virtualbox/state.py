@@ -1,18 +1,49 @@
+import os
 import time
-
+import logging
 from datetime import datetime
+from typing import Callable
+
+from virtualbox.library import MachineState, SessionState
+from virtualbox.library import AdditionsRunLevelType
 
 from murphy.automation import MurphyFactory, DeviceState
 
 
+READY_TIMEOUT = 60
+POLL_INTERVAL = 0.2
+
+
 class VirtualboxState(DeviceState):
-    """VirtualBox based implementation of DeviceState."""
-    def __init__(self, factory: MurphyFactory):
+    """VirtualBox based implementation of DeviceState.
+
+    Restoring a snapshot is complete once the machine is running
+    and its Guest Additions reached the `ready_level`.
+    If the Guest Additions are not ready within `ready_timeout` seconds
+    the restore completes anyway.
+
+    """
+    def __init__(self, factory: MurphyFactory,
+                 ready_level: AdditionsRunLevelType = None,
+                 ready_timeout: float = READY_TIMEOUT):
+        self.ready_level = (ready_level if ready_level is not None
+                            else AdditionsRunLevelType.desktop)
+        self.ready_timeout = ready_timeout
+        self.restore_latency = 0.0
+        """Seconds taken by the last restore."""
+
         self._machine = factory()
+        self._logger = logging.getLogger("%s.%s" % (self.__module__,
+                                                    self.__class__.__name__))
+
+    def save(self, name: str = None) -> str:
+        """Take a snapshot of the device state.
 
-    def save(self) -> str:
-        """Take a snapshot of the device state."""
-        snapshot_name = datetime.now().isoformat()
+        The snapshot is named after the current time if no name is given.
+
+        """
+        snapshot_name = (name if name is not None
+                         else datetime.now().isoformat())
 
         with self._machine.create_session() as session:
             progress, _snapshot_id = session.machine.take_snapshot(
@@ -22,25 +53,109 @@ class VirtualboxState(DeviceState):
         return snapshot_name
 
     def restore(self, state: str):
-        """Restore the device state to the given snapshot."""
-        with self._machine.create_session() as session:
-            snapshot = session.machine.find_snapshot(state)
+        """Restore the device state to the given snapshot.
 
-            progress = session.console.power_down()
-            progress.wait_for_completion()
+        The machine is powered down only if running.
+        Instead of waiting for a fixed time, the machine and session states
+        are polled to detect when each step is complete.
+
+        """
+        start = time.monotonic()
+
+        self._power_down()
 
         with self._machine.create_session() as session:
+            snapshot = session.machine.find_snapshot(state)
             progress = session.machine.restore_snapshot(snapshot)
             progress.wait_for_completion()
 
         # Snapshot restoring progress does not block properly
-        time.sleep(3)
+        self._wait_unlocked()
+        self._logger.debug("Snapshot %s restored after %.1fs",
+                           state, time.monotonic() - start)
 
         progress = self._machine.launch_vm_process()
         progress.wait_for_completion()
 
+        self._wait_ready()
+
+        self.restore_latency = time.monotonic() - start
+        self._logger.info("Snapshot %s running after %.1fs",
+                          state, self.restore_latency)
+
     def discard(self, state: str):
         """Discard the given device state deleting its virtualbox snapshot."""
         with self._machine.create_session() as session:
             snapshot = session.machine.find_snapshot(state)
             session.machine.delete_snapshot(snapshot.id_p)
+
+    def size(self, state: str) -> int:
+        """Size of the differencing disk images
+        and of the saved memory of the snapshot.
+
+        """
+        snapshot = self._machine.find_snapshot(state)
+        machine = snapshot.machine
+        size = sum(attachment.medium.size
+                   for attachment in machine.medium_attachments
+                   if attachment.medium is not None)
+
+        if machine.state_file_path and os.path.exists(
+                machine.state_file_path):
+            size += os.path.getsize(machine.state_file_path)
+
+        return size
+
+    def _power_down(self):
+        if self._machine.state in STOPPED_STATES:
+            return
+
+        with self._machine.create_session() as session:
+            progress = session.console.power_down()
+            progress.wait_for_completion()
+
+        self._wait_unlocked()
+
+    def _wait_unlocked(self):
+        """Wait for the machine to be stopped and its session released."""
+        if not poll(lambda: (self._machine.state in STOPPED_STATES and
+                             self._machine.session_state ==
+                             SessionState.unlocked),
+                    UNLOCK_TIMEOUT):
+            raise RuntimeError("Machine session still locked after %ds" %
+                               UNLOCK_TIMEOUT)
+
+    def _wait_ready(self):
+        """Wait for the machine to run and its Guest Additions to be ready."""
+        if not poll(lambda: self._machine.state == MachineState.running,
+                    self.ready_timeout):
+            raise RuntimeError("Machine not running after %ds" %
+                               self.ready_timeout)
+
+        with self._machine.create_session() as session:
+            guest = session.console.guest
+
+            if not poll(lambda: (int(guest.additions_run_level) >=
+                                 int(self.ready_level)), self.ready_timeout):
+                self._logger.warning("Guest Additions not ready after %ds",
+                                     self.ready_timeout)
+
+
+def poll(condition: Callable, timeout: float,
+         interval: float = POLL_INTERVAL) -> bool:
+    """Poll the condition until it is True or the timeout expires."""
+    deadline = time.monotonic() + timeout
+
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+
+        time.sleep(interval)
+
+    return True
+
+
+UNLOCK_TIMEOUT = 30
+STOPPED_STATES = (MachineState.powered_off,
+                  MachineState.saved,
+                  MachineState.aborted)
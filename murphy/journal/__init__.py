@@ -1,5 +1,6 @@
 from murphy.journal.node import Node
 from murphy.journal.edge import Edge
 from murphy.journal.journal import Journal, Metadata
+from murphy.journal.concurrent import ConcurrentJournal
 
-__all__ = 'Edge', 'Node', 'Journal', 'Metadata'
+__all__ = 'Edge', 'Node', 'Journal', 'ConcurrentJournal', 'Metadata'
@@ -0,0 +1,245 @@
+"""Journal which can be shared among several threads.
+
+Nodes are bucketed by the fingerprint of their State and each bucket
+is guarded by one of a fixed set of locks. Lookups and insertions
+of States with different fingerprints proceed in parallel.
+
+Changes to the graph structure, Node and Edge insertions,
+are serialized by a graph lock held only for the insertion itself.
+Looking up an Edge and adding it if missing is atomic as well.
+
+Agents sharing the Action scores of a Node select and update them
+under the Node lock.
+
+Dumps and renderings work on a copy of the graph taken under the graph
+lock, the copy is then written and drawn without holding it.
+
+"""
+
+import threading
+from pathlib import Path
+from typing import Sequence
+
+from murphy.model import State, Action
+
+from murphy.journal.edge import Edge
+from murphy.journal.index import JournalIndex
+from murphy.journal.database import JournalDatabase
+from murphy.journal.node import Node, state_fingerprint
+from murphy.journal.journal import Journal, render_nodes, write_pending
+from murphy.journal.journal import dump_directory, DATABASE
+from murphy.journal.render import SELECTION_NAME
+
+
+STRIPES = 64
+"""Number of locks guarding the State buckets."""
+
+
+class ConcurrentJournal(Journal):
+    """Thread safe Journal.
+
+    The find_or_new_node method atomically returns the Node
+    of the given State adding it if not found: two threads
+    discovering the same State get the same Node.
+
+    Dumps and renderings see a consistent snapshot of the Journal graph,
+    insertions wait only for the snapshot to be taken.
+
+    The current Node is not meaningful if the Journal is explored
+    by multiple Agents, each should track its own.
+
+    """
+
+    __slots__ = ('_buckets', '_stripes', '_node_locks', '_dump_lock')
+
+    def __init__(self, path: Path, stripes: int = STRIPES):
+        super().__init__(path)
+
+        self._buckets = {}
+        self._stripes = tuple(threading.Lock() for _ in range(stripes))
+        self._node_locks = {}
+        self._dump_lock = threading.Lock()
+
+    @property
+    def index(self) -> JournalIndex:
+        with self._lock:
+            return super().index
+
+    def find_node(self, element: (Node, State)) -> (Node, None):
+        """If the given Node or State is in the Journal, return it."""
+        state = element.state if isinstance(element, Node) else element
+        fingerprint = state_fingerprint(state)
+
+        with self._stripe(fingerprint):
+            return self._lookup(fingerprint, state)
+
+    def find_or_new_node(self, state: State) -> tuple:
+        """Return the Node of the given State adding it if not found.
+
+        A flag telling whether the Node was added is returned as well.
+
+        """
+        fingerprint = state_fingerprint(state)
+
+        with self._stripe(fingerprint):
+            node = self._lookup(fingerprint, state)
+            if node is not None:
+                return node, False
+
+            return self._insert(fingerprint, Node(state)), True
+
+    def new_node(self, element: (Node, State)) -> Node:
+        node = element if isinstance(element, Node) else Node(element)
+        fingerprint = node.fingerprint
+
+        with self._stripe(fingerprint):
+            return self._insert(fingerprint, node)
+
+    def new_edge(self, node: Node, action: Action, successor: Node) -> Edge:
+        with self._lock:
+            return super().new_edge(node, action, successor)
+
+    def find_or_new_edge(self, node: Node, action: Action,
+                         successor: Node) -> tuple:
+        """Return the Edge linking the Node to its successor
+        via the Action adding it if not found.
+
+        Two threads performing the same transition get the same Edge.
+
+        """
+        with self._lock:
+            return super().find_or_new_edge(node, action, successor)
+
+    def node_lock(self, node: Node) -> threading.Lock:
+        """Return the lock guarding the Action scores of the Node."""
+        with self._lock:
+            return self._node_locks.setdefault(node, threading.Lock())
+
+    def snapshot(self) -> list:
+        """Return a copy of the Journal Nodes and Edges as of now.
+
+        The copies are not affected by later insertions.
+
+        """
+        with self._lock:
+            return copy_graph(self.nodes)
+
+    def dump(self, full: bool = False, format: str = 'directory'):
+        """Save a consistent snapshot of the Journal, see Journal.dump."""
+        self._dump(full, format, False)
+
+    def load(self, interpreter, format: str = 'directory'):
+        with self._lock:
+            super().load(interpreter, format=format)
+
+            self._buckets = {}
+            for node in self.nodes:
+                self._buckets.setdefault(node.fingerprint, []).append(node)
+
+    def render(self, format: str = 'html', nodes: Sequence = None,
+               name: str = SELECTION_NAME) -> Path:
+        """Render a consistent snapshot of the Journal,
+        see Journal.render.
+
+        Selections are copied under the graph lock without dumping.
+
+        """
+        if nodes is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+
+            with self._lock:
+                snapshot = copy_graph(nodes)
+
+            return render_nodes(snapshot, self.path, format, self.encoding,
+                                name)
+
+        snapshot = self._dump(False, 'directory', True)
+
+        return render_nodes(snapshot, self.path, format, self.encoding)
+
+    def _dump(self, full: bool, format: str, deferred: bool) -> list:
+        """Take a snapshot of the Journal, dump it and return it.
+
+        The writer is fed under the graph lock so that no insertion
+        is missed, waiting for it and writing happen outside.
+        See Journal._dump_directory for `deferred`.
+
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        with self._dump_lock:
+            with self._lock:
+                nodes = list(self.nodes)
+                if format == 'directory' and self.writer is not None:
+                    write_pending(nodes, self.writer,
+                                  self.keyframe_interval, deferred)
+                snapshot = copy_graph(nodes)
+
+            if format == 'directory':
+                if self.writer is not None:
+                    self.writer.flush()
+                    for element, copy in paired_elements(nodes, snapshot):
+                        copy.path, copy.image = element.path, element.image
+                if self.writer is None or full:
+                    dump_directory(snapshot, self.path, full, self.encoding,
+                                   self.keyframe_interval, deferred)
+                    for element, copy in paired_elements(nodes, snapshot):
+                        element.path, element.image = copy.path, copy.image
+            elif format == 'sqlite':
+                with JournalDatabase(self.path.joinpath(DATABASE),
+                                     self.encoding) as database:
+                    database.dump(snapshot, full)
+            else:
+                raise ValueError("Unsupported dump format: %s" % format)
+
+        return snapshot
+
+    def _stripe(self, fingerprint: str) -> threading.Lock:
+        return self._stripes[int(fingerprint[:8], 16) % len(self._stripes)]
+
+    def _lookup(self, fingerprint: str, state: State) -> (Node, None):
+        for node in self._buckets.get(fingerprint, ()):
+            if node.state == state:
+                return node
+
+        return None
+
+    def _insert(self, fingerprint: str, node: Node) -> Node:
+        with self._lock:
+            super().new_node(node)
+
+        self._buckets.setdefault(fingerprint, []).append(node)
+
+        return node
+
+
+def copy_graph(nodes: Sequence) -> list:
+    """Copy the Nodes and their Edges, States and Actions are shared."""
+    copies = {}
+
+    for node in nodes:
+        copy = copies[node] = Node(node.state)
+        copy.index, copy.path, copy.image = node.index, node.path, node.image
+        copy.metadata = set(node.metadata)
+
+    for node in nodes:
+        for edge in (e for e in node.edges if e.tail in copies):
+            copy = copies[node].new_edge(edge.action, copies[edge.tail])
+            copy.path, copy.image = edge.path, edge.image
+            copy.metadata = set(edge.metadata)
+
+    return list(copies.values())
+
+
+def paired_elements(nodes: Sequence, copies: Sequence):
+    """Yield the Nodes and Edges paired with their copies,
+    the copies must have been made via copy_graph.
+
+    """
+    selection = set(nodes)
+
+    for node, copy in zip(nodes, copies):
+        yield node, copy
+
+        edges = [e for e in node.edges if e.tail in selection]
+        yield from zip(edges, copy.edges)
@@ -0,0 +1,229 @@
+"""Single file SQLite storage for the Journal.
+
+Nodes, Edges, their Metadata and the related images are stored
+within the same database file instead of a directory tree.
+
+"""
+
+import json
+import sqlite3
+from io import BytesIO
+from pathlib import Path
+from typing import Sequence
+
+from PIL import Image
+
+from murphy.model import Interpreter
+
+from murphy.journal.node import Node
+from murphy.journal.metadata import Metadata
+from murphy.journal.images import image_digest
+from murphy.journal.encoding import ImageEncoding, DEFAULT_ENCODING
+from murphy.journal.edge import serialize_action, find_action
+
+
+class JournalDatabase:
+    """SQLite database containing a dumped Journal.
+
+    Insertions are batched within a single transaction per dump.
+    Nodes are indexed by window title and fingerprint.
+
+    """
+    def __init__(self, path: Path, encoding: ImageEncoding = DEFAULT_ENCODING):
+        self.path = path
+        """Path of the database file."""
+        self.encoding = encoding
+        """Encoding policy of the stored images."""
+
+        self._connection = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def open(self):
+        self._connection = sqlite3.connect(str(self.path))
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        self._connection.close()
+        self._connection = None
+
+    def dump(self, nodes: Sequence, full: bool = False):
+        """Store the given Nodes and their Edges within the database.
+
+        If `full` is True, all Nodes and Edges are written.
+        Otherwise, only the ones not yet stored will be added.
+
+        Metadata are always rewritten as they might change after the dump.
+
+        """
+        connection = self._connection
+        stored_nodes = set(r[0] for r in connection.execute(SELECT_NODE_IDS))
+        stored_edges = set(connection.execute(SELECT_EDGE_IDS))
+        stored_images = set(r[0] for r in connection.execute(SELECT_DIGESTS))
+
+        images = {}
+        node_rows = []
+        edge_rows = []
+        metadata_rows = []
+
+        for node in nodes:
+            if full or node.index not in stored_nodes:
+                digest = store_image(node.state.window.image, images)
+                node_rows.append((node.index,
+                                  node.state.window.title,
+                                  node.fingerprint,
+                                  json.dumps(node.state.serialize()),
+                                  digest))
+
+            metadata_rows.extend(metadata_row(m, node.index, None)
+                                 for m in node.metadata)
+
+            for position, edge in enumerate(node.edges):
+                if full or (node.index, position) not in stored_edges:
+                    action = serialize_action(edge.action)
+                    digest = store_image(edge.action.image, images)
+                    edge_rows.append((node.index,
+                                      position,
+                                      edge.tail.index,
+                                      json.dumps(action),
+                                      digest))
+
+                metadata_rows.extend(metadata_row(m, node.index, position)
+                                     for m in edge.metadata)
+
+        image_rows = ((d, encode_image(i, self.encoding))
+                      for d, i in images.items()
+                      if d not in stored_images)
+
+        with connection:
+            connection.executemany(INSERT_IMAGE, image_rows)
+            connection.executemany(INSERT_NODE, node_rows)
+            connection.executemany(INSERT_EDGE, edge_rows)
+            connection.execute(DELETE_METADATA)
+            connection.executemany(INSERT_METADATA, metadata_rows)
+
+    def load(self, interpreter: Interpreter) -> list:
+        """Load the Nodes and their Edges stored within the database.
+
+        The `interpreter` should be of the same type of the one used
+        for generating the stored States.
+
+        """
+        nodes = {}
+        connection = self._connection
+
+        for index, state, digest in connection.execute(SELECT_NODES):
+            state = interpreter.deserialize_state(
+                json.loads(state), self.load_image(digest))
+            node = Node(state)
+            node.index = index
+            nodes[index] = node
+
+        for head, _, tail, action in connection.execute(SELECT_EDGES):
+            head = nodes[head]
+            action = find_action(head.state, json.loads(action))
+            head.new_edge(action, nodes[tail])
+
+        for head, position, title, text, image in connection.execute(
+                SELECT_METADATA):
+            element = nodes[head] if position is None \
+                      else nodes[head].edges[position]
+            element.metadata.add(Metadata(title, text, Path(image)))
+
+        return list(nodes.values())
+
+    def load_image(self, digest: str) -> Image:
+        """Load the image with the given digest."""
+        cursor = self._connection.execute(SELECT_IMAGE, (digest, ))
+        data = cursor.fetchone()[0]
+
+        return Image.open(BytesIO(data))
+
+    def find_nodes(self, title: str = None, fingerprint: str = None) -> list:
+        """Return the indexes of the stored Nodes
+        matching the given title and/or fingerprint.
+
+        """
+        query = SELECT_NODE_IDS
+        clauses = []
+        parameters = []
+
+        if title is not None:
+            clauses.append('title = ?')
+            parameters.append(title)
+        if fingerprint is not None:
+            clauses.append('fingerprint = ?')
+            parameters.append(fingerprint)
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+
+        return [r[0] for r in self._connection.execute(query, parameters)]
+
+
+def store_image(image: Image, images: dict) -> (str, None):
+    """Add the image to the images dictionary indexed by its digest.
+
+    The digest is returned.
+
+    """
+    if not isinstance(image, Image.Image):
+        return None
+
+    digest = image_digest(image)
+    images.setdefault(digest, image)
+
+    return digest
+
+
+def encode_image(image: Image, encoding: ImageEncoding) -> bytes:
+    stream = BytesIO()
+    encoding.save(image, stream)
+
+    return stream.getvalue()
+
+
+def metadata_row(metadata: Metadata, head: int, position: (int, None)):
+    return head, position, metadata.title, metadata.text, str(metadata.image)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (digest TEXT PRIMARY KEY,
+                                   data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS nodes (id INTEGER PRIMARY KEY,
+                                  title TEXT,
+                                  fingerprint TEXT,
+                                  state TEXT NOT NULL,
+                                  image TEXT REFERENCES images(digest));
+CREATE TABLE IF NOT EXISTS edges (head INTEGER NOT NULL REFERENCES nodes(id),
+                                  position INTEGER NOT NULL,
+                                  tail INTEGER NOT NULL REFERENCES nodes(id),
+                                  action TEXT NOT NULL,
+                                  image TEXT REFERENCES images(digest),
+                                  PRIMARY KEY (head, position));
+CREATE TABLE IF NOT EXISTS metadata (head INTEGER NOT NULL,
+                                     position INTEGER,
+                                     title TEXT,
+                                     text TEXT,
+                                     image TEXT);
+CREATE INDEX IF NOT EXISTS nodes_title ON nodes (title);
+CREATE INDEX IF NOT EXISTS nodes_fingerprint ON nodes (fingerprint);
+CREATE INDEX IF NOT EXISTS edges_tail ON edges (tail);
+"""
+SELECT_NODE_IDS = "SELECT id FROM nodes"
+SELECT_EDGE_IDS = "SELECT head, position FROM edges"
+SELECT_DIGESTS = "SELECT digest FROM images"
+SELECT_NODES = "SELECT id, state, image FROM nodes ORDER BY id"
+SELECT_EDGES = "SELECT head, position, tail, action FROM edges " + \
+               "ORDER BY head, position"
+SELECT_METADATA = "SELECT head, position, title, text, image FROM metadata"
+SELECT_IMAGE = "SELECT data FROM images WHERE digest = ?"
+INSERT_IMAGE = "INSERT OR IGNORE INTO images VALUES (?, ?)"
+INSERT_NODE = "INSERT OR REPLACE INTO nodes VALUES (?, ?, ?, ?, ?)"
+INSERT_EDGE = "INSERT OR REPLACE INTO edges VALUES (?, ?, ?, ?, ?)"
+INSERT_METADATA = "INSERT INTO metadata VALUES (?, ?, ?, ?, ?)"
+DELETE_METADATA = "DELETE FROM metadata"
@@ -1,8 +1,12 @@
+import re
 import json
 from pathlib import Path
+from typing import Any, NamedTuple
 
 import PIL
-from murphy.model import Action
+from murphy.model import State, Action
+
+from murphy.journal.images import ImageStore
 
 
 class Edge:
@@ -11,7 +15,7 @@ class Edge:
 
     """
 
-    __slots__ = 'path', 'head', 'tail', 'action', 'metadata'
+    __slots__ = 'path', 'head', 'tail', 'image', 'action', 'metadata'
 
     def __init__(self, head: 'Node', tail: 'Node', action: Action):
         self.head = head       # type: Node
@@ -22,6 +26,8 @@ class Edge:
         """Action associated to the Edge."""
         self.path = None       # type: Path
         """Path where the Node is information is stored."""
+        self.image = None      # type: Path
+        """Path of the stored Action image."""
         self.metadata = set()  # type: Set[Metadata]
         """Additional Metadata added to the Edge."""
 
@@ -29,22 +35,112 @@ class Edge:
         return "%s -> %s -> %s" % (self.head, self.action.text, self.tail)
 
 
-def dump_edge(edge: Edge, path: Path, index: int, force: bool):
-    edge.path = path.joinpath("edge%d" % index)
-    image_path = edge.path.joinpath("edge.png")
-    edge_path = edge.path.joinpath("edge.json")
+EdgeDump = NamedTuple('EdgeDump', (('head', int),
+                                   ('index', int),
+                                   ('tail', int),
+                                   ('action', dict),
+                                   ('image', Any)))
+"""Snapshot of the Edge information to be dumped."""
+
+
+def dump_edge(edge: Edge, path: Path, index: int,
+              images: ImageStore, force: bool):
+    """Dump the Edge within the given Journal path.
+
+    The index is the position of the Edge within its head Node.
+
+    """
+    edge.path = path.joinpath("node%d" % edge.head.index, "edge%d" % index)
 
     if not edge.path.exists() or force:
-        dump = {'head': str(edge.head.path),
-                'tail': str(edge.tail.path),
-                'action': {'text': edge.action.text,
-                           'coordinates': edge.action.coordinates}}
+        _, edge.image = write_edge(edge_dump(edge, index), path, images)
+
+
+def edge_dump(edge: Edge, index: int) -> EdgeDump:
+    """Take a snapshot of the Edge information to be dumped."""
+    return EdgeDump(edge.head.index, index, edge.tail.index,
+                    serialize_action(edge.action), edge.action.image)
+
+
+def write_edge(dump: EdgeDump, path: Path, images: ImageStore) -> tuple:
+    """Write the Edge snapshot within the given Journal path.
+
+    The paths of the written files, images already stored excluded,
+    are returned together with the path of the Action image,
+    None if the Action has no image.
+
+    """
+    head_path = path.joinpath("node%d" % dump.head)
+    edge_path = head_path.joinpath("edge%d" % dump.index)
+    json_path = edge_path.joinpath("edge.json")
+    action = dict(dump.action)
+    written = [json_path]
+    image_path = None
+
+    if isinstance(dump.image, PIL.Image.Image):
+        image_path, new = images.add(dump.image)
+        action['image'] = str(image_path)
+        if new:
+            written.append(image_path)
+
+    edge = {'head': str(head_path),
+            'tail': str(path.joinpath("node%d" % dump.tail)),
+            'action': action}
+
+    edge_path.mkdir(parents=True, exist_ok=True)
+
+    with json_path.open('w') as edge_file:
+        json.dump(edge, edge_file)
+
+    return tuple(written), image_path
+
+
+def load_edge(path: Path, nodes: dict) -> Edge:
+    """Load an Edge previously dumped at the given path.
+
+    The Nodes at the head and at the tail of the Edge
+    are looked up by index within the given dictionary.
+
+    """
+    with path.joinpath('edge.json').open() as edge_file:
+        dump = json.load(edge_file)
+
+    head = nodes[node_index(dump['head'])]
+    tail = nodes[node_index(dump['tail'])]
+
+    edge = head.new_edge(find_action(head.state, dump['action']), tail)
+    edge.path = path
+
+    if 'image' in dump['action']:
+        edge.image = Path(dump['action']['image'])
+
+    return edge
+
+
+def serialize_action(action: Action) -> dict:
+    """Return a JSON serializable description of the Action."""
+    return {'text': action.text, 'coordinates': action.coordinates}
+
+
+def find_action(state: State, description: dict) -> Action:
+    """Find the Action matching the serialized description within the State.
+
+    LookupError is raised if no Action matches the description.
+
+    """
+    coordinates = tuple(description['coordinates'])
+
+    for action in state.actions:
+        if (action.text == description['text'] and
+                tuple(action.coordinates) == coordinates):
+            return action
+
+    raise LookupError("Action %s not found in %s" % (description, state))
+
 
-        edge.path.mkdir(parents=True)
+def node_index(path: str) -> int:
+    return int(Path(path).name[len('node'):])
 
-        if isinstance(edge.action.image, PIL.Image.Image):
-            edge.action.image.save(image_path)
-            dump['action']['image'] = str(image_path)
 
-        with edge_path.open('w') as edge_file:
-            json.dump(dump, edge_file)
+def element_index(path: Path) -> int:
+    return int(re.search(r'\d+$', path.name).group())
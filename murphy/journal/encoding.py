@@ -0,0 +1,87 @@
+"""Image encoding policies for dumping and rendering the Journal.
+
+Encoding images is the most expensive part of dumping a Journal.
+The policy allows to choose between speed and size of the output.
+
+"""
+
+from pathlib import Path
+from typing import BinaryIO
+
+from PIL import Image
+
+
+class ImageEncoding:
+    """Policy controlling how the Journal images are encoded.
+
+    The supported formats are:
+
+      * png: lossless PNG
+      * webp: lossless WebP
+      * raw: uncompressed TIFF
+
+    The compression ranges from 0 (fastest) to 9 (smallest output).
+
+    If optimize is True, an additional pass is run to reduce
+    the output size. The optimization pass is slow on large images.
+
+    """
+
+    __slots__ = 'format', 'compression', 'optimize'
+
+    def __init__(self, format: str = 'png', compression: int = 6,
+                 optimize: bool = False):
+        if format not in FORMATS:
+            raise ValueError("Unsupported image format: %s" % format)
+        if not 0 <= compression <= 9:
+            raise ValueError("Compression must be within 0 and 9")
+
+        self.format = format            # type: str
+        """Image file format."""
+        self.compression = compression  # type: int
+        """Trade-off between speed (0) and size (9)."""
+        self.optimize = optimize        # type: bool
+        """Whether to run the optimization pass."""
+
+    def __repr__(self):
+        return "ImageEncoding(%r, compression=%d, optimize=%r)" % (
+            self.format, self.compression, self.optimize)
+
+    @property
+    def extension(self) -> str:
+        """File extension of the encoded images."""
+        return FORMATS[self.format][1]
+
+    @property
+    def options(self) -> dict:
+        """Pillow save options implementing the policy."""
+        if self.format == 'png':
+            return {'compress_level': self.compression,
+                    'optimize': self.optimize}
+        if self.format == 'webp':
+            method = 6 if self.optimize else self.compression * 6 // 9
+
+            return {'lossless': True,
+                    'quality': self.compression * 100 // 9,
+                    'method': method}
+
+        return {'compression': None}
+
+    def save(self, image: Image, destination: (Path, BinaryIO)):
+        """Encode the image to the given destination."""
+        if isinstance(destination, Path):
+            destination = str(destination)
+
+        image.save(destination, format=FORMATS[self.format][0], **self.options)
+
+
+FORMATS = {'png': ('PNG', 'png'),
+           'webp': ('WEBP', 'webp'),
+           'raw': ('TIFF', 'tiff')}
+ENCODINGS = {'png': ImageEncoding(),
+             'fast': ImageEncoding('png', compression=1),
+             'small': ImageEncoding('png', compression=9, optimize=True),
+             'webp': ImageEncoding('webp'),
+             'raw': ImageEncoding('raw')}
+"""Predefined encoding policies."""
+DEFAULT_ENCODING = ENCODINGS['png']
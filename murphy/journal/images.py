@@ -0,0 +1,145 @@
+"""Content addressed storage for the Journal images.
+
+Images are stored once under the Journal root folder
+and are identified by the digest of their pixel data.
+
+Images can be stored as the difference against a reference image
+to save space when only small areas of the two images differ.
+
+Downscaled thumbnails of the stored images are cached
+for rendering the Journal graph.
+
+"""
+
+import os
+import threading
+from hashlib import sha1
+from pathlib import Path
+
+from PIL import Image, ImageChops
+
+from murphy.journal.encoding import ImageEncoding, DEFAULT_ENCODING
+
+
+THUMBNAIL_SIZE = 320, 240
+"""Maximum width and height of the thumbnails."""
+
+
+class ImageStore:
+    """Content addressed image store.
+
+    Each image is saved in a file named after the digest of its pixel data.
+    Storing an already known image does not encode nor write it again.
+
+    """
+    def __init__(self, path: Path, encoding: ImageEncoding = DEFAULT_ENCODING):
+        self.path = path
+        """Root folder of the image store."""
+        self.encoding = encoding
+        """Encoding policy of the stored images."""
+
+    def __contains__(self, digest: str) -> bool:
+        return self.blob_path(digest).exists()
+
+    def store(self, image: Image) -> Path:
+        """Store the image if not already present and return its path."""
+        return self.add(image)[0]
+
+    def add(self, image: Image) -> tuple:
+        """Store the image if not already present.
+
+        Return its path and whether the image was written.
+
+        """
+        digest = image_digest(image)
+        path = self.blob_path(digest)
+
+        if path.exists():
+            return path, False
+
+        self.write(image, path)
+
+        return path, True
+
+    def write(self, image: Image, path: Path):
+        """Atomically write the image at the given path."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = temporary_path(path)
+        self.encoding.save(image, temporary)
+        os.replace(str(temporary), str(path))
+
+    def blob_path(self, digest: str) -> Path:
+        """Return the path of the image with the given digest."""
+        return self.path.joinpath(
+            digest[:2], '%s.%s' % (digest, self.encoding.extension))
+
+
+class ThumbnailStore(ImageStore):
+    """Store of downscaled copies of the images within an ImageStore.
+
+    Thumbnails are named after the digest of their source image,
+    each source image is scaled down only once.
+
+    """
+    def __init__(self, path: Path, size: tuple = THUMBNAIL_SIZE,
+                 encoding: ImageEncoding = DEFAULT_ENCODING):
+        super().__init__(path.joinpath('%dx%d' % size), encoding)
+        self.size = size
+        """Maximum width and height of the thumbnails."""
+
+    def thumbnail(self, source: Path) -> Path:
+        """Return the path of the thumbnail of the stored source image,
+        the thumbnail is generated if not already present.
+
+        """
+        path = self.blob_path(source.stem)
+
+        if not path.exists():
+            with Image.open(str(source)) as image:
+                image.thumbnail(self.size)
+                self.write(image, path)
+
+        return path
+
+
+def temporary_path(path: Path) -> Path:
+    """Path where to write the file before moving it at the given path.
+
+    The name is unique to the writing process and thread
+    as the same image might be stored by several writers at once.
+
+    """
+    return path.with_name('%s.%d-%d.tmp' % (
+        path.name, os.getpid(), threading.get_ident()))
+
+
+def image_digest(image: Image) -> str:
+    """Digest of the image pixel data."""
+    digest = sha1('{}{}'.format(image.mode, image.size).encode())
+    digest.update(image.tobytes())
+
+    return digest.hexdigest()
+
+
+def delta_image(image: Image, reference: Image) -> (Image, None):
+    """Return the difference modulo 256 between the image and the reference.
+
+    None is returned if the two images cannot be compared.
+
+    """
+    if (image.size != reference.size or image.mode != reference.mode or
+            image.mode not in DELTA_MODES):
+        return None
+
+    return ImageChops.subtract_modulo(image, reference)
+
+
+def apply_delta(delta: Image, reference: Image) -> Image:
+    """Reconstruct the image from its difference against the reference."""
+    return ImageChops.add_modulo(reference, delta)
+
+
+IMAGE_STORE = 'images'
+THUMBNAIL_STORE = 'images/thumbnails'
+RENDER_STORE = 'images/render'
+DELTA_MODES = 'L', 'RGB', 'RGBA'
@@ -0,0 +1,238 @@
+"""Reachability and distance index of the Journal graph.
+
+The Journal graph is stored in compact adjacency arrays
+where Nodes are identified by their position within the Journal.
+
+Shortest paths are answered from breadth first search trees
+cached per source Node. Reachability is answered from the transitive
+closure of the graph stored as one bitset per strongly connected component.
+
+"""
+
+from array import array
+from collections import deque, OrderedDict
+from typing import Sequence, Tuple
+
+from murphy.journal.node import Node
+from murphy.journal.edge import Edge
+
+
+CACHE_SIZE = 256
+"""Maximum amount of search trees cached by the index."""
+
+
+class JournalIndex:
+    """Index answering path queries over a snapshot of the Journal graph.
+
+    The index does not follow the changes of the graph,
+    a new index must be built once Nodes or Edges are added.
+
+    """
+    def __init__(self, nodes: Sequence, cache_size: int = CACHE_SIZE):
+        self.nodes = tuple(nodes)
+        """Indexed Nodes, their position is their identifier."""
+        self.cache_size = cache_size
+        """Maximum amount of search trees cached by the index."""
+
+        self._ids = {node: i for i, node in enumerate(self.nodes)}
+        self._edges = []
+        self._offsets = array('l', [0])
+        self._targets = array('l')
+        self._trees = OrderedDict()
+        self._closure = None
+
+        for node in self.nodes:
+            for edge in node.edges:
+                if edge.tail in self._ids:
+                    self._edges.append(edge)
+                    self._targets.append(self._ids[edge.tail])
+            self._offsets.append(len(self._targets))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def distance(self, source: Node, target: Node) -> int:
+        """Length of the shortest path between the two Nodes.
+
+        LookupError is raised if the target is not reachable.
+
+        """
+        distance = self._search(self._id(source))[0][self._id(target)]
+        if distance < 0:
+            raise LookupError(
+                "No path found between %s and %s" % (source, target))
+
+        return distance
+
+    def distances(self, source: Node) -> dict:
+        """Length of the shortest paths from the source Node
+        to all the reachable ones.
+
+        """
+        distances = self._search(self._id(source))[0]
+
+        return {self.nodes[i]: d for i, d in enumerate(distances) if d >= 0}
+
+    def find_path(self, source: Node, target: Node) -> (Tuple[Edge], None):
+        """Shortest path between the two Nodes as a tuple of Edges.
+
+        None is returned if no Path was found.
+        An empty tuple is returned if the two nodes are the same.
+
+        """
+        source_id = self._id(source)
+        distances, parents = self._search(source_id)
+        current = self._id(target)
+
+        if distances[current] < 0:
+            return None
+
+        path = deque()
+        while current != source_id:
+            edge = self._edges[parents[current]]
+            path.appendleft(edge)
+            current = self._ids[edge.head]
+
+        return tuple(path)
+
+    def reachable(self, source: Node, target: Node) -> bool:
+        """True if the target Node is reachable from the source one."""
+        return bool(self._reach(self._id(source)) >> self._id(target) & 1)
+
+    def reachable_nodes(self, source: Node) -> list:
+        """Nodes reachable from the source one, itself included."""
+        reach = self._reach(self._id(source))
+
+        return [n for i, n in enumerate(self.nodes) if reach >> i & 1]
+
+    def _id(self, node: Node) -> int:
+        try:
+            return self._ids[node]
+        except KeyError:
+            raise LookupError("Node %s not indexed" % node) from None
+
+    def _search(self, source: int) -> tuple:
+        """Breadth first search tree rooted at the source.
+
+        Distances and parent Edges of the unreachable Nodes are -1.
+
+        """
+        try:
+            self._trees.move_to_end(source)
+            return self._trees[source]
+        except KeyError:
+            pass
+
+        offsets, targets = self._offsets, self._targets
+        distances = array('l', [-1]) * len(self.nodes)
+        parents = array('l', [-1]) * len(self.nodes)
+        distances[source] = 0
+        queue = deque((source, ))
+
+        while queue:
+            current = queue.popleft()
+
+            for edge in range(offsets[current], offsets[current + 1]):
+                successor = targets[edge]
+                if distances[successor] < 0:
+                    distances[successor] = distances[current] + 1
+                    parents[successor] = edge
+                    queue.append(successor)
+
+        self._trees[source] = distances, parents
+        if len(self._trees) > self.cache_size:
+            self._trees.popitem(last=False)
+
+        return distances, parents
+
+    def _reach(self, node: int) -> int:
+        if self._closure is None:
+            self._closure = transitive_closure(self._offsets, self._targets)
+
+        return self._closure[node]
+
+
+def transitive_closure(offsets: array, targets: array) -> list:
+    """Compute the set of reachable Nodes of each Node as a bitset.
+
+    Nodes within the same strongly connected component share their bitset.
+
+    """
+    components, membership = strong_components(offsets, targets)
+    reach = []
+
+    # components are sorted in reverse topological order
+    for component, members in enumerate(components):
+        bits = 0
+
+        for node in members:
+            bits |= 1 << node
+            for edge in range(offsets[node], offsets[node + 1]):
+                successor = membership[targets[edge]]
+                if successor != component:
+                    bits |= reach[successor]
+
+        reach.append(bits)
+
+    return [reach[component] for component in membership]
+
+
+def strong_components(offsets: array, targets: array) -> tuple:
+    """Iterative Tarjan's strongly connected components algorithm.
+
+    Returns the list of components in reverse topological order
+    and the component of each Node.
+
+    """
+    size = len(offsets) - 1
+    order = [-1] * size
+    lowlink = [0] * size
+    membership = [-1] * size
+    on_stack = [False] * size
+    components = []
+    stack = []
+    counter = 0
+
+    for root in range(size):
+        if order[root] >= 0:
+            continue
+
+        order[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, offsets[root])]
+
+        while work:
+            node, edge = work[-1]
+
+            if edge < offsets[node + 1]:
+                work[-1] = node, edge + 1
+                successor = targets[edge]
+
+                if order[successor] < 0:
+                    order[successor] = lowlink[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack[successor] = True
+                    work.append((successor, offsets[successor]))
+                elif on_stack[successor]:
+                    lowlink[node] = min(lowlink[node], order[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                if lowlink[node] == order[node]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        membership[member] = len(components)
+                        members.append(member)
+                        if member == node:
+                            break
+                    components.append(members)
+
+    return components, membership
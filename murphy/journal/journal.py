@@ -1,14 +1,24 @@
+import threading
 from pathlib import Path
-from itertools import count
-
-from murphy.model import State, Interpreter
-
-from murphy.journal.edge import dump_edge
-from murphy.journal.node import Node, dump_node
+from itertools import chain, count
+from typing import Callable, Sequence
+from collections import deque, defaultdict
+
+from murphy.model import State, Action, Interpreter
+
+from murphy.journal.metadata import Metadata
+from murphy.journal.images import ImageStore, IMAGE_STORE
+from murphy.journal.encoding import ImageEncoding, DEFAULT_ENCODING
+from murphy.journal.index import JournalIndex
+from murphy.journal.writer import JournalWriter
+from murphy.journal.database import JournalDatabase
+from murphy.journal.edge import Edge, dump_edge, load_edge, element_index
+from murphy.journal.node import Node, dump_node, load_node
+from murphy.journal.merge import merge_journals
+from murphy.journal.tiles import render_tiles
+from murphy.journal.viewer import render_viewer
 from murphy.journal.render import render_dot, render_html
-
-
-METADATA_ICON = Path(__file__).parent.joinpath('images/info.png')
+from murphy.journal.render import JOURNAL_NAME, SELECTION_NAME
 
 
 class Journal:
@@ -20,9 +30,14 @@ class Journal:
 
     The Journal can be saved and rendered in multiple formats.
 
+    Insertions and dumps are serialized so that the Journal
+    can be dumped and rendered from a background thread.
+
     """
 
-    __slots__ = 'nodes', 'path', 'current_node', '_node_count'
+    __slots__ = ('nodes', 'path', 'current_node', 'encoding',
+                 'keyframe_interval', 'writer', '_node_count', '_depths',
+                 '_index', '_lock')
 
     def __init__(self, path: Path):
         self.nodes = []
@@ -31,8 +46,21 @@ class Journal:
         """Current position within the Journal."""
         self.path = path
         """Journal folder path."""
+        self.encoding = DEFAULT_ENCODING  # type: ImageEncoding
+        """Encoding policy for the dumped and rendered images."""
+        self.keyframe_interval = 0
+        """If greater than zero, the Node images are dumped as the difference
+        against their predecessor and a full image is stored
+        once every `keyframe_interval` Nodes.
+
+        """
+        self.writer = None  # type: JournalWriter
+        """If set, new Nodes and Edges are dumped in the background."""
 
+        self._index = None
+        self._depths = {}
         self._node_count = count()
+        self._lock = threading.RLock()
 
     def __contains__(self, element: ('Node', State)) -> bool:
         """Return True if the Node or State is in the Journal."""
@@ -49,6 +77,78 @@ class Journal:
         except IndexError:
             return None
 
+    @property
+    def index(self) -> JournalIndex:
+        """Reachability and distance index of the Journal graph.
+
+        The index is rebuilt on access once Nodes or Edges
+        are added via the `new_node` and `new_edge` methods.
+
+        """
+        if self._index is None:
+            self._index = JournalIndex(self.nodes)
+
+        return self._index
+
+    def depth(self, node: Node) -> int:
+        """Return the length of the shortest path
+        from the initial Node to the given one.
+
+        Depths are updated as Edges are added via the `new_edge` method.
+
+        LookupError is raised if the Node is not reachable.
+
+        """
+        try:
+            return self._depths[node]
+        except KeyError:
+            raise LookupError("No path found between %s and %s" %
+                              (self.initial_node, node)) from None
+
+    def path_to(self, node: Node) -> list:
+        """Return the Nodes along the shortest path
+        from the initial Node to the given one.
+
+        LookupError is raised if the Node is not reachable.
+
+        """
+        path = self.index.find_path(self.initial_node, node)
+        if path is None:
+            raise LookupError("No path found between %s and %s" %
+                              (self.initial_node, node))
+
+        return [self.initial_node] + [edge.tail for edge in path]
+
+    def neighbourhood(self, node: Node, hops: int = 1) -> list:
+        """Return the Nodes within `hops` Edges from the given one
+        regardless of the Edges direction.
+
+        """
+        predecessors = defaultdict(list)
+        for head in self.nodes:
+            for edge in head.edges:
+                predecessors[edge.tail].append(head)
+
+        distances = {node: 0}
+        queue = deque((node, ))
+
+        while queue:
+            current = queue.popleft()
+            if distances[current] == hops:
+                continue
+
+            for neighbour in chain((e.tail for e in current.edges),
+                                   predecessors[current]):
+                if neighbour not in distances:
+                    distances[neighbour] = distances[current] + 1
+                    queue.append(neighbour)
+
+        return sorted(distances, key=lambda n: n.index)
+
+    def nodes_since(self, index: int) -> list:
+        """Return the Nodes added to the Journal from the given index."""
+        return [node for node in self.nodes if node.index >= index]
+
     def find_node(self, element: ('Node', State)) -> ('Node', None):
         """If the given Node or State is in the Journal, return it."""
         state = element.state if isinstance(element, Node) else element
@@ -66,85 +166,356 @@ class Journal:
 
         """
         node = element if isinstance(element, Node) else Node(element)
-        node.index = next(self._node_count)
 
-        self.nodes.append(node)
+        with self._lock:
+            node.index = next(self._node_count)
+
+            self.nodes.append(node)
+            self._index = None
+
+            if node is self.initial_node:
+                self._depths[node] = 0
+
+            # Delta encoded Nodes are written once their predecessor is known
+            if self.writer is not None and not self._delta_encoded(node):
+                self.writer.write_node(node)
 
         return node
 
-    def dump(self, full: bool = False):
+    def new_edge(self, node: Node, action: Action, successor: Node) -> Edge:
+        """Link the given Node to its successor via the Action.
+
+        The new Edge is returned.
+
+        """
+        with self._lock:
+            edge = node.new_edge(action, successor)
+            self._index = None
+
+            update_depths(self._depths, node, successor)
+
+            if self.writer is not None:
+                if node.path is None:
+                    self.writer.write_node(node)
+                if successor.path is None:
+                    self.writer.write_node(successor, delta_reference(
+                        edge, self.keyframe_interval))
+
+                self.writer.write_edge(edge, len(node.edges) - 1)
+
+        return edge
+
+    def find_or_new_edge(self, node: Node, action: Action,
+                         successor: Node) -> tuple:
+        """Return the Edge linking the Node to its successor
+        via the Action adding it if not found.
+
+        A flag telling whether the Edge was added is returned as well.
+
+        """
+        with self._lock:
+            for edge in node.find_edges(action):
+                if edge.tail == successor:
+                    return edge, False
+
+            return self.new_edge(node, action, successor), True
+
+    def update_node(self, node: Node):
+        """Write the Node again as its State changed,
+        for example once the device state has been saved.
+
+        Nodes not written yet are left to the next write,
+        delta encoded Nodes keep being encoded against their predecessor.
+
+        """
+        with self._lock:
+            if node.path is None:
+                return
+
+            reference = delta_references(
+                self.nodes, self.keyframe_interval).get(node)
+
+            if self.writer is not None:
+                self.writer.write_node(node, reference)
+            else:
+                dump_node(node, self.path,
+                          ImageStore(self.path.joinpath(IMAGE_STORE),
+                                     self.encoding), True, reference)
+
+    def dump(self, full: bool = False, format: str = 'directory'):
         """Save the journal at its root path.
 
         If `full` is True, the whole Journal gets dumped.
         Otherwise, only the information added since the last dump will be saved.
 
-        """
-        self.path.mkdir(parents=True, exist_ok=True)
+        If a writer is set, the method waits for it to complete writing.
 
-        for node in self.nodes:
-            edge_index = count()
+        The supported formats are:
+
+          * directory: one folder per Node and per Edge
+          * sqlite: a single SQLite database file
 
-            dump_node(node, self.path, full)
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
 
-            for edge in node.edges:
-                dump_edge(edge, node.path, next(edge_index), full)
+        if format == 'directory':
+            self._dump_directory(full, False)
+        elif format == 'sqlite':
+            with JournalDatabase(self.path.joinpath(DATABASE),
+                                 self.encoding) as database:
+                database.dump(list(self.nodes), full)
+        else:
+            raise ValueError("Unsupported dump format: %s" % format)
 
-    def load(self, interpreter: Interpreter):
+    def load(self, interpreter: Interpreter, format: str = 'directory'):
         """Load a Journal from its root folder.
 
         The `interpreter` should be of the same type of the one used
         for generating the States encapsulated by the Journal Nodes.
 
+        The `format` must match the one used when dumping the Journal.
+
+        """
+        if format == 'directory':
+            nodes = load_directory(self.path, interpreter)
+        elif format == 'sqlite':
+            with JournalDatabase(self.path.joinpath(DATABASE)) as database:
+                nodes = database.load(interpreter)
+        else:
+            raise ValueError("Unsupported load format: %s" % format)
+
+        with self._lock:
+            self.nodes = nodes
+            self.current_node = None
+            self._index = None
+            self._depths = node_depths(self.initial_node)
+            self._node_count = count(
+                max((n.index for n in nodes), default=-1) + 1)
+
+    def merge(self, paths: Sequence,
+              interpreter: Callable[[], Interpreter],
+              processes: int = None) -> dict:
+        """Merge the Journals dumped in the given folders
+        into the Journal root folder, see merge_journals
+        for the `interpreter` factory.
+
+        The merged Journal can then be loaded via the load method.
+
         """
-        raise NotImplementedError()
+        return merge_journals(paths, self.path, interpreter,
+                              encoding=self.encoding, processes=processes)
+
+    def _dump_directory(self, full: bool, deferred: bool):
+        """Dump the Journal in the directory format.
 
-    def render(self, format: str = 'html') -> Path:
+        If `deferred` is True, delta encoded Nodes not linked yet
+        are left to be written once their predecessor is known.
+
+        """
+        if self.writer is not None:
+            with self._lock:
+                write_pending(self.nodes, self.writer,
+                              self.keyframe_interval, deferred)
+            self.writer.flush()
+        if self.writer is None or full:
+            with self._lock:
+                dump_directory(self.nodes, self.path, full, self.encoding,
+                               self.keyframe_interval, deferred)
+
+    def _delta_encoded(self, node: Node) -> bool:
+        interval = self.keyframe_interval
+
+        return interval > 0 and node.index % interval != 0
+
+    def render(self, format: str = 'html', nodes: Sequence = None,
+               name: str = SELECTION_NAME) -> Path:
         """Render the Journal as a file with the given format.
 
         The supported rendering formats are listed here:
 
           https://www.graphviz.org/doc/info/output.html
 
-        Two additional formats are supported:
+        Four additional formats are supported:
 
           * html: a HTML page mapped on top of a PNG image
           * html_embedded: same as `html` but with the PNG image embedded
+          * viewer: an interactive HTML page drawing the graph in the browser
+          * tiles: a deep zoom tile pyramid browsable through a HTML page
+
+        If a selection of `nodes` is given, only the selected Nodes
+        and the Edges among them are rendered in files named after
+        `name`, leaving the rendered Journal untouched. See the `path_to`,
+        `neighbourhood` and `nodes_since` methods.
 
         The path of the rendered Journal is returned.
 
-        This method triggers a Journal dump.
+        Rendering the whole Journal triggers a Journal dump, delta encoded
+        Nodes not linked yet are left to be written once linked.
 
         """
-        self.dump()
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        if nodes is not None:
+            return render_nodes(nodes, self.path, format, self.encoding, name)
+
+        self._dump_directory(False, True)
+
+        return render_nodes(list(self.nodes), self.path, format,
+                            self.encoding)
+
+
+def render_nodes(nodes: Sequence, path: Path, format: str,
+                 encoding: ImageEncoding, name: str = JOURNAL_NAME) -> Path:
+    """Render the given Nodes in the given format, see Journal.render."""
+    if format == 'html':
+        return render_html(nodes, path, encoding, name=name)
+
+    if format == 'html_embedded':
+        return render_html(nodes, path, encoding, embed=True, name=name)
+
+    if format == 'viewer':
+        return render_viewer(nodes, path, name)
+
+    if format == 'tiles':
+        return render_tiles(nodes, path, encoding, name=name)
+
+    return render_dot(nodes, path, format, encoding, name)
+
+
+def dump_directory(nodes: list, path: Path, full: bool,
+                   encoding: ImageEncoding, keyframe_interval: int,
+                   deferred: bool = False):
+    images = ImageStore(path.joinpath(IMAGE_STORE), encoding)
+    references = delta_references(nodes, keyframe_interval)
+    skipped = unlinked_deltas(nodes, keyframe_interval) if deferred else ()
+
+    # Edges refer to their tail Node path, Nodes must be dumped first
+    for node in (n for n in nodes if n not in skipped):
+        dump_node(node, path, images, full, references.get(node))
+
+    for node in (n for n in nodes if n not in skipped):
+        for edge_index, edge in enumerate(node.edges):
+            dump_edge(edge, path, edge_index, images, full)
+
+
+def load_directory(path: Path, interpreter: Interpreter) -> list:
+    nodes = {}
+    node_paths = sorted(path.glob('node*'), key=element_index)
+
+    # Delta encoded Nodes refer to Nodes with lower index
+    for node_path in node_paths:
+        node = load_node(node_path, interpreter, nodes)
+        nodes[node.index] = node
+
+    for node in nodes.values():
+        for edge_path in sorted(node.path.glob('edge*'), key=element_index):
+            load_edge(edge_path, nodes)
+
+    return list(nodes.values())
+
 
-        if format == 'html':
-            return render_html(self.nodes, self.path)
+def write_pending(nodes: list, writer: JournalWriter, keyframe_interval: int,
+                  deferred: bool = False):
+    """Queue the Nodes and Edges which were not written yet.
 
-        if format == 'html_embedded':
-            return render_html(self.nodes, self.path, embed=True)
+    If `deferred` is True, delta encoded Nodes not linked yet are skipped.
 
-        return render_dot(self.nodes, self.path, format)
+    """
+    references = delta_references(nodes, keyframe_interval)
+    skipped = unlinked_deltas(nodes, keyframe_interval) if deferred else ()
+
+    for node in (n for n in nodes if n.path is None and n not in skipped):
+        writer.write_node(node, references.get(node))
+
+    for node in (n for n in nodes if n.path is not None):
+        for edge_index, edge in enumerate(node.edges):
+            if edge.path is None:
+                writer.write_edge(edge, edge_index)
+
+
+def unlinked_deltas(nodes: list, keyframe_interval: int) -> set:
+    """Nodes to be delta encoded which no Edge reaches yet."""
+    if keyframe_interval <= 0:
+        return set()
+
+    linked = set(e.tail for n in nodes for e in n.edges)
+
+    return set(n for n in nodes
+               if n.index % keyframe_interval != 0 and n not in linked)
+
+
+def delta_references(nodes: list, keyframe_interval: int) -> dict:
+    """Map each Node to the predecessor its image is delta encoded against.
+
+    The predecessor is the head of the first Edge reaching the Node
+    from an older one. Nodes with index multiple of the keyframe interval
+    and Nodes without predecessors within the same interval are keyframes.
+
+    """
+    references = {}
+
+    if keyframe_interval <= 0:
+        return references
+
+    for node in nodes:
+        for edge in (e for e in node.edges if e.tail not in references):
+            reference = delta_reference(edge, keyframe_interval)
+            if reference is not None:
+                references[edge.tail] = reference
+
+    return references
 
 
-class Metadata:
-    """Additional information to append to Nodes and Edges.
+def delta_reference(edge: Edge, keyframe_interval: int) -> (Node, None):
+    """Return the Edge head if the tail image can be delta encoded against it.
 
-    This affects mostly the HTML rendering type.
+    Only older Nodes within the same keyframe interval are valid references.
 
     """
+    if keyframe_interval <= 0:
+        return None
+
+    tail = edge.tail.index
+    keyframe = tail - tail % keyframe_interval
+
+    return edge.head if keyframe <= edge.head.index < tail else None
+
+
+def node_depths(node: Node) -> dict:
+    """Breadth first search of the shortest distances from the given Node."""
+    if node is None:
+        return {}
+
+    depths = {node: 0}
+    queue = deque((node, ))
+
+    while queue:
+        current = queue.popleft()
+
+        for edge in current.edges:
+            if edge.tail not in depths:
+                depths[edge.tail] = depths[current] + 1
+                queue.append(edge.tail)
+
+    return depths
+
+
+def update_depths(depths: dict, head: Node, tail: Node):
+    """Propagate the depth decrease if the Edge between head and tail
+    offers a shorter path to the tail Node and its successors.
+
+    """
+    if head not in depths:
+        return
+
+    queue = deque(((tail, depths[head] + 1), ))
 
-    __slots__ = 'title', 'text', 'image'
+    while queue:
+        node, depth = queue.popleft()
 
-    def __init__(self, title: str, text: str, image: Path = METADATA_ICON):
-        self.text = text    # type: str
-        """Text to show on User click."""
-        self.title = title  # type: str
-        """Text to show as tooltip."""
-        self.image = image  # type: Path
-        """Image or icon to associate to the Metadata element."""
+        if node not in depths or depth < depths[node]:
+            depths[node] = depth
+            queue.extend((edge.tail, depth + 1) for edge in node.edges)
 
-    def __eq__(self, metadata: 'EdgeMeta') -> bool:
-        return self.title == metadata.title and self.text == metadata.text
 
-    def __hash__(self):
-        return hash(self.title) + hash(self.text)
+DATABASE = 'journal.db'
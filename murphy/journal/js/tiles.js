@@ -0,0 +1,117 @@
+// MrMurphy Travel Journal deep zoom viewer.
+//
+// Shows the tiles of the pyramid level closest to the current zoom.
+// Only the tiles within the view are loaded, the others are discarded.
+
+(function () {
+    'use strict';
+
+    var pyramid = JSON.parse(document.getElementById('pyramid').textContent);
+    var canvas = document.getElementById('canvas');
+    var view = {x: 0, y: 0, zoom: 1};  // zoom in screen pixels per pixel
+    var tiles = {};
+
+    function levelFor(zoom) {
+        var level = pyramid.levels + Math.ceil(Math.log2(zoom));
+
+        return Math.max(0, Math.min(pyramid.levels, level));
+    }
+
+    function tileUrl(level, column, row) {
+        return pyramid.folder + '/' + level + '/' + column + '_' + row +
+            '.' + pyramid.format;
+    }
+
+    function update() {
+        var level = levelFor(view.zoom);
+        var scale = Math.pow(2, level - pyramid.levels);
+        var size = pyramid.tileSize / scale * view.zoom;
+        var columns = Math.ceil(Math.ceil(pyramid.width * scale) /
+                                pyramid.tileSize);
+        var rows = Math.ceil(Math.ceil(pyramid.height * scale) /
+                             pyramid.tileSize);
+        var first = {
+            column: Math.max(0, Math.floor(-view.x / size)),
+            row: Math.max(0, Math.floor(-view.y / size))
+        };
+        var last = {
+            column: Math.min(columns - 1,
+                             Math.floor((canvas.clientWidth - view.x) / size)),
+            row: Math.min(rows - 1,
+                          Math.floor((canvas.clientHeight - view.y) / size))
+        };
+        var visible = {};
+
+        for (var row = first.row; row <= last.row; row++) {
+            for (var column = first.column; column <= last.column; column++) {
+                var key = level + '/' + column + '_' + row;
+                var tile = tiles[key];
+
+                if (!tile) {
+                    tile = document.createElement('img');
+                    tile.src = tileUrl(level, column, row);
+                    tile.draggable = false;
+                    canvas.appendChild(tile);
+                }
+
+                tile.style.left = (view.x + column * size) + 'px';
+                tile.style.top = (view.y + row * size) + 'px';
+                tile.style.width = 'auto';
+                tile.style.height = 'auto';
+                tile.style.transformOrigin = '0 0';
+                tile.style.transform = 'scale(' + (view.zoom / scale) + ')';
+                visible[key] = tile;
+            }
+        }
+
+        Object.keys(tiles).forEach(function (key) {
+            if (!(key in visible)) {
+                canvas.removeChild(tiles[key]);
+            }
+        });
+        tiles = visible;
+    }
+
+    function fit() {
+        view.zoom = Math.min(canvas.clientWidth / pyramid.width,
+                             canvas.clientHeight / pyramid.height, 1);
+        view.x = (canvas.clientWidth - pyramid.width * view.zoom) / 2;
+        view.y = (canvas.clientHeight - pyramid.height * view.zoom) / 2;
+        update();
+    }
+
+    function enablePanZoom() {
+        var dragging = null;
+
+        canvas.addEventListener('wheel', function (event) {
+            var factor = event.deltaY < 0 ? 1.2 : 1 / 1.2;
+            var bounds = canvas.getBoundingClientRect();
+            var x = event.clientX - bounds.left;
+            var y = event.clientY - bounds.top;
+
+            event.preventDefault();
+            view.x = x - (x - view.x) * factor;
+            view.y = y - (y - view.y) * factor;
+            view.zoom *= factor;
+            update();
+        });
+        canvas.addEventListener('mousedown', function (event) {
+            dragging = {x: event.clientX - view.x, y: event.clientY - view.y};
+        });
+        window.addEventListener('mousemove', function (event) {
+            if (dragging) {
+                view.x = event.clientX - dragging.x;
+                view.y = event.clientY - dragging.y;
+                update();
+            }
+        });
+        window.addEventListener('mouseup', function () {
+            dragging = null;
+        });
+        canvas.addEventListener('dblclick', fit);
+        window.addEventListener('resize', update);
+    }
+
+    enablePanZoom();
+    fit();
+}());
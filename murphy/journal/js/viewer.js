@@ -0,0 +1,261 @@
+// MrMurphy Travel Journal viewer.
+//
+// Lays out the Journal graph in layers according to the distance
+// of each Node from the initial one and draws it incrementally.
+// Images are loaded only when their Node is visible.
+
+(function () {
+    'use strict';
+
+    var NODE_WIDTH = 160;
+    var NODE_HEIGHT = 120;
+    var GAP_X = 60;
+    var GAP_Y = 100;
+    var CHUNK = 200;          // elements drawn per animation frame
+    var IMAGE_ZOOM = 0.3;     // minimum zoom level for loading images
+    var SVG_NS = 'http://www.w3.org/2000/svg';
+
+    var journal = JSON.parse(document.getElementById('journal').textContent);
+    var svg = document.getElementById('graph');
+    var viewport = document.getElementById('viewport');
+    var details = document.getElementById('details');
+    var view = {x: 0, y: 0, zoom: 1};
+    var nodes = {};
+    var drawn = [];
+
+    function layout() {
+        var ranks = {};
+        var layers = [];
+        var queue = [];
+        var successors = {};
+        var maxRank = 0;
+
+        journal.nodes.forEach(function (node) {
+            nodes[node.id] = node;
+            successors[node.id] = [];
+        });
+        journal.edges.forEach(function (edge) {
+            successors[edge.head].push(edge.tail);
+        });
+
+        if (journal.nodes.length) {
+            ranks[journal.nodes[0].id] = 0;
+            queue.push(journal.nodes[0].id);
+        }
+
+        while (queue.length) {
+            var current = queue.shift();
+
+            successors[current].forEach(function (successor) {
+                if (!(successor in ranks)) {
+                    ranks[successor] = ranks[current] + 1;
+                    maxRank = Math.max(maxRank, ranks[successor]);
+                    queue.push(successor);
+                }
+            });
+        }
+
+        journal.nodes.forEach(function (node) {
+            var rank = node.id in ranks ? ranks[node.id] : maxRank + 1;
+
+            layers[rank] = layers[rank] || [];
+            node.rank = rank;
+            node.position = layers[rank].length;
+            layers[rank].push(node);
+        });
+
+        layers.forEach(function (layer) {
+            var offset = (layer.length - 1) * (NODE_WIDTH + GAP_X) / 2;
+
+            layer.forEach(function (node) {
+                node.x = node.position * (NODE_WIDTH + GAP_X) - offset;
+                node.y = node.rank * (NODE_HEIGHT + GAP_Y);
+            });
+        });
+    }
+
+    function element(name, attributes, parent) {
+        var item = document.createElementNS(SVG_NS, name);
+
+        Object.keys(attributes).forEach(function (key) {
+            item.setAttribute(key, attributes[key]);
+        });
+        if (parent) {
+            parent.appendChild(item);
+        }
+
+        return item;
+    }
+
+    function drawEdge(edge) {
+        var head = nodes[edge.head];
+        var tail = nodes[edge.tail];
+        var line = element('line', {
+            x1: head.x + NODE_WIDTH / 2, y1: head.y + NODE_HEIGHT,
+            x2: tail.x + NODE_WIDTH / 2, y2: tail.y,
+            'class': 'edge', 'marker-end': 'url(#arrow)'
+        }, viewport);
+        var title = element('title', {}, line);
+
+        title.textContent = edge.action;
+    }
+
+    function drawNode(node) {
+        var group = element('g', {
+            transform: 'translate(' + node.x + ',' + node.y + ')',
+            'class': 'node'
+        }, viewport);
+        var title = element('title', {}, group);
+
+        element('rect', {width: NODE_WIDTH, height: NODE_HEIGHT}, group);
+        title.textContent = node.title;
+
+        if (node.thumbnail || node.image) {
+            node.element = element('image', {
+                x: 4, y: 4, width: NODE_WIDTH - 8, height: NODE_HEIGHT - 24
+            }, group);
+            drawn.push(node);
+        }
+
+        var label = element('text', {x: 4, y: NODE_HEIGHT - 6}, group);
+        label.textContent = node.title + ' : ' + node.id;
+
+        group.addEventListener('click', function () {
+            showDetails(node);
+        });
+    }
+
+    function draw() {
+        var elements = journal.edges.map(function (edge) {
+            return function () { drawEdge(edge); };
+        }).concat(journal.nodes.map(function (node) {
+            return function () { drawNode(node); };
+        }));
+        var index = 0;
+
+        function step() {
+            elements.slice(index, index + CHUNK).forEach(function (draw) {
+                draw();
+            });
+            index += CHUNK;
+
+            loadVisibleImages();
+            if (index < elements.length) {
+                window.requestAnimationFrame(step);
+            }
+        }
+
+        window.requestAnimationFrame(step);
+    }
+
+    function loadVisibleImages() {
+        var width = svg.clientWidth / view.zoom;
+        var height = svg.clientHeight / view.zoom;
+        var left = -view.x / view.zoom;
+        var top = -view.y / view.zoom;
+
+        if (view.zoom < IMAGE_ZOOM) {
+            return;
+        }
+
+        drawn = drawn.filter(function (node) {
+            var visible = node.x + NODE_WIDTH > left && node.x < left + width &&
+                          node.y + NODE_HEIGHT > top && node.y < top + height;
+
+            if (visible) {
+                node.element.setAttribute('href', node.thumbnail || node.image);
+            }
+
+            return !visible;
+        });
+    }
+
+    function showDetails(node) {
+        var edges = journal.edges.filter(function (edge) {
+            return edge.head === node.id;
+        });
+        var content = document.createElement('div');
+        var header = document.createElement('h3');
+
+        header.textContent = node.title + ' : ' + node.id;
+        content.appendChild(header);
+
+        if (node.image) {
+            var image = document.createElement('img');
+            image.src = node.image;
+            content.appendChild(image);
+        }
+
+        node.metadata.forEach(function (metadata) {
+            var paragraph = document.createElement('p');
+            paragraph.textContent = metadata.title + ': ' + metadata.text;
+            content.appendChild(paragraph);
+        });
+
+        edges.forEach(function (edge) {
+            var link = document.createElement('a');
+            link.href = '#';
+            link.textContent = edge.action + ' -> ' + nodes[edge.tail].title;
+            link.addEventListener('click', function (event) {
+                event.preventDefault();
+                focus(nodes[edge.tail]);
+                showDetails(nodes[edge.tail]);
+            });
+            content.appendChild(link);
+            content.appendChild(document.createElement('br'));
+        });
+
+        details.innerHTML = '';
+        details.appendChild(content);
+        details.style.display = 'block';
+    }
+
+    function focus(node) {
+        view.x = svg.clientWidth / 2 - (node.x + NODE_WIDTH / 2) * view.zoom;
+        view.y = svg.clientHeight / 2 - (node.y + NODE_HEIGHT / 2) * view.zoom;
+        update();
+    }
+
+    function update() {
+        viewport.setAttribute('transform', 'translate(' + view.x + ',' +
+                              view.y + ') scale(' + view.zoom + ')');
+        loadVisibleImages();
+    }
+
+    function enablePanZoom() {
+        var dragging = null;
+
+        svg.addEventListener('wheel', function (event) {
+            var factor = event.deltaY < 0 ? 1.2 : 1 / 1.2;
+
+            event.preventDefault();
+            view.x = event.offsetX - (event.offsetX - view.x) * factor;
+            view.y = event.offsetY - (event.offsetY - view.y) * factor;
+            view.zoom *= factor;
+            update();
+        });
+        svg.addEventListener('mousedown', function (event) {
+            dragging = {x: event.clientX - view.x, y: event.clientY - view.y};
+        });
+        window.addEventListener('mousemove', function (event) {
+            if (dragging) {
+                view.x = event.clientX - dragging.x;
+                view.y = event.clientY - dragging.y;
+                update();
+            }
+        });
+        window.addEventListener('mouseup', function () {
+            dragging = null;
+        });
+        details.addEventListener('dblclick', function () {
+            details.style.display = 'none';
+        });
+    }
+
+    layout();
+    enablePanZoom();
+    if (journal.nodes.length) {
+        focus(journal.nodes[0]);
+    }
+    draw();
+}());
@@ -0,0 +1,350 @@
+"""Offline merge of Journals dumped by separate runs.
+
+Parallel explorations of the same application produce one Journal
+directory each. Merging them yields a single Journal in which equivalent
+States appear once and the Edges of all the runs are preserved.
+
+The source Nodes are streamed one at a time: only their fingerprints
+and a few paths are kept in memory. Their images are copied into the
+content addressed store of the merged Journal, delta encoded images
+are reconstructed first.
+
+Nodes of different sources sharing fingerprint and image are merged
+right away. The remaining candidates are compared with the Interpreter
+State equality against the Nodes with the same fingerprint only,
+loading, fingerprinting and comparison are distributed over
+a pool of processes. Each process builds its own Interpreter
+as the ones driving a device cannot be shared across processes.
+
+"""
+
+import os
+import json
+import shutil
+import logging
+import multiprocessing
+from pathlib import Path
+from functools import lru_cache
+from typing import Callable, Sequence, NamedTuple
+
+from PIL import Image
+
+from murphy.model import Interpreter
+
+from murphy.journal.node import state_fingerprint
+from murphy.journal.edge import node_index, element_index
+from murphy.journal.images import ImageStore, IMAGE_STORE
+from murphy.journal.images import apply_delta, image_digest, temporary_path
+from murphy.journal.encoding import ImageEncoding, DEFAULT_ENCODING
+
+
+STATE_CACHE = 256
+"""States kept loaded by each process during the comparisons."""
+IMAGE_CACHE = 64
+"""Reconstructed images kept by each process for decoding the deltas."""
+
+
+NodeRecord = NamedTuple('NodeRecord', (('source', int),
+                                       ('index', int),
+                                       ('path', str),
+                                       ('fingerprint', str),
+                                       ('image', str),
+                                       ('actions', tuple)))
+"""Lightweight description of a source Node.
+
+The path is the one of the source Node folder while the image
+is the path of the Node image within the merged Journal store.
+
+"""
+
+
+def merge_journals(sources: Sequence, destination: Path,
+                   interpreter: Callable[[], Interpreter],
+                   encoding: ImageEncoding = DEFAULT_ENCODING,
+                   processes: int = None) -> dict:
+    """Merge the Journals dumped in the source folders
+    into the destination folder.
+
+    The `interpreter` is a picklable callable, such as the Interpreter
+    class or a functools.partial of it, building an Interpreter
+    of the same type of the one used for generating the States.
+    It is called once within each worker process, the States are
+    only loaded and compared, no device is needed.
+    The `processes` default to the number of CPUs.
+
+    The merged Nodes are numbered in order of appearance,
+    the initial Node of the first source is the initial one.
+
+    A dictionary mapping each source Node, as (source position, index),
+    to its merged Node index is returned.
+
+    """
+    images = ImageStore(destination.joinpath(IMAGE_STORE), encoding)
+    destination.mkdir(parents=True, exist_ok=True)
+
+    with multiprocessing.Pool(processes=processes, initializer=setup_worker,
+                              initargs=(interpreter, images)) as pool:
+        canonical, mapping = merge_nodes(sources, pool)
+
+    for merged, record in enumerate(canonical):
+        write_merged_node(record, destination, merged)
+
+    merge_edges(sources, destination, canonical, mapping, images)
+
+    logging.getLogger(__name__).info(
+        "Merged %d Nodes into %d", len(mapping), len(canonical))
+
+    return mapping
+
+
+def merge_nodes(sources: Sequence, pool: multiprocessing.Pool) -> tuple:
+    """Deduplicate the Nodes of the given sources.
+
+    Return the list of the distinct Nodes records
+    and the mapping of the source Nodes to their merged index.
+
+    """
+    canonical = []
+    buckets = {}
+    mapping = {}
+
+    for position, source in enumerate(sources):
+        tasks = ((position, str(p)) for p in node_paths(Path(source)))
+        records = pool.imap(load_record, tasks, chunksize=CHUNK_SIZE)
+        candidates = []
+
+        for record in records:
+            bucket = buckets.get(record.fingerprint, ())
+            duplicate = next((m for m in bucket
+                              if canonical[m].image == record.image), None)
+
+            if duplicate is not None:
+                mapping[record.source, record.index] = duplicate
+            elif bucket:
+                candidates.append((record, [canonical[m] for m in bucket]))
+            else:
+                candidates.append((record, []))
+
+        # Nodes within the same source are distinct
+        matches = pool.imap(match_record, candidates, chunksize=CHUNK_SIZE)
+        for (record, _), match in zip(candidates, matches):
+            if match is not None:
+                merged = mapping[match.source, match.index]
+            else:
+                merged = len(canonical)
+                canonical.append(record)
+                buckets.setdefault(record.fingerprint, []).append(merged)
+
+            mapping[record.source, record.index] = merged
+
+    return canonical, mapping
+
+
+def merge_edges(sources: Sequence, destination: Path, canonical: list,
+                mapping: dict, images: ImageStore):
+    """Write the Edges of the sources between the merged Nodes.
+
+    The Actions of merged Nodes are mapped to the equivalent Actions
+    of the canonical State, Edges already present are skipped.
+
+    """
+    edges = {}
+
+    for position, source in enumerate(sources):
+        for path in node_paths(Path(source)):
+            for edge_path in sorted(path.glob('edge*'), key=element_index):
+                with edge_path.joinpath('edge.json').open() as edge_file:
+                    edge = json.load(edge_file)
+
+                head = mapping[position, node_index(edge['head'])]
+                tail = mapping[position, node_index(edge['tail'])]
+                action = equivalent_action(canonical[head], edge['action'])
+
+                if action is None:
+                    logging.getLogger(__name__).warning(
+                        "Action %s not found in merged Node %d, skipping",
+                        edge['action']['text'], head)
+                    continue
+
+                key = action['text'], tuple(action['coordinates']), tail
+                if key in edges.setdefault(head, {}):
+                    continue
+
+                if 'image' in action:
+                    action['image'] = str(copy_image(
+                        Path(action['image']), images))
+
+                edges[head][key] = len(edges[head])
+                write_merged_edge(destination, head, tail, action,
+                                  edges[head][key])
+
+
+def equivalent_action(record: NodeRecord, action: dict) -> (dict, None):
+    """Return the serialized Action of the canonical Node matching
+    the given one, Actions with the same coordinates are preferred.
+
+    """
+    coordinates = tuple(action['coordinates'])
+    matching = [a for a in record.actions if a['text'] == action['text']]
+
+    if not matching:
+        return None
+
+    equivalent = next((a for a in matching
+                       if tuple(a['coordinates']) == coordinates),
+                      matching[0])
+
+    return dict(action, coordinates=equivalent['coordinates'])
+
+
+def write_merged_node(record: NodeRecord, destination: Path, index: int):
+    """Write the State of the canonical Node as the merged Node `index`."""
+    with Path(record.path).joinpath('state.json').open() as state_file:
+        state = json.load(state_file)
+
+    state.pop('delta', None)
+    state['window'] = record.image
+
+    node_path = destination.joinpath('node%d' % index)
+    node_path.mkdir(parents=True, exist_ok=True)
+
+    with node_path.joinpath('state.json').open('w') as state_file:
+        json.dump(state, state_file)
+
+
+def write_merged_edge(destination: Path, head: int, tail: int,
+                      action: dict, index: int):
+    head_path = destination.joinpath('node%d' % head)
+    edge_path = head_path.joinpath('edge%d' % index)
+    edge = {'head': str(head_path),
+            'tail': str(destination.joinpath('node%d' % tail)),
+            'action': action}
+
+    edge_path.mkdir(parents=True, exist_ok=True)
+
+    with edge_path.joinpath('edge.json').open('w') as edge_file:
+        json.dump(edge, edge_file)
+
+
+def setup_worker(interpreter: Callable[[], Interpreter],
+                 images: ImageStore):
+    """Initialize the worker process globals."""
+    WORKER['interpreter'] = interpreter()
+    WORKER['images'] = images
+
+
+def load_record(task: tuple) -> NodeRecord:
+    """Store the image of the source Node and describe the Node."""
+    source, path = task
+    state = read_state(Path(path))
+    image = store_image(Path(path), state, WORKER['images'])
+
+    with Image.open(str(image)) as window:
+        loaded = WORKER['interpreter'].deserialize_state(state, window)
+        actions = tuple({'text': a.text, 'coordinates': a.coordinates}
+                        for a in loaded.actions)
+
+        return NodeRecord(source, element_index(Path(path)), path,
+                          state_fingerprint(loaded), str(image), actions)
+
+
+def match_record(task: tuple) -> (NodeRecord, None):
+    """Return the first of the canonical records equal to the candidate,
+    None if there is no match.
+
+    """
+    record, canonical = task
+
+    if not canonical:
+        return None
+
+    state = load_state(record.path, record.image)
+
+    for match in canonical:
+        if load_state(match.path, match.image) == state:
+            return match
+
+    return None
+
+
+@lru_cache(maxsize=STATE_CACHE)
+def load_state(path: str, image: str):
+    """Load the State of the source Node with its merged image.
+
+    The image is read in memory and its file closed
+    as the loaded States are cached.
+
+    """
+    with Image.open(image) as window:
+        return WORKER['interpreter'].deserialize_state(
+            read_state(Path(path)), window.copy())
+
+
+def store_image(path: Path, state: dict, images: ImageStore) -> Path:
+    """Store the Node image in the given store and return its path.
+
+    Images already encoded in the store format are copied as they are.
+
+    """
+    if 'window' in state:
+        return copy_image(Path(state['window']), images)
+
+    return images.store(node_image(str(path)))
+
+
+def copy_image(source: Path, images: ImageStore) -> Path:
+    """Copy the image into the given store, return its new path.
+
+    The image is addressed by the digest of its pixels
+    as the source Journal might not be content addressed.
+
+    """
+    with Image.open(str(source)) as image:
+        path = images.blob_path(image_digest(image))
+
+        if not path.exists():
+            if source.suffix == path.suffix:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                temporary = temporary_path(path)
+                shutil.copyfile(str(source), str(temporary))
+                os.replace(str(temporary), str(path))
+            else:
+                images.write(image, path)
+
+    return path
+
+
+@lru_cache(maxsize=IMAGE_CACHE)
+def node_image(path: str) -> Image.Image:
+    """Load the image of the Node stored in the given folder
+    reconstructing the delta encoded ones.
+
+    The images are cached as the Nodes of a delta chain
+    are loaded in sequence, they must not be modified.
+
+    """
+    state = read_state(Path(path))
+
+    if 'window' in state:
+        with Image.open(state['window']) as image:
+            return image.copy()
+
+    reference = Path(path).parent.joinpath(
+        'node%d' % state['delta']['reference'])
+
+    with Image.open(state['delta']['image']) as delta:
+        return apply_delta(delta, node_image(str(reference)))
+
+
+def read_state(path: Path) -> dict:
+    with path.joinpath('state.json').open() as state_file:
+        return json.load(state_file)
+
+
+def node_paths(path: Path) -> list:
+    return sorted(path.glob('node*'), key=element_index)
+
+
+CHUNK_SIZE = 16
+WORKER = {}
+"""Globals of the worker processes."""
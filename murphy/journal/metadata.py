@@ -0,0 +1,28 @@
+from pathlib import Path
+
+
+METADATA_ICON = Path(__file__).parent.joinpath('images/info.png')
+
+
+class Metadata:
+    """Additional information to append to Nodes and Edges.
+
+    This affects mostly the HTML rendering type.
+
+    """
+
+    __slots__ = 'title', 'text', 'image'
+
+    def __init__(self, title: str, text: str, image: Path = METADATA_ICON):
+        self.text = text    # type: str
+        """Text to show on User click."""
+        self.title = title  # type: str
+        """Text to show as tooltip."""
+        self.image = image  # type: Path
+        """Image or icon to associate to the Metadata element."""
+
+    def __eq__(self, metadata: 'EdgeMeta') -> bool:
+        return self.title == metadata.title and self.text == metadata.text
+
+    def __hash__(self):
+        return hash(self.title) + hash(self.text)
@@ -1,16 +1,22 @@
-from typing import Tuple
+import json
+from hashlib import sha1
+from typing import Tuple, NamedTuple
 from pathlib import Path
 from collections import deque
 
-from murphy.model import State, Action
+from PIL import Image
+
+from murphy.model import State, Action, Interpreter
 
 from murphy.journal.edge import Edge
+from murphy.journal.images import ImageStore, delta_image, apply_delta
 
 
 class Node:
     """A Node encapsulates the GUI application State within the Journal."""
 
-    __slots__ = 'edges', 'state', 'path', 'metadata', 'index'
+    __slots__ = ('edges', 'state', 'path', 'image', 'metadata', 'index',
+                 '_actions')
 
     def __init__(self, state: State):
         self.edges = []        # type: list
@@ -19,10 +25,14 @@ class Node:
         """State associated to the Node."""
         self.path = None       # type: Path
         """Path where the Node is information is stored."""
+        self.image = None      # type: Path
+        """Path of the stored Node image, None if not stored in full."""
         self.metadata = set()  # type: Set[Metadata]
         """Additional Metadata added to the Node."""
         self.index = None      # type: int
 
+        self._actions = {}     # action key -> edges
+
     def __str__(self):
         return "%s : %d" % (self.state.window.title, self.index)
 
@@ -30,6 +40,11 @@ class Node:
         """Return True if the Edge or Action is in the Node."""
         return self.find_edge(element) is not None
 
+    @property
+    def fingerprint(self) -> str:
+        """Digest of the Node State title and actions."""
+        return state_fingerprint(self.state)
+
     def distance(self, node: 'Node') -> int:
         """Returns the distance between this node and the given one.
 
@@ -52,14 +67,23 @@ class Node:
         return search_path(self, node)
 
     def find_edge(self, element: ('Edge', Action)) -> ('Edge', None):
-        """If the given Node or State is in the Journal, return it."""
-        action = element.action if isinstance(element, Edge) else element
+        """If an Edge with the given Action is in the Node, return it.
+
+        If the Action led to multiple Nodes, the first Edge is returned.
 
-        for edge in self.edges:
-            if edge.action.coordinates == action.coordinates:
-                return edge
+        """
+        edges = self.find_edges(element)
+
+        return edges[0] if edges else None
+
+    def find_edges(self, element: ('Edge', Action)) -> tuple:
+        """Return the Edges with the given Action in the Node,
+        one per Node the Action led to.
+
+        """
+        action = element.action if isinstance(element, Edge) else element
 
-        return None
+        return tuple(self._actions.get(action_key(action), ()))
 
     def new_edge(self, action: Action, successor: 'Node') -> 'Edge':
         """Given an Action and the successor Node, construct an Edge,
@@ -69,10 +93,29 @@ class Node:
         edge = Edge(self, successor, action)
 
         self.edges.append(edge)
+        self._actions.setdefault(action_key(action), []).append(edge)
 
         return edge
 
 
+def action_key(action: Action) -> tuple:
+    """Key identifying the Action within its State."""
+    return tuple(action.coordinates), type(action).__name__, str(action.text)
+
+
+def state_fingerprint(state: State) -> str:
+    """Compute a digest of the State window title and of its actions.
+
+    Equal States share the same fingerprint while the opposite
+    is not guaranteed as the window images are not taken into account.
+
+    """
+    actions = sorted((type(a).__name__, str(a.text)) for a in state.actions)
+    description = json.dumps((state.window.title, actions))
+
+    return sha1(description.encode()).hexdigest()
+
+
 def search_path(start: Node, end: Node) -> (Tuple[Edge], None):
     if start == end:
         return []
@@ -112,8 +155,95 @@ def construct_path(path: dict, node: Node) -> tuple:
     return tuple(edges)
 
 
-def dump_node(node: Node, path: Path, force: bool):
+NodeDump = NamedTuple('NodeDump', (('index', int),
+                                   ('state', dict),
+                                   ('image', Image.Image),
+                                   ('reference', int),
+                                   ('reference_image', Image.Image)))
+"""Snapshot of the Node information to be dumped."""
+
+
+def dump_node(node: Node, path: Path, images: ImageStore, force: bool,
+              reference: Node = None):
+    """Dump the Node at the given path.
+
+    If a reference Node is given, the Node image is stored
+    as the difference against the reference Node image.
+
+    """
     node.path = path.joinpath("node%d" % node.index)
 
     if not node.path.exists() or force:
-        node.state.dump(node.path)
+        _, node.image = write_node(node_dump(node, reference), path, images)
+
+
+def node_dump(node: Node, reference: Node = None) -> NodeDump:
+    """Take a snapshot of the Node information to be dumped."""
+    if reference is None:
+        return NodeDump(node.index, node.state.serialize(),
+                        node.state.window.image, None, None)
+
+    return NodeDump(node.index, node.state.serialize(),
+                    node.state.window.image,
+                    reference.index, reference.state.window.image)
+
+
+def write_node(dump: NodeDump, path: Path, images: ImageStore) -> tuple:
+    """Write the Node snapshot within the given Journal path.
+
+    The paths of the written files, images already stored excluded,
+    are returned together with the path of the Node image,
+    None if the image is delta encoded.
+
+    """
+    node_path = path.joinpath("node%d" % dump.index)
+    state_path = node_path.joinpath('state.json')
+    state = dict(dump.state)
+    delta = None
+
+    if dump.reference is not None:
+        delta = delta_image(dump.image, dump.reference_image)
+
+    if delta is not None:
+        image_path, new = images.add(delta)
+        state['delta'] = {'reference': dump.reference,
+                          'image': str(image_path)}
+    else:
+        image_path, new = images.add(dump.image)
+        state['window'] = str(image_path)
+
+    node_path.mkdir(parents=True, exist_ok=True)
+
+    with state_path.open('w') as state_file:
+        json.dump(state, state_file)
+
+    written = (state_path, image_path) if new else (state_path, )
+
+    return written, None if delta is not None else image_path
+
+
+def load_node(path: Path, interpreter: Interpreter, nodes: dict) -> Node:
+    """Load a Node previously dumped at the given path.
+
+    Delta encoded images are reconstructed from the image
+    of their reference Node which must be within the given dictionary.
+
+    """
+    with path.joinpath('state.json').open() as state_file:
+        state = json.load(state_file)
+
+    if 'delta' in state:
+        reference = nodes[state['delta']['reference']]
+        delta = Image.open(state['delta']['image'])
+        image = apply_delta(delta, reference.state.window.image)
+    else:
+        image = Image.open(state['window'])
+
+    node = Node(interpreter.deserialize_state(state, image))
+    node.index = int(path.name[len('node'):])
+    node.path = path
+
+    if 'window' in state:
+        node.image = Path(state['window'])
+
+    return node
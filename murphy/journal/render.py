@@ -1,8 +1,13 @@
 import os
 import base64
+import shutil
+import weakref
+import subprocess
 from html import escape
 from pathlib import Path
-from typing import Sequence
+from string import Formatter
+from functools import lru_cache
+from typing import Sequence, TextIO
 from itertools import chain, count
 
 from PIL import Image
@@ -10,22 +15,33 @@ from graphviz import Digraph
 
 from murphy.journal.node import Node
 from murphy.journal.edge import Edge
+from murphy.journal.images import ImageStore, ThumbnailStore
+from murphy.journal.images import RENDER_STORE, THUMBNAIL_STORE
+from murphy.journal.encoding import ImageEncoding, ENCODINGS, DEFAULT_ENCODING
 
 
 Image.MAX_IMAGE_PIXELS = None  # disable image size limit check
 SEPARATOR = ';' if os.name == 'nt' else ':'
+JOURNAL_NAME = 'journal'
+"""Name of the rendered Journal files."""
+SELECTION_NAME = 'selection'
+"""Default name of the rendered Node selection files."""
 
 
-def render_html(nodes: Sequence, path: Path, embed: bool = False):
+def render_html(nodes: Sequence, path: Path,
+                encoding: ImageEncoding = DEFAULT_ENCODING,
+                embed: bool = False, name: str = JOURNAL_NAME):
     """Render the Journal as HTML file.
 
     If embed is True, the image will be embedded in the HTML file.
     Otherwise a PNG file will be generated to be provide aside of the HTML page.
 
+    The output files are named after the given `name`.
+
     """
-    html_path = path.joinpath('journal.html')
-    img_path = render_dot(nodes, path, 'png')
-    map_path = render_dot(nodes, path, 'cmapx')
+    html_path = path.joinpath('%s.html' % name)
+    img_path, map_path = render_dot_formats(
+        nodes, path, ('png', 'cmapx'), encoding, name)
 
     save_html(nodes, html_path, map_path, img_path, embed)
 
@@ -36,9 +52,60 @@ def render_html(nodes: Sequence, path: Path, embed: bool = False):
     return html_path
 
 
-def render_dot(nodes: Sequence, path: Path, format: str) -> Path:
-    dot = Digraph(name='journal',
-                  format=format,
+def render_dot(nodes: Sequence, path: Path, format: str,
+               encoding: ImageEncoding = DEFAULT_ENCODING,
+               name: str = JOURNAL_NAME) -> Path:
+    """Render the Journal with Graphviz in the given format.
+
+    PNG outputs are re-encoded only if the encoding policy
+    requires the optimization pass.
+
+    """
+    return render_dot_formats(nodes, path, (format, ), encoding, name)[0]
+
+
+def render_dot_formats(nodes: Sequence, path: Path, formats: Sequence,
+                       encoding: ImageEncoding = DEFAULT_ENCODING,
+                       name: str = JOURNAL_NAME) -> tuple:
+    """Render the Journal with Graphviz in all the given formats.
+
+    The graph is laid out once and written in each format
+    within a single Graphviz execution.
+
+    """
+    dot = build_graph(nodes, path, name)
+    source_path = Path(dot.save())
+    render_paths = tuple(source_path.with_name('%s.%s' % (source_path.name, f))
+                         for f in formats)
+
+    command = [dot.engine]
+    for format, render_path in zip(formats, render_paths):
+        command.extend(('-T%s' % format, '-o%s' % render_path.name))
+    command.append(source_path.name)
+
+    run_graphviz(command, source_path.parent)
+
+    for format, render_path in zip(formats, render_paths):
+        if format == 'png' and encoding.optimize:
+            image = Image.open(str(render_path))
+            image.save(str(render_path), format='PNG', optimize=True,
+                       compress_level=encoding.compression)
+
+    return render_paths
+
+
+def run_graphviz(command: list, directory: Path):
+    """Run the Graphviz command within the given directory."""
+    try:
+        subprocess.run(command, cwd=str(directory), check=True,
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except (OSError, subprocess.CalledProcessError) as error:
+        raise RuntimeError("Unable to render the Journal") from error
+
+
+def build_graph(nodes: Sequence, path: Path,
+                name: str = JOURNAL_NAME) -> Digraph:
+    dot = Digraph(name=name,
                   directory=str(path),
                   comment="MrMurphy's Travel Journal",
                   node_attr={'shape': 'rectangle'},
@@ -47,48 +114,111 @@ def render_dot(nodes: Sequence, path: Path, format: str) -> Path:
                               'bgcolor': 'white',
                               'imagepath': SEPARATOR.join(('.', str(path)))})
 
-    for node in nodes:
-        add_image(dot, node, path)
-        for edge in node.edges:
-            add_image(dot, edge, path)
+    thumbnails = ThumbnailStore(path.joinpath(THUMBNAIL_STORE),
+                                encoding=RENDER_ENCODING)
 
-    render_path = Path(dot.render())
+    selection = set(nodes)
 
-    if format in ('png', 'jpg', 'jpeg'):
-        image = Image.open(str(render_path))
-        image.save(str(render_path), optimize=True, quality=IMAGE_QUALITY)
+    for node in nodes:
+        add_image(dot, node, path, thumbnails)
+        for edge in selected_edges(node, selection):
+            add_image(dot, edge, path, thumbnails)
 
-    return render_path
+    return dot
 
 
 def save_html(nodes: Sequence, html_path: Path,
               map_path: Path, img_path: Path, embed: bool):
-    modals = build_modals(nodes)
-    scripts = build_scripts(nodes)
+    """Write the HTML page streaming its fragments to the file.
 
-    with JOURNAL_TEMPLATE_PATH.open() as html_template_file:
-        html_template = html_template_file.read()
-    with map_path.open() as mapfile:
-        html_map = mapfile.read()
+    The modals and their scripts are generated in a single pass
+    over the Nodes and Edges.
 
-    if embed:
-        with img_path.open('rb') as imgfile:
-            encoded_image = base64.b64encode(imgfile.read()).decode()
+    """
+    identifiers = []
+
+    with html_path.open('w') as html_file:
+        for literal, field in template_fragments(JOURNAL_TEMPLATE_PATH):
+            html_file.write(literal)
+
+            if field == 'image':
+                write_image(html_file, img_path, embed)
+            elif field == 'map':
+                with map_path.open() as map_file:
+                    shutil.copyfileobj(map_file, html_file)
+            elif field == 'modals':
+                identifiers = write_modals(html_file, nodes)
+            elif field == 'scripts':
+                write_scripts(html_file, identifiers)
+
+
+def write_image(html_file: TextIO, img_path: Path, embed: bool):
+    if not embed:
+        html_file.write(img_path.name)
+        return
+
+    html_file.write(EMBED_IMAGE)
+    with img_path.open('rb') as img_file:
+        for chunk in iter(lambda: img_file.read(EMBED_CHUNK), b''):
+            html_file.write(base64.b64encode(chunk).decode())
 
-        image = EMBED_IMAGE % encoded_image
-    else:
-        image = img_path.name
 
-    html = html_template.format(
-        image=image, modals=modals, map=html_map, scripts=scripts)
+def write_modals(html_file: TextIO, nodes: Sequence) -> list:
+    """Write the modals of the Nodes and Edges metadata.
 
-    with html_path.open('w') as htmlfile:
-        htmlfile.write(html)
+    The identifiers of the written modals are returned.
 
+    """
+    identifiers = []
+    selection = set(nodes)
+    modal_template = load_template(MODAL_TEMPLATE_PATH)
+
+    for node in nodes:
+        elements = chain(((str(node.index), node), ),
+                         (('{}{}'.format(e.head.index, e.tail.index), e)
+                          for e in selected_edges(node, selection)))
+
+        for name, element in elements:
+            for index, metadata in enumerate(element.metadata):
+                identifier = '{}meta{}'.format(name, index)
+
+                html_file.write(modal_template.format(
+                    identifier=identifier,
+                    text=splitlines(escape(metadata.text))))
+                identifiers.append(identifier)
+
+    return identifiers
+
+
+def write_scripts(html_file: TextIO, identifiers: Sequence):
+    script_template = load_template(SCRIPT_TEMPLATE_PATH)
+
+    for identifier in identifiers:
+        html_file.write('<script>{}</script>'.format(
+            script_template.format(identifier=identifier)))
+
+
+@lru_cache(maxsize=None)
+def load_template(path: Path) -> str:
+    with path.open() as template_file:
+        return template_file.read()
+
+
+@lru_cache(maxsize=None)
+def template_fragments(path: Path) -> tuple:
+    """Split the template in its literal text and replacement fields."""
+    return tuple((literal, field) for literal, field, _, _
+                 in Formatter().parse(load_template(path)))
 
-def add_image(dot: Digraph, element: (Node, Edge), path: Path):
+
+def add_image(dot: Digraph, element: (Node, Edge), path: Path,
+              thumbnails: ThumbnailStore):
+    """The graph shows the image thumbnail,
+    the full image is linked from the element.
+
+    """
     try:
-        image = find_image(element)
+        image = find_image(element, path)
     except LookupError:
         if isinstance(element, Node):
             dot.node(str(element.index), label="%s" % element)
@@ -96,16 +226,21 @@ def add_image(dot: Digraph, element: (Node, Edge), path: Path):
             dot.edge(str(element.head.index), str(element.tail.index),
                      label="%s" % element.action.text)
     else:
+        thumbnail = thumbnails.thumbnail(image)
+
         if isinstance(element, Node):
-            render_node(dot, element, image.relative_to(path))
+            render_node(dot, element, thumbnail.relative_to(path),
+                        image.relative_to(path))
         else:
-            render_edge(dot, element, image.relative_to(path))
+            render_edge(dot, element, thumbnail.relative_to(path),
+                        image.relative_to(path))
 
 
-def render_node(dot: Digraph, node: (Node, Edge), path: Path):
+def render_node(dot: Digraph, node: (Node, Edge), path: Path, link: Path):
     name = '{}'.format(node.index)
     image = IMG.format(str(path))
-    label_content = CELL.format(id=name, title=escape(str(node)), content=image)
+    label_content = CELL.format(id=name, href=escape(link.as_posix()),
+                                title=escape(str(node)), content=image)
 
     metadata = render_metadata(node)
     label_metadata = '<TD>{}</TD>'.format(
@@ -118,11 +253,12 @@ def render_node(dot: Digraph, node: (Node, Edge), path: Path):
              tooltip="%s" % node, style="filled,setlinewidth(0)")
 
 
-def render_edge(dot: Digraph, edge: (Node, Edge), path: Path):
+def render_edge(dot: Digraph, edge: (Node, Edge), path: Path, link: Path):
     name = '{}{}'.format(str(edge.head.index), str(edge.tail.index))
     image = IMG.format(str(path))
     label_content = ROW.format(CELL.format(
-        id=name, title=escape(str(edge)), content=image))
+        id=name, href=escape(link.as_posix()),
+        title=escape(str(edge)), content=image))
 
     metadata = render_metadata(edge)
     label_metadata = ROW.format(metadata) if metadata else ''
@@ -149,84 +285,81 @@ def render_metadata(element: (Node, Edge)) -> str:
         meta_id = '{}meta{}'.format(name, next(index))
         meta_image = IMG.format(element_meta.image)
         meta_cell = meta_format.format(
-            id=meta_id, title=escape(element_meta.title), content=meta_image)
+            id=meta_id, href='', title=escape(element_meta.title),
+            content=meta_image)
 
         metadata += meta_cell
 
     return metadata
 
 
-def build_modals(nodes: Sequence) -> str:
-    modals = ''
-
-    with MODAL_TEMPLATE_PATH.open() as modal_template_file:
-        modal_template = modal_template_file.read()
-
-    for node in nodes:
-        node_index = count()
-        node_name = '{}'.format(str(node.index))
-
-        for node_meta in node.metadata:
-            identifier = '{}meta{}'.format(node_name, next(node_index))
+def selected_edges(node: Node, selection: set) -> list:
+    """Edges of the Node leading to the selected Nodes."""
+    return [edge for edge in node.edges if edge.tail in selection]
 
-            modals += modal_template.format(
-                identifier=identifier,
-                text=splitlines(escape(node_meta.text)))
 
-        for edge in node.edges:
-            edge_index = count()
-            edge_name = '{}{}'.format(
-                str(edge.head.index), str(edge.tail.index))
+def find_image(element: (Node, Edge), path: Path) -> Path:
+    """The path of the Node or Edge image is recorded when dumped.
 
-            for edge_meta in edge.metadata:
-                identifier = '{}meta{}'.format(edge_name, next(edge_index))
+    Images not stored in full, such as delta encoded Node images,
+    and image formats not supported by browsers are rendered as PNG
+    in a disposable store aside of the Journal images.
+    The rendered image path is cached for the State or the Action,
+    which the Journal copies share, and it is rendered only once.
 
-                modals += modal_template.format(
-                    identifier=identifier,
-                    text=splitlines(escape(edge_meta.text)))
+    """
+    image = element.image
+
+    if image is not None and image.suffix in BROWSER_EXTENSIONS:
+        return image
+
+    owner = element.state if isinstance(element, Node) else element.action
+    rendered = cached_image(owner)
+    if rendered is not None and path in rendered.parents:
+        return rendered
+
+    if image is not None:
+        with Image.open(str(image)) as stored:
+            rendered = render_image(stored, path)
+    elif isinstance(element, Node):
+        rendered = render_image(element.state.window.image, path)
+    elif isinstance(element.action.image, Image.Image):
+        rendered = render_image(element.action.image, path)
+    else:
+        raise LookupError("Image for element %s not found" % element)
 
-    return modals
+    cache_image(owner, rendered)
 
+    return rendered
 
-def build_scripts(nodes: Sequence) -> str:
-    scripts = ''
-    edges = chain.from_iterable(n.edges for n in nodes)
 
-    with SCRIPT_TEMPLATE_PATH.open() as script_template_file:
-        script_template = script_template_file.read()
+def cached_image(owner: object) -> (Path, None):
+    """The image rendered for the State or Action, None if not cached."""
+    reference, rendered = RENDERED_IMAGES.get(id(owner), (None, None))
 
-    for node in nodes:
-        node_index = count()
-        node_name = '{}'.format(str(node.index))
+    if reference is not None and reference() is owner:
+        return rendered
 
-        for _ in node.metadata:
-            identifier = '{}meta{}'.format(node_name, next(node_index))
-            scripts += '<script>{}</script>'.format(
-                script_template.format(identifier=identifier))
+    return None
 
-        for edge in edges:
-            edge_index = count()
-            edge_name = '{}{}'.format(
-                str(edge.head.index), str(edge.tail.index))
 
-            for _ in edge.metadata:
-                identifier = '{}meta{}'.format(edge_name, next(edge_index))
-                scripts += '<script>{}</script>'.format(
-                    script_template.format(identifier=identifier))
+def cache_image(owner: object, rendered: Path):
+    """Cache the image rendered for the State or Action
+    until the latter is garbage collected.
 
-    return scripts
+    """
+    key = id(owner)
+    reference = weakref.ref(
+        owner, lambda _: RENDERED_IMAGES.pop(key, None))
 
+    RENDERED_IMAGES[key] = reference, rendered
 
-def find_image(element: (Node, Edge)) -> Path:
-    matches = []
 
-    for extension in EXTENSIONS:
-        matches.extend(element.path.glob('*.%s' % extension))
+def render_image(image: Image, path: Path) -> Path:
+    """Store the image in a format Graphviz can render."""
+    store = ImageStore(path.joinpath(RENDER_STORE), RENDER_ENCODING)
 
-    try:
-        return matches[0]
-    except IndexError:
-        raise LookupError("Image for element %s not found" % element.path)
+    return store.store(image)
 
 
 def splitlines(string):
@@ -240,11 +373,14 @@ MODAL_TEMPLATE_PATH = Path(__file__).parent.joinpath(
 SCRIPT_TEMPLATE_PATH = Path(__file__).parent.joinpath(
     'js/modal_script.js')
 
-IMAGE_QUALITY = 85
-EXTENSIONS = 'png', 'svg', 'jpg', 'jpeg'
-EMBED_IMAGE = 'data:image/png;base64,%s'
+RENDER_ENCODING = ENCODINGS['fast']
+RENDERED_IMAGES = {}
+"""Weak references to the States and Actions with their rendered image."""
+BROWSER_EXTENSIONS = '.png', '.webp'
+EMBED_IMAGE = 'data:image/png;base64,'
+EMBED_CHUNK = 3 * 1024 * 1024  # multiple of 3 to avoid base64 padding
 
 ROW = '<TR>{}</TR>'
 IMG = '<IMG SRC="{}"/>'
 TABLE = '<TABLE BORDER="0">{}</TABLE>'
-CELL = '<TD ID="{id}" HREF="" TITLE="{title}">{content}</TD>'
+CELL = '<TD ID="{id}" HREF="{href}" TITLE="{title}">{content}</TD>'
@@ -0,0 +1,146 @@
+"""Background rendering of the Journal.
+
+Rendering large Journals is expensive. The scheduler coalesces
+the render requests and serves them in a background thread.
+
+"""
+
+import time
+import logging
+import threading
+
+from murphy.journal.journal import Journal
+
+
+RENDER_INTERVAL = 30
+"""Minimum amount of seconds between two renderings."""
+
+
+class RenderScheduler:
+    """Renders the Journal in a background thread.
+
+    Render requests are coalesced and served at most once every
+    `interval` seconds. On demand renders are served immediately.
+
+    If the Journal did not change since the last render,
+    the rendering is skipped.
+
+    """
+    def __init__(self, journal: Journal, format: str = 'html_embedded',
+                 interval: float = RENDER_INTERVAL):
+        self.format = format
+        """Journal rendering format."""
+        self.journal = journal
+        """The Journal to render."""
+        self.interval = interval
+        """Minimum amount of seconds between two renderings."""
+
+        self._forced = False
+        self._stopped = False
+        self._thread = None
+        self._requests = 0
+        self._completed = 0
+        self._signature = None
+        self._last_render = 0
+        self._condition = threading.Condition()
+        self._logger = logging.getLogger("%s.%s" % (self.__module__,
+                                                    self.__class__.__name__))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def start(self):
+        """Start the rendering thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name='RenderScheduler')
+        self._thread.start()
+
+    def close(self):
+        """Serve the pending render request and stop the rendering thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+        self._thread.join()
+
+    def request(self, force: bool = False) -> int:
+        """Request the Journal to be rendered.
+
+        If `force` is True, the rendering is not delayed.
+
+        The request identifier is returned.
+
+        """
+        with self._condition:
+            self._requests += 1
+            self._forced = self._forced or force
+            self._condition.notify_all()
+
+            return self._requests
+
+    def render(self):
+        """Render the Journal on demand and wait for the rendering."""
+        request = self.request(force=True)
+
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._completed >= request or not self.running)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(self._pending)
+                if not self._requests > self._completed:
+                    return
+
+                delay = self._last_render + self.interval - time.monotonic()
+                self._condition.wait_for(
+                    lambda: self._forced or self._stopped, timeout=delay)
+
+                request = self._requests
+                self._forced = False
+
+            self._render()
+
+            with self._condition:
+                self._completed = request
+                self._last_render = time.monotonic()
+                self._condition.notify_all()
+
+    def _pending(self) -> bool:
+        return self._requests > self._completed or self._stopped
+
+    def _render(self):
+        signature = journal_signature(self.journal)
+        if signature == self._signature:
+            self._logger.debug("Journal unchanged, rendering skipped.")
+            return
+
+        try:
+            path = self.journal.render(format=self.format)
+        except Exception as error:
+            self._logger.exception("Unable to render the Journal: %s", error)
+        else:
+            self._signature = signature
+            self._logger.debug("Journal rendered at %s", path)
+
+
+def journal_signature(journal: Journal) -> tuple:
+    """Cheap signature reflecting the changes of the Journal content."""
+    edges = 0
+    metadata = 0
+
+    for node in list(journal.nodes):
+        edges += len(node.edges)
+        metadata += len(node.metadata)
+        metadata += sum(len(e.metadata) for e in node.edges)
+
+    return len(journal.nodes), edges, metadata
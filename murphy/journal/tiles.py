@@ -0,0 +1,282 @@
+"""Deep zoom rendering of very large Journals.
+
+The Journal graph is laid out once by Graphviz and then rendered
+at full resolution one horizontal strip at a time, each strip is cut
+into square tiles. The tiles form a multi resolution pyramid following
+the Deep Zoom (DZI) layout, the tiles of each lower resolution level
+are downsampled from the ones of the level above. Only the tiles
+within the view are loaded by the browser.
+
+Neither the renderer nor the browser need the whole bitmap in memory.
+
+"""
+
+import os
+import re
+import json
+import math
+import shutil
+from pathlib import Path
+from itertools import chain
+from typing import Sequence
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from murphy.journal.render import build_graph, run_graphviz, JOURNAL_NAME
+from murphy.journal.encoding import ImageEncoding, DEFAULT_ENCODING
+
+
+TILE_SIZE = 256
+"""Side of the square tiles in pixels."""
+
+
+def render_tiles(nodes: Sequence, path: Path,
+                 encoding: ImageEncoding = DEFAULT_ENCODING,
+                 tile_size: int = TILE_SIZE,
+                 name: str = JOURNAL_NAME) -> Path:
+    """Render the Journal as a deep zoom tile pyramid.
+
+    The pyramid is described by the `<name>.dzi` file and its tiles
+    are stored within the `<name>_files` folder. The returned HTML page
+    allows to pan and zoom through the pyramid.
+
+    """
+    if encoding.format not in TILE_FORMATS:
+        encoding = DEFAULT_ENCODING
+
+    layout_path = layout_graph(nodes, path, name)
+    width, height = graph_size(layout_path)
+    levels = max_level(width, height)
+    tiles_path = path.joinpath(TILES_FOLDER % name)
+
+    if tiles_path.exists():
+        shutil.rmtree(str(tiles_path))
+
+    try:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            for _ in executor.map(
+                    lambda strip: render_strip(
+                        layout_path, tiles_path, (width, height), levels,
+                        strip, tile_size, encoding),
+                    level_strips(height, levels, levels, tile_size)):
+                pass
+
+            # each level is downsampled once the one above is complete
+            for level in range(levels - 1, -1, -1):
+                for _ in executor.map(
+                        lambda strip: downsample_strip(
+                            tiles_path, (width, height), levels,
+                            strip, tile_size, encoding),
+                        level_strips(height, levels, level, tile_size)):
+                    pass
+    finally:
+        layout_path.unlink()
+
+    save_descriptor(path.joinpath('%s.dzi' % name),
+                    (width, height), tile_size, encoding)
+
+    return save_tiles_html(path.joinpath('%s_tiles.html' % name),
+                           (width, height), levels, tile_size, encoding,
+                           tiles_path.name)
+
+
+def layout_graph(nodes: Sequence, path: Path,
+                 name: str = JOURNAL_NAME) -> Path:
+    """Lay out the Journal graph and store the node positions."""
+    dot = build_graph(nodes, path, name)
+    dot.graph_attr.update(pad='0', dpi='72')
+    source_path = Path(dot.save())
+    layout_path = source_path.with_name(source_path.name + '.layout')
+
+    try:
+        run_graphviz([dot.engine, '-Tdot', '-o%s' % layout_path.name,
+                      source_path.name], source_path.parent)
+    finally:
+        source_path.unlink()
+
+    return layout_path
+
+
+def render_strip(layout_path: Path, tiles_path: Path, size: tuple,
+                 levels: int, strip: tuple, tile_size: int,
+                 encoding: ImageEncoding):
+    """Render a row of tiles at the given level of the pyramid.
+
+    The strip is rendered from the pre computed layout,
+    Graphviz clips the drawing to the strip viewport.
+
+    """
+    level, row = strip
+    scale = level_scale(levels, level)
+    width, height = (max(1, math.ceil(s * scale)) for s in size)
+    top = row * tile_size
+    strip_height = min(tile_size, height - top)
+    level_path = tiles_path.joinpath(str(level))
+    strip_path = level_path.joinpath('strip%d.png' % row)
+
+    level_path.mkdir(parents=True, exist_ok=True)
+
+    # viewport center is in graph coordinates, Y axis points upwards
+    viewport = '%d,%d,%f,%f,%f' % (width, strip_height, scale,
+                                   width / 2 / scale,
+                                   size[1] - (top + strip_height / 2) / scale)
+    run_graphviz(['neato', '-n2', '-Tpng', '-Gviewport=%s' % viewport,
+                  '-o%s' % strip_path, layout_path.name], layout_path.parent)
+
+    try:
+        with Image.open(str(strip_path)) as image:
+            for column in range(math.ceil(width / tile_size)):
+                left = column * tile_size
+                box = (left, 0, min(left + tile_size, width), strip_height)
+                tile_path = level_path.joinpath(
+                    '%d_%d.%s' % (column, row, encoding.extension))
+
+                encoding.save(image.crop(box), tile_path)
+    finally:
+        strip_path.unlink()
+
+
+def downsample_strip(tiles_path: Path, size: tuple, levels: int,
+                     strip: tuple, tile_size: int, encoding: ImageEncoding):
+    """Build a row of tiles at the given level of the pyramid
+    halving the four tiles each one covers at the level above.
+
+    """
+    level, row = strip
+    scale = level_scale(levels, level)
+    width = max(1, math.ceil(size[0] * scale))
+    level_path = tiles_path.joinpath(str(level))
+    upper_path = tiles_path.joinpath(str(level + 1))
+
+    level_path.mkdir(parents=True, exist_ok=True)
+
+    for column in range(math.ceil(width / tile_size)):
+        tiles = upper_tiles(upper_path, (column, row), encoding)
+
+        try:
+            tile = join_tiles(tiles)
+        finally:
+            for image in chain.from_iterable(tiles):
+                image.close()
+
+        tile = tile.resize((math.ceil(tile.width / 2),
+                            math.ceil(tile.height / 2)), Image.LANCZOS)
+        encoding.save(tile, level_path.joinpath(
+            '%d_%d.%s' % (column, row, encoding.extension)))
+
+
+def upper_tiles(upper_path: Path, position: tuple,
+                encoding: ImageEncoding) -> list:
+    """Open the rows of tiles of the level above
+    covered by the tile at the given position.
+
+    Tiles beyond the right and bottom borders do not exist.
+
+    """
+    column, row = position
+    tiles = []
+
+    for upper_row in (row * 2, row * 2 + 1):
+        paths = (upper_path.joinpath('%d_%d.%s' % (
+            upper_column, upper_row, encoding.extension))
+                 for upper_column in (column * 2, column * 2 + 1))
+        line = [Image.open(str(p)) for p in paths if p.exists()]
+
+        if line:
+            tiles.append(line)
+
+    return tiles
+
+
+def join_tiles(tiles: list) -> Image.Image:
+    """Join the rows of adjacent tiles into a single image."""
+    width = sum(tile.width for tile in tiles[0])
+    height = sum(line[0].height for line in tiles)
+    image = Image.new('RGBA', (width, height))
+
+    top = 0
+    for line in tiles:
+        left = 0
+        for tile in line:
+            image.paste(tile.convert('RGBA'), (left, top))
+            left += tile.width
+        top += line[0].height
+
+    return image
+
+
+def graph_size(layout_path: Path) -> tuple:
+    """Return the size in points of the laid out graph."""
+    with layout_path.open() as layout_file:
+        match = BOUNDING_BOX.search(layout_file.read())
+
+    if match is None:
+        raise RuntimeError("Unable to find the Journal graph size")
+
+    left, bottom, right, top = (float(c) for c in match.group(1).split(','))
+
+    return max(1, math.ceil(right - left)), max(1, math.ceil(top - bottom))
+
+
+def max_level(width: int, height: int) -> int:
+    """Level of the pyramid at full resolution, level 0 is a single pixel."""
+    return math.ceil(math.log2(max(width, height, 1)))
+
+
+def level_scale(levels: int, level: int) -> float:
+    return 2 ** (level - levels)
+
+
+def level_strips(side: int, levels: int, level: int,
+                 tile_size: int) -> list:
+    """The rows of tiles at the given level as strips."""
+    return [(level, row)
+            for row in range(tiles_count(side, levels, level, tile_size))]
+
+
+def tiles_count(side: int, levels: int, level: int, tile_size: int) -> int:
+    """Number of tiles along the given side at the given level."""
+    return math.ceil(max(1, math.ceil(side * level_scale(levels, level)))
+                     / tile_size)
+
+
+def save_descriptor(path: Path, size: tuple, tile_size: int,
+                    encoding: ImageEncoding):
+    with path.open('w') as descriptor:
+        descriptor.write(DESCRIPTOR.format(
+            format=encoding.extension, tile_size=tile_size,
+            width=size[0], height=size[1]))
+
+
+def save_tiles_html(path: Path, size: tuple, levels: int, tile_size: int,
+                    encoding: ImageEncoding, folder: str) -> Path:
+    pyramid = {'width': size[0], 'height': size[1], 'levels': levels,
+               'tileSize': tile_size, 'format': encoding.extension,
+               'folder': folder}
+
+    with TILES_TEMPLATE_PATH.open() as template_file:
+        template = template_file.read()
+    with TILES_SCRIPT_PATH.open() as script_file:
+        script = script_file.read()
+
+    with path.open('w') as html_file:
+        html_file.write(template
+                        .replace('{tiles}', script)
+                        .replace('{pyramid}', json.dumps(pyramid)))
+
+    return path
+
+
+TILES_FOLDER = '%s_files'
+TILE_FORMATS = ('png', 'webp')
+BOUNDING_BOX = re.compile(r'\bbb="([^"]+)"')
+DESCRIPTOR = """<?xml version="1.0" encoding="UTF-8"?>
+<Image xmlns="http://schemas.microsoft.com/deepzoom/2008"
+       Format="{format}" Overlap="0" TileSize="{tile_size}">
+  <Size Width="{width}" Height="{height}"/>
+</Image>
+"""
+TILES_TEMPLATE_PATH = Path(__file__).parent.joinpath(
+    'html/tiles_template.html')
+TILES_SCRIPT_PATH = Path(__file__).parent.joinpath('js/tiles.js')
@@ -0,0 +1,92 @@
+"""Interactive HTML viewer for the Journal.
+
+The Journal graph is written as compact JSON within a static HTML page.
+The graph is laid out and drawn by the browser, Graphviz is not involved.
+
+"""
+
+import json
+from pathlib import Path
+from typing import Sequence
+
+from murphy.journal.node import Node
+from murphy.journal.edge import Edge
+from murphy.journal.render import find_image, selected_edges
+from murphy.journal.render import RENDER_ENCODING, JOURNAL_NAME
+from murphy.journal.images import ThumbnailStore, THUMBNAIL_STORE
+
+
+def render_viewer(nodes: Sequence, path: Path,
+                  name: str = JOURNAL_NAME) -> Path:
+    """Render the Journal as an interactive HTML page.
+
+    Images are referenced relative to the Journal folder
+    and loaded by the browser only when needed. The graph shows
+    the Node thumbnails, full images are shown in the Node details.
+    The page is named after the given `name`.
+
+    """
+    html_path = path.joinpath('%s_viewer.html' % name)
+    journal = {'nodes': [], 'edges': []}
+    thumbnails = ThumbnailStore(path.joinpath(THUMBNAIL_STORE),
+                                encoding=RENDER_ENCODING)
+
+    selection = set(nodes)
+
+    for node in nodes:
+        journal['nodes'].append(describe_node(node, path, thumbnails))
+        journal['edges'].extend(describe_edge(e, path)
+                                for e in selected_edges(node, selection))
+
+    with VIEWER_TEMPLATE_PATH.open() as template_file:
+        head, tail = template_file.read().split('{journal}')
+    with VIEWER_SCRIPT_PATH.open() as script_file:
+        tail = tail.replace('{viewer}', script_file.read())
+
+    with html_path.open('w') as html_file:
+        html_file.write(head)
+        html_file.write(json.dumps(journal, separators=(',', ':'))
+                        .replace('</', '<\\/'))
+        html_file.write(tail)
+
+    return html_path
+
+
+def describe_node(node: Node, path: Path, thumbnails: ThumbnailStore) -> dict:
+    image = image_reference(node, path)
+    thumbnail = None
+
+    if image is not None:
+        thumbnail = thumbnails.thumbnail(path.joinpath(image))
+        thumbnail = thumbnail.relative_to(path).as_posix()
+
+    return {'id': node.index,
+            'title': str(node.state.window.title),
+            'image': image,
+            'thumbnail': thumbnail,
+            'metadata': describe_metadata(node)}
+
+
+def describe_edge(edge: Edge, path: Path) -> dict:
+    return {'head': edge.head.index,
+            'tail': edge.tail.index,
+            'action': str(edge.action.text),
+            'image': image_reference(edge, path),
+            'metadata': describe_metadata(edge)}
+
+
+def describe_metadata(element: (Node, Edge)) -> list:
+    return [{'title': m.title, 'text': m.text} for m in element.metadata]
+
+
+def image_reference(element: (Node, Edge), path: Path) -> (str, None):
+    """Image path relative to the Journal folder."""
+    try:
+        return find_image(element, path).relative_to(path).as_posix()
+    except LookupError:
+        return None
+
+
+VIEWER_TEMPLATE_PATH = Path(__file__).parent.joinpath(
+    'html/viewer_template.html')
+VIEWER_SCRIPT_PATH = Path(__file__).parent.joinpath('js/viewer.js')
@@ -0,0 +1,165 @@
+"""Background writer for dumping the Journal while the Agent keeps working.
+
+Nodes and Edges are captured in immutable snapshots which are queued
+and written to disk by a separate thread.
+
+"""
+
+import os
+import logging
+import threading
+from queue import Queue
+from pathlib import Path
+from typing import NamedTuple
+
+from murphy.journal.images import ImageStore, IMAGE_STORE
+from murphy.journal.encoding import ImageEncoding, DEFAULT_ENCODING
+from murphy.journal.node import Node, NodeDump, node_dump, write_node
+from murphy.journal.edge import Edge, EdgeDump, edge_dump, write_edge
+
+
+QUEUE_SIZE = 64
+"""Maximum amount of snapshots waiting to be written."""
+
+
+Barrier = NamedTuple('Barrier', (('event', threading.Event), ('sync', bool)))
+
+
+class JournalWriter:
+    """Writes the Journal Nodes and Edges in a background thread.
+
+    The queue is bounded to `queue_size` snapshots, once full the callers
+    will block until the writer catches up.
+
+    Errors occurred while writing are raised by the flush method.
+
+    The files written since the previous flush are synchronized
+    to disk by a flush with `sync` set, such as the one on close.
+
+    """
+    def __init__(self, path: Path, encoding: ImageEncoding = DEFAULT_ENCODING,
+                 queue_size: int = QUEUE_SIZE):
+        self.path = path
+        """Journal folder path."""
+
+        self._error = None
+        self._written = []
+        self._thread = None
+        self._queue = Queue(maxsize=queue_size)
+        self._images = ImageStore(path.joinpath(IMAGE_STORE), encoding)
+        self._logger = logging.getLogger("%s.%s" % (self.__module__,
+                                                    self.__class__.__name__))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the writer thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name='JournalWriter')
+        self._thread.start()
+
+    def close(self):
+        """Write all the queued snapshots, synchronize them to disk
+        and stop the writer thread.
+
+        """
+        if self._thread is None:
+            return
+
+        try:
+            self.flush(sync=True)
+        finally:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def write_node(self, node: Node, reference: Node = None):
+        """Queue the Node for writing.
+
+        If a reference Node is given, the Node image is stored
+        as the difference against the reference Node image.
+
+        """
+        node.path = self.path.joinpath("node%d" % node.index)
+
+        self._queue.put((node, node_dump(node, reference)))
+
+    def write_edge(self, edge: Edge, index: int):
+        """Queue the Edge for writing.
+
+        The index is the position of the Edge within its head Node.
+
+        """
+        edge.path = edge.head.path.joinpath("edge%d" % index)
+
+        self._queue.put((edge, edge_dump(edge, index)))
+
+    def flush(self, sync: bool = False):
+        """Block until all the queued snapshots have been written.
+
+        If `sync` is True, the files written since the previous flush
+        are also synchronized to disk.
+
+        """
+        if not self.running:
+            raise RuntimeError("Journal writer is not running")
+
+        barrier = Barrier(threading.Event(), sync)
+
+        self._queue.put(barrier)
+        barrier.event.wait()
+
+        error, self._error = self._error, None
+        if error is not None:
+            raise RuntimeError("Unable to write the Journal") from error
+
+    def _run(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        while True:
+            job = self._queue.get()
+
+            try:
+                if job is None:
+                    return
+                if isinstance(job, Barrier):
+                    self._barrier(job)
+                else:
+                    self._write(*job)
+            except Exception as error:
+                self._logger.exception("Error writing %s", job)
+                self._error = self._error or error
+            finally:
+                self._queue.task_done()
+
+    def _write(self, element: (Node, Edge), dump: (NodeDump, EdgeDump)):
+        if isinstance(dump, NodeDump):
+            written, image = write_node(dump, self.path, self._images)
+        else:
+            written, image = write_edge(dump, self.path, self._images)
+
+        element.image = image
+        self._written.extend(written)
+
+    def _barrier(self, barrier: Barrier):
+        try:
+            if barrier.sync:
+                for path in self._written:
+                    fsync(path)
+        finally:
+            self._written = []
+            barrier.event.set()
+
+
+def fsync(path: Path):
+    with path.open('ab') as file_handler:
+        os.fsync(file_handler.fileno())
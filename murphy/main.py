@@ -1,56 +1,209 @@
+import time
 import logging
 import argparse
 from pathlib import Path
 
-from murphy.journal import Journal
+from murphy.journal import Journal, ConcurrentJournal
+from murphy.journal.writer import JournalWriter
+from murphy.journal.scheduler import RenderScheduler, RENDER_INTERVAL
+from murphy.journal.encoding import ENCODINGS
 from murphy.agents import application, installer, internet
+from murphy.agents.snapshots import SnapshotTree, SnapshotPolicy
+from murphy.agents.orchestrator import Orchestrator
+from murphy.agents.reset import CheapestReset, SnapshotReset
+from murphy.agents.reset import EscapeReset, RelaunchReset
+from murphy.automation.snapshots import SnapshotBudget
+from murphy.automation.libvirt import LinkedClones
 from murphy import win_libvirt
 from murphy import win_virtualbox
 
 
 def main():
     arguments = parse_arguments()
-    journal = Journal(Path(arguments.journal))
+    journal_type = ConcurrentJournal if arguments.workers > 1 else Journal
+    journal = journal_type(Path(arguments.journal))
+    journal.encoding = ENCODINGS[arguments.encoding]
+    journal.keyframe_interval = arguments.keyframe_interval
+    journal.writer = JournalWriter(journal.path, journal.encoding)
+    renderer = RenderScheduler(
+        journal, format='html_embedded', interval=arguments.render_interval)
+    snapshots = SnapshotTree(
+        journal, SnapshotPolicy(max_snapshots=arguments.snapshots))
+
+    # the initial snapshot is never evicted
+    budget = SnapshotBudget(
+        arguments.snapshots + 1,
+        arguments.snapshot_space * MEGABYTE
+        if arguments.snapshot_space is not None else None)
 
     setup_logging(arguments.debug and 10 or 20)
 
+    if arguments.workers > 1:
+        return explore_clones(arguments, journal, renderer)
+
     if arguments.driver == 'libvirt':
         interpreter = win_libvirt.state_interpreter(
-            arguments.device, scraper_port=arguments.scraper_port)
+            arguments.device, scraper_port=arguments.scraper_port,
+            budget=budget)
     elif arguments.driver == 'virtualbox':
         interpreter = win_virtualbox.state_interpreter(
-            arguments.device, scraper_port=arguments.scraper_port)
+            arguments.device, scraper_port=arguments.scraper_port,
+            budget=budget)
+
+    reset_strategy = reset_strategies(arguments, journal, interpreter,
+                                      snapshots)
 
     if arguments.agent == 'installer':
         agent = installer.ApplicationInstaller(
             interpreter, journal, max_depth=arguments.max_depth,
-            frequency=arguments.state_frequency)
+            frequency=arguments.state_frequency, renderer=renderer,
+            snapshots=snapshots, reset_strategy=reset_strategy)
 
         logging.info("Installing the application under focus.")
     elif arguments.agent == 'explorer':
         agent = application.ApplicationExplorer(
             interpreter, journal, max_depth=arguments.max_depth,
-            frequency=arguments.state_frequency)
+            frequency=arguments.state_frequency, renderer=renderer,
+            snapshots=snapshots, reset_strategy=reset_strategy)
 
         logging.info("Exploring the application under focus.")
     elif arguments.agent == 'internet':
         agent = internet.InternetExplorer(
             interpreter, journal, max_depth=arguments.max_depth,
-            frequency=arguments.state_frequency)
+            frequency=arguments.state_frequency, renderer=renderer,
+            snapshots=snapshots, reset_strategy=reset_strategy)
 
         logging.info("Exploring \"The Internet®\".")
     else:
         raise ValueError("Unknown agent: %s" % arguments.agent)
 
+    journal.writer.start()
+    renderer.start()
+
     try:
         agent.explore(arguments.timeout)
     except Exception as error:
         logging.exception(error)
     finally:
-        logging.info("Restoring device state to intial one.")
-        journal.initial_node.state.restore()
-        logging.info("Cleaning up snapshots.")
-        journal.initial_node.state.discard()
+        try:
+            logging.info("Restoring device state to intial one.")
+            journal.initial_node.state.restore()
+            logging.info("Cleaning up snapshots.")
+            snapshots.discard()
+            journal.initial_node.state.discard()
+            interpreter.control.state.close()
+        finally:
+            close_journal(journal, renderer)
+
+
+def explore_clones(arguments, journal, renderer):
+    """Explore the application in parallel over linked clones of the domain.
+
+    Only the libvirt driver and the explorer agent are supported.
+
+    """
+    if arguments.driver != 'libvirt' or arguments.agent != 'explorer':
+        raise ValueError("Multiple workers require libvirt and explorer")
+
+    domain = win_libvirt.libvirt_domain(arguments.device)
+    clones = LinkedClones(domain.connect(), domain.name(),
+                          Path(arguments.clones_path))
+
+    with clones:
+        logging.info("Cloning %s %d times.", domain.name(), arguments.workers)
+        domains = clones.create(arguments.workers,
+                                snapshot=arguments.clone_snapshot)
+        interpreters = []
+
+        try:
+            for clone in domains:
+                interpreters.append(
+                    clone_interpreter(clone.name(), arguments.scraper_port))
+        except Exception:
+            for interpreter in interpreters:
+                interpreter.control.state.close()
+            raise
+
+        orchestrator = Orchestrator(
+            interpreters, journal, max_depth=arguments.max_depth,
+            frequency=arguments.state_frequency, renderer=renderer)
+
+        journal.writer.start()
+        renderer.start()
+
+        try:
+            orchestrator.explore(arguments.timeout)
+        except Exception as error:
+            logging.exception(error)
+        finally:
+            try:
+                logging.info("Cleaning up snapshots.")
+                orchestrator.close()
+                for interpreter in interpreters:
+                    interpreter.control.state.close()
+            finally:
+                close_journal(journal, renderer)
+
+
+def close_journal(journal, renderer):
+    """Render the Journal and flush it to disk,
+    the renderer and the writer are closed even on failure.
+
+    """
+    try:
+        logging.info("Rendering the journal.")
+        renderer.close()
+    finally:
+        try:
+            logging.info("Flushing the journal to disk.")
+            journal.dump()
+        finally:
+            journal.writer.close()
+
+
+def clone_interpreter(name: str, scraper_port: int):
+    """Wait for the clone to boot and its GUI scraper to respond.
+
+    The Interpreter is created once the clone is reachable,
+    only its State interpretation is retried afterwards.
+
+    """
+    interpreter = None
+    deadline = time.monotonic() + CLONE_TIMEOUT
+
+    while True:
+        try:
+            if interpreter is None:
+                # Workers save only their initial state
+                interpreter = win_libvirt.state_interpreter(
+                    name, scraper_port=scraper_port,
+                    budget=SnapshotBudget(1, None))
+            interpreter.interpret_state()
+
+            return interpreter
+        except Exception as error:
+            if time.monotonic() > deadline:
+                if interpreter is not None:
+                    interpreter.control.state.close()
+                raise RuntimeError("Clone %s not ready" % name) from error
+
+            time.sleep(CLONE_POLL)
+
+
+def reset_strategies(arguments, journal, interpreter,
+                     snapshots) -> CheapestReset:
+    """Restoring the snapshots is the last resort strategy."""
+    strategies = []
+
+    if arguments.escape_reset:
+        strategies.append(EscapeReset(journal, interpreter))
+    if arguments.relaunch is not None:
+        strategies.append(RelaunchReset(journal, interpreter,
+                                        arguments.relaunch))
+
+    strategies.append(SnapshotReset(snapshots))
+
+    return CheapestReset(strategies)
 
 
 def parse_arguments():
@@ -61,6 +214,37 @@ def parse_arguments():
     parser.add_argument(
         '-j', '--journal', type=str, default='journal',
         help='Path where to store the journal and its rendered form')
+    parser.add_argument(
+        '-e', '--encoding', type=str, default='png', choices=ENCODINGS,
+        help='Image encoding policy for the journal dumps and renders')
+    parser.add_argument(
+        '-k', '--keyframe-interval', type=int, default=0,
+        help='Store Node images as differences, one full image every N Nodes')
+    parser.add_argument(
+        '-r', '--render-interval', type=int, default=RENDER_INTERVAL,
+        help='Minimum amount of seconds between journal renderings')
+    parser.add_argument(
+        '-n', '--snapshots', type=int, default=0,
+        help='How many device snapshots to take at deep states')
+    parser.add_argument(
+        '-S', '--snapshot-space', type=int, default=None,
+        help='Maximum disk space in MiB occupied by the device snapshots')
+    parser.add_argument(
+        '-E', '--escape-reset', action='store_true', default=False,
+        help='Try resetting by pressing Escape before restoring snapshots')
+    parser.add_argument(
+        '-R', '--relaunch', type=str, default=None,
+        help='Try resetting by relaunching the application with the command')
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help='Explore in parallel over as many linked clones of the device')
+    parser.add_argument(
+        '--clone-snapshot', type=str, default=None,
+        help='Snapshot of the device the clones start from, '
+        'the current one by default')
+    parser.add_argument(
+        '--clones-path', type=str, default='clones',
+        help='Path where to store the clones disk images')
     parser.add_argument(
         '-s', '--scraper-port', type=int, default=8000,
         help='GUI scraper service port')
@@ -119,5 +303,10 @@ def setup_logging(loglevel):
     logging.getLogger("vncdotool").setLevel(logging.WARNING)
 
 
+MEGABYTE = 1024 * 1024
+CLONE_POLL = 10
+CLONE_TIMEOUT = 600
+
+
 if __name__ == '__main__':
     main()
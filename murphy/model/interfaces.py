@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import NamedTuple
+from typing import Any, NamedTuple
 
 
 Coordinates = NamedTuple('Coordinates', (('left', int),
@@ -34,6 +34,13 @@ class Interpreter:
         """Load a state from a previous dump."""
         raise NotImplementedError()
 
+    def deserialize_state(self, state: dict, image: Any) -> 'State':
+        """Reconstruct a state from its serialized description
+        and its Window image.
+
+        """
+        raise NotImplementedError()
+
 
 class State:
     """The State is the formal description of the GUI application
@@ -90,6 +97,14 @@ class State:
         """
         pass
 
+    def serialize(self) -> dict:
+        """Return a JSON serializable description of the State.
+
+        The Window Image is not part of the description.
+
+        """
+        raise NotImplementedError()
+
 
 class Window:
     """The Window class encapsulates the static information
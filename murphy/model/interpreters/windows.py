@@ -15,6 +15,7 @@ from murphy.model.utils import absolute_coordinates
 from murphy.model import scrapers, Interpreter, State, Window
 from murphy.model import Action, Button, TextBox, Link, ComboBox
 from murphy.model.interpreters.windows_image import compare_images
+from murphy.journal.images import apply_delta
 
 
 Tolerance = NamedTuple('Tolerance', (('image', float),  # image comparison
@@ -58,8 +59,16 @@ class WindowsInterpreter(Interpreter):
             self.control, window, actions, feedback, self.tolerance)
 
     def load_state(self, path: Path) -> 'WinState':
-        feedback = self._raw_feedback(path)
-        image = Image.open(feedback.image)
+        with path.open() as state_file:
+            state = json.load(state_file)
+
+        return self.deserialize_state(
+            state, load_window_image(path.parent, state))
+
+    def deserialize_state(self, state: dict, image: Image) -> 'WinState':
+        feedback = RawFeedback(state['load'], state.get('window'),
+                               load_scraped_window(state['scraped']),
+                               state['state'])
         window = WindowsWindow(feedback.scraped, image)
         actions = tuple(ACTIONS[o.type](self.control, o, window)
                         for o in feedback.scraped.objects if o.type in ACTIONS)
@@ -67,30 +76,18 @@ class WindowsInterpreter(Interpreter):
         return WindowsState(
             self.control, window, actions, feedback, self.tolerance)
 
-    def _raw_feedback(self, path: Path = None) -> 'RawFeedback':
-        """Retrieve raw information from the Feedback class
-        or from a previously dumped state.
+    def _raw_feedback(self) -> 'RawFeedback':
+        """Retrieve raw information from the Feedback class.
 
         Order of calls matters.
 
         """
-        saved = None
+        load = self.feedback.load
+        device_load = load.cpu, load.disk, load.network
+        scraped = self.scraper.scrape_current_window()
+        screenshot = self.feedback.screen.screenshot()
 
-        if path is not None:
-            with path.open() as state_file:
-                state = json.load(state_file)
-
-            screenshot = state['window']
-            saved = state['state']
-            device_load = state['load']
-            scraped = load_scraped_window(state['scraped'])
-        else:
-            load = self.feedback.load
-            device_load = load.cpu, load.disk, load.network
-            scraped = self.scraper.scrape_current_window()
-            screenshot = self.feedback.screen.screenshot()
-
-        return RawFeedback(device_load, screenshot, scraped, saved)
+        return RawFeedback(device_load, screenshot, scraped, None)
 
     def _move_cursor_away(self):
         """Move the mouse cursor away from the screen
@@ -191,6 +188,11 @@ class WindowsState(State):
         else:
             raise RuntimeError("State was not saved")
 
+    def serialize(self) -> dict:
+        return {'state': self._saved_state,
+                'load': self.raw_feedback.load,
+                'scraped': self.raw_feedback.scraped._asdict()}
+
     def dump(self, path: Path):
         image_path = path.joinpath('window.png')
         state_path = path.joinpath('state.json')
@@ -198,10 +200,8 @@ class WindowsState(State):
         path.mkdir(parents=True, exist_ok=True)
         self.window.image.save(image_path)
 
-        state = {'window': str(image_path),
-                 'state': self._saved_state,
-                 'load': self.raw_feedback.load,
-                 'scraped': self.raw_feedback.scraped._asdict()}
+        state = self.serialize()
+        state['window'] = str(image_path)
 
         with state_path.open('w') as state_file:
             json.dump(state, state_file)
@@ -344,6 +344,24 @@ def load_scraped_window(state: dict) -> scrapers.Window:
                            state['scraper'], state['raw'])
 
 
+def load_window_image(path: Path, state: dict) -> Image:
+    """Load the window image of the State dumped in the given Node folder.
+
+    Delta encoded images are applied to the image of their reference Node.
+
+    """
+    if 'delta' not in state:
+        return Image.open(state['window'])
+
+    reference = path.parent.joinpath('node%d' % state['delta']['reference'])
+    with reference.joinpath('state.json').open() as state_file:
+        reference_state = json.load(state_file)
+
+    with Image.open(state['delta']['image']) as delta:
+        return apply_delta(delta, load_window_image(reference,
+                                                    reference_state))
+
+
 ACTIONS = {scrapers.ObjectType.BUTTON: WindowsButton,
            scrapers.ObjectType.TEXTBOX: WindowsTextBox,
            scrapers.ObjectType.LINK: WindowsLink,
@@ -11,6 +11,7 @@ import libvirt
 
 
 from murphy.automation.control import LibvirtControl
+from murphy.automation.snapshots import SnapshotBudget
 from murphy.automation.feedback import LibvirtFeedback
 # from murphy.model.scrapers.winapi import WinAPIScraper
 from murphy.model.scrapers.uiauto import WinUIAutomationScraper
@@ -18,13 +19,19 @@ from murphy.model.interpreters.windows import WindowsInterpreter, Tolerance
 
 
 def state_interpreter(
-        domain_id: (int, str), scraper_port: int = 8000) -> WindowsInterpreter:
-    """Returns a WindowsInterpreter based on libvirt."""
+        domain_id: (int, str), scraper_port: int = 8000,
+        budget: SnapshotBudget = None) -> WindowsInterpreter:
+    """Returns a WindowsInterpreter based on libvirt.
+
+    If a snapshot `budget` is given, the device snapshots
+    are taken in background and kept within the budget.
+
+    """
     domain = libvirt_domain(domain_id)
     address = domain_address(domain)
     vnc_server = domain_vnc_server(domain)
 
-    control = LibvirtControl(vnc_server, domain_id)
+    control = LibvirtControl(vnc_server, domain_id, budget=budget)
     feedback = LibvirtFeedback(vnc_server, domain_id)
     scraper = WinUIAutomationScraper(address, scraper_port, full_scrape=True)
     tolerance = Tolerance(1.6, (0.35, 0.2, 0.18))
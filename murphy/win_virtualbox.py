@@ -8,6 +8,7 @@ from xml.etree import ElementTree
 import virtualbox
 
 from murphy.automation.control import VirtualboxControl
+from murphy.automation.snapshots import SnapshotBudget
 from murphy.automation.feedback import VirtualboxFeedback
 # from murphy.model.scrapers.winapi import WinAPIScraper
 from murphy.model.scrapers.uiauto import WinUIAutomationScraper
@@ -15,11 +16,17 @@ from murphy.model.interpreters.windows import WindowsInterpreter, Tolerance
 
 
 def state_interpreter(
-        machine_id: str, scraper_port: int = 8000) -> WindowsInterpreter:
-    """Returns a WindowsInterpreter based on libvirt."""
+        machine_id: str, scraper_port: int = 8000,
+        budget: SnapshotBudget = None) -> WindowsInterpreter:
+    """Returns a WindowsInterpreter based on libvirt.
+
+    If a snapshot `budget` is given, the device snapshots
+    are taken in background and kept within the budget.
+
+    """
     address = machine_address(machine_id)
 
-    control = VirtualboxControl(machine_id)
+    control = VirtualboxControl(machine_id, budget=budget)
     feedback = VirtualboxFeedback(machine_id)
     scraper = WinUIAutomationScraper(address, scraper_port, full_scrape=True)
     tolerance = Tolerance(1.6, (0.20, 0.1, 0.18))
@@ -0,0 +1,229 @@
+"""Fake States, Interpreters and Graphviz for testing the Journal
+and the Agents.
+
+"""
+
+import json
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from murphy.model import State, Window, Interpreter, Button, Coordinates
+from murphy.journal.viewer import VIEWER_TEMPLATE_PATH
+
+
+class FakeWindow(Window):
+    def __init__(self, title, image):
+        self.title = title
+        self.text = title
+        self._image = image
+        self.coordinates = Coordinates(0, 0, *image.size)
+
+    @property
+    def image(self):
+        return self._image.copy()
+
+
+class FakeButton(Button):
+    def __init__(self, text, coordinates, window, target=None):
+        self.text = text
+        self.coordinates = Coordinates(*coordinates)
+        self.target = target
+        """Called when the Button is performed."""
+        self._window = window
+
+    def __eq__(self, other):
+        return self.text == other.text
+
+    def __hash__(self):
+        return hash(self.text)
+
+    @property
+    def image(self):
+        return self._window.image.crop(self.coordinates)
+
+    def perform(self):
+        if self.target is not None:
+            self.target()
+
+
+class FakeState(State):
+    def __init__(self, title, image, buttons):
+        self.window = FakeWindow(title, image)
+        self.actions = tuple(FakeButton(t, c, self.window)
+                             for t, c in buttons)
+        self.busy = False
+        self.saves = 0
+        self.restores = 0
+        self.discards = 0
+
+    def __eq__(self, other):
+        return (self.window.title == other.window.title and
+                self.window._image.tobytes() ==
+                other.window._image.tobytes())
+
+    def __str__(self):
+        return self.window.title
+
+    def save(self):
+        self.saves += 1
+
+    def restore(self):
+        self.restores += 1
+
+    def discard(self):
+        self.discards += 1
+
+    def serialize(self):
+        return {'title': self.window.title,
+                'buttons': [(a.text, a.coordinates) for a in self.actions]}
+
+
+class FakeApplication:
+    """Application whose pages form a tree, it interprets its own States.
+
+    Each page below `depth` has `width` Buttons leading to its children,
+    the other pages have a Button leading to themselves. Pages but
+    the root have a Back Button leading to their parent if `back`.
+    Restoring a State moves the application back to its page.
+
+    """
+    control = None
+
+    def __init__(self, depth=3, width=2, back=True):
+        self.depth = depth
+        self.width = width
+        self.back = back
+        self.page = ''
+        self.performed = 0
+        self.saves = 0
+        self.restores = 0
+
+    @property
+    def pages(self):
+        """Amount of pages of the application."""
+        return sum(self.width ** d for d in range(self.depth + 1))
+
+    def interpret_state(self):
+        return self.state(self.page)
+
+    def state(self, page):
+        buttons = []
+
+        if len(page) < self.depth:
+            for index in range(self.width):
+                buttons.append((chr(ord('A') + index), page + str(index)))
+        else:
+            buttons.append(('Stay', page))
+        if page and self.back:
+            buttons.append(('Back', page[:-1]))
+
+        state = FakeState('Page %s' % page, make_image('page %s' % page),
+                          [(text, (index * 20, 0, index * 20 + 10, 10))
+                           for index, (text, _) in enumerate(buttons)])
+        state.save = self.save
+        state.restore = lambda: self.go(page, restore=True)
+
+        for action, (_, target) in zip(state.actions, buttons):
+            action.target = lambda target=target: self.go(target)
+
+        return state
+
+    def save(self):
+        self.saves += 1
+
+    def go(self, page, restore=False):
+        if restore:
+            self.restores += 1
+        else:
+            self.performed += 1
+
+        self.page = page
+
+
+class FakeInterpreter(Interpreter):
+    """Interpreter of the fake States, picklable for the merge workers."""
+    def load_state(self, path: Path):
+        with path.open() as state_file:
+            state = json.load(state_file)
+
+        return self.deserialize_state(state, Image.open(state['window']))
+
+    def deserialize_state(self, state, image):
+        return FakeState(state['title'], image.convert('RGB'),
+                         state['buttons'])
+
+
+class FakeGraphviz:
+    """Replacement of run_graphviz writing placeholder outputs.
+
+    Layouts span `size` points, PNG images are sized after
+    the requested viewport if any. The commands are recorded.
+
+    """
+    def __init__(self, size=(600, 400)):
+        self.size = size
+        self.commands = []
+
+    def __call__(self, command, directory):
+        self.commands.append(command)
+        formats = [a[2:] for a in command if a.startswith('-T')]
+        outputs = [Path(directory).joinpath(a[2:]) for a in command
+                   if a.startswith('-o')]
+        viewports = [a[len('-Gviewport='):] for a in command
+                     if a.startswith('-Gviewport=')]
+
+        for format, output in zip(formats, outputs):
+            if format == 'dot':
+                output.write_text('digraph { graph [bb="0,0,%d,%d"]; }' %
+                                  self.size)
+            elif format == 'png':
+                size = (tuple(int(v) for v in viewports[0].split(',')[:2])
+                        if viewports else self.size)
+                Image.new('RGB', size, (255, 255, 255)).save(str(output))
+            elif format == 'cmapx':
+                output.write_text('<map id="journal" name="journal"></map>')
+            else:
+                output.write_text(format)
+
+
+def make_image(text, size=(200, 120)):
+    """White image with the given text, images differ only by their text."""
+    image = Image.new('RGB', size, (240, 240, 240))
+    draw = ImageDraw.Draw(image)
+    draw.text((10, 10), text, fill=(0, 0, 0))
+    draw.rectangle((120, 90, 190, 110), outline=(0, 0, 0))
+
+    return image
+
+
+def make_state(index):
+    """State with a Next and a Back Button."""
+    return FakeState('Page %d' % index, make_image('page %d' % index),
+                     [('Next', (120, 90, 190, 110)),
+                      ('Back', (40, 90, 110, 110))])
+
+
+def make_chain(journal, count):
+    """Add `count` Nodes linked in a chain by their Next and Back Buttons.
+
+    The Nodes are returned in order.
+
+    """
+    nodes = [journal.new_node(make_state(i)) for i in range(count)]
+
+    for head, tail in zip(nodes, nodes[1:]):
+        journal.new_edge(head, head.state.actions[0], tail)
+        journal.new_edge(tail, tail.state.actions[1], head)
+
+    return nodes
+
+
+def viewer_journal(html_path):
+    """Extract the Journal JSON from the viewer page."""
+    with VIEWER_TEMPLATE_PATH.open() as template_file:
+        head = template_file.read().split('{journal}')[0]
+
+    data = html_path.read_text()[len(head):]
+
+    return json.JSONDecoder().raw_decode(data)[0]
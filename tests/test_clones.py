@@ -0,0 +1,203 @@
+import sys
+import types
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from xml.etree import ElementTree
+
+try:
+    import libvirt
+except ImportError:  # the clones are tested against fakes
+    libvirt = types.ModuleType('libvirt')
+    libvirt.libvirtError = type('libvirtError', (Exception, ), {})
+    libvirt.virConnect = libvirt.virDomain = object
+    sys.modules['libvirt'] = libvirt
+
+from murphy.automation.libvirt.clones import LinkedClones
+
+
+DOMAIN_XML = """
+<domain type='kvm'>
+  <name>windows</name>
+  <uuid>4dea22b3-1d52-d8f3-2516-782e98ab3fa0</uuid>
+  <devices>
+    <disk type='file' device='disk'>
+      <driver name='qemu' type='qcow2'/>
+      <source file='/images/a/system.qcow2'/>
+    </disk>
+    <disk type='file' device='disk'>
+      <driver name='qemu' type='raw'/>
+      <source file='/images/b/system.img'/>
+    </disk>
+    <disk type='file' device='cdrom'>
+      <source file='/images/setup.iso'/>
+    </disk>
+    <interface type='network'>
+      <mac address='52:54:00:00:00:01'/>
+    </interface>
+    <graphics type='vnc' port='5900' autoport='no'/>
+  </devices>
+</domain>
+"""
+
+
+class FakeSnapshot:
+    def __init__(self, name):
+        self.name = name
+
+    def getName(self):
+        return self.name
+
+
+class FakeDomain:
+    def __init__(self, xml, snapshot=None):
+        self.xml = xml
+        self.snapshot = snapshot
+        self.active = False
+        self.defined = True
+
+    def name(self):
+        return ElementTree.fromstring(self.xml).find('name').text
+
+    def XMLDesc(self, _):
+        return self.xml
+
+    def snapshotCurrent(self):
+        if self.snapshot is None:
+            raise libvirt.libvirtError("no current snapshot")
+
+        return FakeSnapshot(self.snapshot)
+
+    def create(self):
+        self.active = True
+
+    def isActive(self):
+        return self.active
+
+    def destroy(self):
+        self.active = False
+
+    def undefine(self):
+        self.defined = False
+
+
+class FakeConnection:
+    def __init__(self, domain):
+        self.domains = {domain.name(): domain}
+
+    def lookupByName(self, name):
+        return self.domains[name]
+
+    def defineXML(self, xml):
+        domain = FakeDomain(xml)
+        self.domains[domain.name()] = domain
+
+        return domain
+
+
+def fake_run(arguments, **_):
+    """Create the output image of the qemu-img command."""
+    Path(arguments[-1]).touch()
+
+
+class TestLinkedClones(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = FakeDomain(DOMAIN_XML, snapshot='initial')
+        self.connection = FakeConnection(self.source)
+        self.clones = LinkedClones(self.connection, 'windows',
+                                   Path(self.directory.name))
+
+        patcher = mock.patch('subprocess.run', side_effect=fake_run)
+        self.run = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+    def commands(self, command):
+        return [c[0][0] for c in self.run.call_args_list
+                if c[0][0][1] == command]
+
+    def test_create(self):
+        """Clones are defined, started and uniquely identified."""
+        domains = self.clones.create(2)
+        trees = [ElementTree.fromstring(d.xml) for d in domains]
+
+        self.assertEqual([d.name() for d in domains],
+                         ['windows-clone-0', 'windows-clone-1'])
+        self.assertTrue(all(d.isActive() for d in domains))
+        self.assertTrue(all(t.find('uuid') is None for t in trees))
+
+        addresses = [t.find('./devices/interface/mac').get('address')
+                     for t in trees]
+        self.assertEqual(len(set(addresses + ['52:54:00:00:00:01'])), 3)
+
+        for tree in trees:
+            graphics = tree.find('./devices/graphics')
+            self.assertEqual(graphics.get('autoport'), 'yes')
+            self.assertIsNone(graphics.get('port'))
+
+    def test_base_images(self):
+        """Bases are extracted at the current snapshot in the disk format."""
+        self.clones.create(1)
+        converts = self.commands('convert')
+
+        self.assertEqual(len(converts), 2)
+        self.assertEqual([c[c.index('-f') + 1] for c in converts],
+                         ['qcow2', 'raw'])
+        self.assertIn('snapshot.name=initial', converts[0])
+        self.assertNotIn('-l', converts[1])
+
+    def test_overlays(self):
+        """Overlays of disks with the same name do not collide."""
+        domain = self.clones.create(1)[0]
+        tree = ElementTree.fromstring(domain.xml)
+        sources = [d.find('source').get('file') for d
+                   in tree.iterfind("./devices/disk[@device='disk']")]
+
+        self.assertEqual(len(set(sources)), 2)
+        self.assertTrue(all(s.startswith(self.directory.name)
+                            for s in sources))
+        self.assertTrue(all(c[c.index('-F') + 1] == 'qcow2'
+                            for c in self.commands('create')))
+        self.assertEqual(tree.find("./devices/disk[@device='cdrom']/source")
+                         .get('file'), '/images/setup.iso')
+
+    def test_snapshot(self):
+        """The given snapshot is preferred to the current one."""
+        self.clones.create(1, snapshot='installed')
+
+        convert = self.commands('convert')[0]
+
+        self.assertEqual(convert[convert.index('-l') + 1],
+                         'snapshot.name=installed')
+
+    def test_shared_bases(self):
+        """Further clones reuse the extracted base images."""
+        first = self.clones.create(1)
+        second = self.clones.create(2)
+
+        self.assertEqual(len(self.commands('convert')), 2)
+        self.assertEqual(len(self.commands('create')), 6)
+        self.assertEqual([d.name() for d in first + second],
+                         ['windows-clone-%d' % i for i in range(3)])
+        self.assertEqual(self.clones.domains, first + second)
+
+    def test_no_snapshot(self):
+        """RuntimeError is raised if the domain has no snapshot."""
+        self.source.snapshot = None
+
+        with self.assertRaises(RuntimeError):
+            self.clones.create(1)
+
+    def test_teardown(self):
+        """Clones are destroyed and undefined, their images deleted."""
+        with self.clones as clones:
+            domains = clones.create(2)
+
+        self.assertFalse(any(d.isActive() or d.defined for d in domains))
+        self.assertEqual(list(Path(self.directory.name).iterdir()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
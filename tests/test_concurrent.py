@@ -0,0 +1,157 @@
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from murphy.journal import ConcurrentJournal
+from murphy.journal.concurrent import copy_graph
+
+from fakes import FakeInterpreter, make_chain, make_state
+
+
+def run_threads(count, target):
+    """Run `target(index)` in `count` threads started together."""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(index):
+        barrier.wait()
+        results[index] = target(index)
+
+    threads = [threading.Thread(target=run, args=(i, ))
+               for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+
+class TestConcurrentJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.journal = ConcurrentJournal(self.path, stripes=4)
+        self.addCleanup(self.directory.cleanup)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+
+    def test_find_or_new_node(self):
+        """Threads discovering the same States share their Nodes."""
+        def discover(_):
+            return [self.journal.find_or_new_node(make_state(i))
+                    for i in range(20)]
+
+        results = run_threads(8, discover)
+
+        self.assertEqual(len(self.journal.nodes), 20)
+        self.assertEqual(sorted(n.index for n in self.journal.nodes),
+                         list(range(20)))
+        for i in range(20):
+            found = [r[i] for r in results]
+            self.assertEqual(len({id(n) for n, _ in found}), 1)
+            self.assertEqual(sum(new for _, new in found), 1)
+
+    def test_find_or_new_edge(self):
+        """Threads performing the same transition share the Edge."""
+        head = self.journal.new_node(make_state(0))
+        tail = self.journal.new_node(make_state(1))
+
+        results = run_threads(8, lambda _: self.journal.find_or_new_edge(
+            head, make_state(0).actions[0], tail))
+
+        self.assertEqual(len(head.edges), 1)
+        self.assertEqual(sum(new for _, new in results), 1)
+        self.assertTrue(all(e is head.edges[0] for e, _ in results))
+
+    def test_node_lock(self):
+        nodes = make_chain(self.journal, 2)
+
+        self.assertIs(self.journal.node_lock(nodes[0]),
+                      self.journal.node_lock(nodes[0]))
+        self.assertIsNot(self.journal.node_lock(nodes[0]),
+                         self.journal.node_lock(nodes[1]))
+
+    def test_scores(self):
+        """Scores updated under the Node lock are not lost."""
+        node = self.journal.new_node(make_state(0))
+        action = node.state.actions[0]
+        action.score = 0
+
+        def update(_):
+            for _ in range(200):
+                with self.journal.node_lock(node):
+                    action.score += 1
+
+        run_threads(8, update)
+
+        self.assertEqual(action.score, 1600)
+
+    def test_snapshot(self):
+        """Snapshots are not affected by later insertions."""
+        nodes = make_chain(self.journal, 3)
+        snapshot = self.journal.snapshot()
+
+        self.journal.new_edge(nodes[2], nodes[2].state.actions[0], nodes[0])
+        self.journal.new_node(make_state(3))
+
+        self.assertEqual(len(snapshot), 3)
+        self.assertEqual([len(n.edges) for n in snapshot], [1, 2, 1])
+        self.assertTrue(all(c.state is n.state
+                            for c, n in zip(snapshot, nodes)))
+
+    def test_copy_selection(self):
+        """Edges leading outside the copied Nodes are dropped."""
+        nodes = make_chain(self.journal, 3)
+
+        copies = copy_graph(nodes[:2])
+
+        self.assertEqual([[e.tail.index for e in c.edges] for c in copies],
+                         [[1], [0]])
+        self.assertTrue(all(e.tail in copies for c in copies
+                            for e in c.edges))
+
+    def test_dump_while_exploring(self):
+        """Dumps taken during insertions are consistent."""
+        def explore(index):
+            if index == 0:
+                for _ in range(5):
+                    self.journal.dump()
+                return
+
+            previous, _ = self.journal.find_or_new_node(make_state(0))
+            for i in range(1, 15):
+                node, _ = self.journal.find_or_new_node(make_state(i))
+                self.journal.find_or_new_edge(
+                    previous, previous.state.actions[0], node)
+                previous = node
+
+        run_threads(4, explore)
+        self.journal.dump()
+
+        loaded = ConcurrentJournal(self.path)
+        loaded.load(FakeInterpreter())
+
+        self.assertEqual(len(loaded.nodes), 15)
+        self.assertEqual(sum(len(n.edges) for n in loaded.nodes), 14)
+
+    def test_load(self):
+        """Loaded Nodes are found by State."""
+        make_chain(self.journal, 3)
+        self.journal.dump()
+
+        loaded = ConcurrentJournal(self.path)
+        loaded.load(FakeInterpreter())
+
+        node, new = loaded.find_or_new_node(make_state(1))
+        self.assertFalse(new)
+        self.assertIs(node, loaded.nodes[1])
+        self.assertIsNone(loaded.find_node(make_state(3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
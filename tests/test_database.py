@@ -0,0 +1,90 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from murphy.journal import Journal, Metadata
+from murphy.journal.database import JournalDatabase
+
+from fakes import FakeInterpreter, make_chain, make_state
+
+
+class TestJournalDatabase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.journal = Journal(self.path)
+        self.nodes = make_chain(self.journal, 4)
+        self.addCleanup(self.directory.cleanup)
+
+    def load(self):
+        journal = Journal(self.path)
+        journal.load(FakeInterpreter(), format='sqlite')
+
+        return journal
+
+    def count(self, table):
+        connection = sqlite3.connect(str(self.path.joinpath('journal.db')))
+        try:
+            return connection.execute(
+                'SELECT COUNT(*) FROM %s' % table).fetchone()[0]
+        finally:
+            connection.close()
+
+    def test_round_trip(self):
+        """Nodes, Edges and images are restored from the database."""
+        self.journal.dump(format='sqlite')
+        loaded = self.load()
+
+        self.assertEqual([n.index for n in loaded.nodes], [0, 1, 2, 3])
+        for original, node in zip(self.nodes, loaded.nodes):
+            self.assertEqual(node.state, original.state)
+            self.assertEqual([(e.action.text, e.tail.index)
+                              for e in node.edges],
+                             [(e.action.text, e.tail.index)
+                              for e in original.edges])
+
+    def test_incremental(self):
+        """Only the Nodes and Edges added since the last dump are written."""
+        self.journal.dump(format='sqlite')
+        node = self.journal.new_node(make_state(4))
+        self.journal.new_edge(self.nodes[3], self.nodes[3].state.actions[0],
+                              node)
+        self.journal.dump(format='sqlite')
+
+        self.assertEqual(self.count('nodes'), 5)
+        self.assertEqual(self.count('edges'), 7)
+        self.assertEqual(len(self.load().nodes), 5)
+
+    def test_images_deduplicated(self):
+        """Identical images are stored once."""
+        self.journal.dump(format='sqlite')
+
+        # the Back and Next Buttons images are the same for all Nodes
+        self.assertEqual(self.count('images'), 4 + 2)
+
+    def test_metadata(self):
+        """Metadata are rewritten at every dump."""
+        self.nodes[1].metadata.add(Metadata('title', 'text', Path('a.png')))
+        self.journal.dump(format='sqlite')
+        self.nodes[1].metadata.add(Metadata('other', 'text', Path('b.png')))
+        self.journal.dump(format='sqlite')
+
+        titles = set(m.title for m in self.load().nodes[1].metadata)
+        self.assertEqual(titles, {'title', 'other'})
+        self.assertEqual(self.count('metadata'), 2)
+
+    def test_find_nodes(self):
+        """Nodes are looked up by title and fingerprint."""
+        self.journal.dump(format='sqlite')
+
+        with JournalDatabase(self.path.joinpath('journal.db')) as database:
+            self.assertEqual(database.find_nodes(title='Page 2'), [2])
+            self.assertEqual(
+                database.find_nodes(fingerprint=self.nodes[1].fingerprint),
+                [1])
+            self.assertEqual(database.find_nodes(title='Missing'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
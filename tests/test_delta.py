@@ -0,0 +1,112 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from murphy.journal import Journal
+from murphy.journal.images import delta_image, apply_delta
+from murphy.journal.journal import delta_references, unlinked_deltas
+from murphy.model.interpreters.windows import load_window_image
+
+from fakes import FakeInterpreter, make_chain, make_image, make_state
+
+
+def read_state(path, index):
+    with path.joinpath('node%d' % index, 'state.json').open() as state_file:
+        return json.load(state_file)
+
+
+class TestDeltaImages(unittest.TestCase):
+    def test_round_trip(self):
+        """Applying the delta to the reference rebuilds the image."""
+        image, reference = make_image('image'), make_image('reference')
+        delta = delta_image(image, reference)
+
+        self.assertEqual(apply_delta(delta, reference).tobytes(),
+                         image.tobytes())
+
+    def test_incompatible(self):
+        """Images of different size or mode are not delta encoded."""
+        reference = make_image('reference')
+
+        self.assertIsNone(delta_image(make_image('a', (10, 10)), reference))
+        self.assertIsNone(delta_image(make_image('a').convert('P'),
+                                      reference.convert('P')))
+
+
+class TestDeltaJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.journal = Journal(self.path)
+        self.journal.keyframe_interval = 3
+        self.nodes = make_chain(self.journal, 7)
+        self.addCleanup(self.directory.cleanup)
+
+    def test_keyframes(self):
+        """Keyframes are stored in full, the other Nodes as deltas
+        against their predecessor.
+
+        """
+        self.journal.dump()
+
+        for node in self.nodes:
+            state = read_state(self.path, node.index)
+
+            if node.index % 3 == 0:
+                self.assertIn('window', state)
+                self.assertNotIn('delta', state)
+            else:
+                self.assertEqual(state['delta']['reference'], node.index - 1)
+
+    def test_load(self):
+        """Delta encoded Nodes are reconstructed when loaded."""
+        self.journal.dump()
+        loaded = Journal(self.path)
+        loaded.load(FakeInterpreter())
+
+        self.assertEqual([n.state for n in loaded.nodes],
+                         [n.state for n in self.nodes])
+
+    def test_window_image(self):
+        """The Windows interpreter rebuilds delta encoded images."""
+        self.journal.dump()
+
+        for node in self.nodes:
+            path = self.path.joinpath('node%d' % node.index)
+            image = load_window_image(path, read_state(self.path, node.index))
+
+            self.assertEqual(image.tobytes(),
+                             node.state.window.image.tobytes())
+
+    def test_references(self):
+        """Only older Nodes within the keyframe interval are references."""
+        references = delta_references(self.nodes, 3)
+
+        self.assertEqual({n.index: r.index for n, r in references.items()},
+                         {1: 0, 2: 1, 4: 3, 5: 4})
+
+    def test_unlinked(self):
+        """Nodes not reached by any Edge are not dumped when rendering."""
+        node = self.journal.new_node(make_state(7))
+
+        self.assertEqual(unlinked_deltas(self.journal.nodes, 3), {node})
+
+        with mock.patch('murphy.journal.journal.render_nodes'):
+            self.journal.render()
+        self.assertFalse(self.path.joinpath('node7').exists())
+
+        self.journal.dump()
+        self.assertIn('window', read_state(self.path, 7))
+
+    def test_update_node(self):
+        """Rewritten Nodes keep being delta encoded."""
+        self.journal.dump()
+        self.journal.update_node(self.nodes[2])
+
+        self.assertEqual(read_state(self.path, 2)['delta']['reference'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from murphy.journal import Journal
+from murphy.journal.journal import node_depths
+
+from fakes import FakeInterpreter, make_chain, make_state
+
+
+class TestDepths(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.journal = Journal(self.path)
+        self.addCleanup(self.directory.cleanup)
+
+    def depths(self):
+        return {n.index: self.journal.depth(n) for n in self.journal.nodes}
+
+    def test_chain(self):
+        """Depths are the distances from the initial Node."""
+        make_chain(self.journal, 4)
+
+        self.assertEqual(self.depths(), {0: 0, 1: 1, 2: 2, 3: 3})
+
+    def test_shortcut(self):
+        """A shorter path decreases the depth of the successors."""
+        nodes = make_chain(self.journal, 5)
+        self.journal.new_edge(nodes[0], nodes[0].state.actions[1], nodes[3])
+
+        self.assertEqual(self.depths(), {0: 0, 1: 1, 2: 2, 3: 1, 4: 2})
+
+    def test_unreachable(self):
+        """Unreachable Nodes have no depth until linked."""
+        nodes = make_chain(self.journal, 2)
+        orphan = self.journal.new_node(make_state(2))
+        child = self.journal.new_node(make_state(3))
+        self.journal.new_edge(orphan, orphan.state.actions[0], child)
+
+        with self.assertRaises(LookupError):
+            self.journal.depth(child)
+
+        self.journal.new_edge(nodes[1], nodes[1].state.actions[0], orphan)
+
+        self.assertEqual(self.journal.depth(child), 3)
+
+    def test_random_graph(self):
+        """Incremental depths match a full breadth first search."""
+        generator = random.Random(42)
+        nodes = [self.journal.new_node(make_state(i)) for i in range(30)]
+
+        for _ in range(80):
+            head, tail = generator.choice(nodes), generator.choice(nodes)
+            self.journal.new_edge(head, head.state.actions[0], tail)
+
+            self.assertEqual(
+                {n: self.journal.depth(n) for n in node_depths(nodes[0])},
+                node_depths(nodes[0]))
+
+    def test_load(self):
+        """Depths are computed for the loaded Journals."""
+        nodes = make_chain(self.journal, 3)
+        self.journal.new_edge(nodes[0], nodes[0].state.actions[1], nodes[2])
+        self.journal.dump()
+
+        loaded = Journal(self.path)
+        loaded.load(FakeInterpreter())
+
+        self.assertEqual([loaded.depth(n) for n in loaded.nodes], [0, 1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
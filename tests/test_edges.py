@@ -0,0 +1,68 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from murphy.journal import Journal, Node
+
+from fakes import FakeState, make_image, make_state
+
+
+def buttons_state(title, *buttons):
+    return FakeState(title, make_image(title), buttons)
+
+
+class TestEdgeLookup(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = Journal(Path(self.directory.name))
+        self.addCleanup(self.directory.cleanup)
+
+    def test_find_edges(self):
+        """Edges are found by Action, one per Node the Action led to."""
+        head = Node(make_state(0))
+        first, second = Node(make_state(1)), Node(make_state(2))
+        action = head.state.actions[0]
+
+        edges = (head.new_edge(action, first), head.new_edge(action, second))
+
+        self.assertEqual(head.find_edges(action), edges)
+        self.assertIs(head.find_edge(action), edges[0])
+        self.assertIs(head.find_edge(edges[1]), edges[0])
+        self.assertIsNone(head.find_edge(head.state.actions[1]))
+
+    def test_equivalent_action(self):
+        """Actions of equal States share their Edges."""
+        head = Node(make_state(0))
+        edge = head.new_edge(head.state.actions[0], Node(make_state(1)))
+
+        self.assertIn(make_state(0).actions[0], head)
+        self.assertIn(edge, head)
+        self.assertNotIn(make_state(0).actions[1], head)
+
+    def test_coordinates(self):
+        """Actions with the same text at different places are distinct."""
+        state = buttons_state('Page', ('OK', (0, 0, 10, 10)),
+                              ('OK', (20, 0, 30, 10)))
+        head = Node(state)
+        head.new_edge(state.actions[0], Node(make_state(1)))
+
+        self.assertIn(state.actions[0], head)
+        self.assertNotIn(state.actions[1], head)
+
+    def test_find_or_new_edge(self):
+        """Existing Edges are returned instead of duplicated."""
+        head = self.journal.new_node(make_state(0))
+        tail = self.journal.new_node(make_state(1))
+        action = head.state.actions[0]
+
+        edge, new = self.journal.find_or_new_edge(head, action, tail)
+        same, again = self.journal.find_or_new_edge(head, action, tail)
+
+        self.assertTrue(new)
+        self.assertFalse(again)
+        self.assertIs(edge, same)
+        self.assertEqual(head.edges, [edge])
+
+
+if __name__ == '__main__':
+    unittest.main()
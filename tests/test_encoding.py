@@ -0,0 +1,62 @@
+import tempfile
+import unittest
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image
+
+from murphy.journal import Journal
+from murphy.journal.encoding import ImageEncoding, ENCODINGS
+from murphy.journal.images import image_digest
+
+from fakes import make_chain, make_image
+
+
+class TestImageEncoding(unittest.TestCase):
+    def test_lossless(self):
+        """All the predefined encodings preserve the pixels."""
+        image = make_image('lossless')
+
+        for name, encoding in ENCODINGS.items():
+            stream = BytesIO()
+            encoding.save(image, stream)
+            stream.seek(0)
+
+            with Image.open(stream) as decoded:
+                self.assertEqual(image_digest(decoded.convert('RGB')),
+                                 image_digest(image), name)
+
+    def test_compression(self):
+        """Higher compression yields smaller outputs."""
+        image = make_image('compression', size=(800, 600))
+        sizes = []
+
+        for compression in (0, 9):
+            stream = BytesIO()
+            ImageEncoding('png', compression=compression).save(image, stream)
+            sizes.append(len(stream.getvalue()))
+
+        self.assertLess(sizes[1], sizes[0])
+
+    def test_invalid(self):
+        """Unknown formats and compression levels are rejected."""
+        with self.assertRaises(ValueError):
+            ImageEncoding('gif')
+        with self.assertRaises(ValueError):
+            ImageEncoding('png', compression=10)
+
+    def test_journal_extension(self):
+        """The Journal images are dumped with the chosen encoding."""
+        with tempfile.TemporaryDirectory() as directory:
+            journal = Journal(Path(directory))
+            journal.encoding = ENCODINGS['webp']
+            make_chain(journal, 2)
+            journal.dump()
+
+            images = Path(directory).joinpath('images')
+            self.assertTrue(list(images.rglob('*.webp')))
+            self.assertEqual(list(images.rglob('*.png')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
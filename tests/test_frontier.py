@@ -0,0 +1,135 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from murphy.journal import Journal
+from murphy.agents.frontier import Frontier
+from murphy.agents.application import ApplicationExplorer, available_actions
+
+from fakes import FakeApplication
+
+
+class TestFrontier(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = Journal(Path(self.directory.name))
+        self.application = FakeApplication(depth=2, width=2)
+        self.frontier = Frontier(self.journal, available_actions)
+        self.addCleanup(self.directory.cleanup)
+
+    def visit(self, *pages):
+        """Add the pages to the Journal, each linked to its parent."""
+        nodes = {}
+
+        for page in pages:
+            state = self.application.state(page)
+            nodes[page] = node = self.journal.new_node(state)
+            if page:
+                parent = nodes[page[:-1]]
+                action = parent.state.actions[int(page[-1])]
+                self.journal.new_edge(parent, action, node)
+                back = node.state.actions[-1]
+                self.journal.new_edge(node, back, parent)
+
+        return nodes
+
+    def exhaust(self, node):
+        for action in available_actions(node.state):
+            action.score = 0
+
+    def test_new_nodes(self):
+        """Nodes added to the Journal join the frontier."""
+        nodes = self.visit('', '0')
+
+        self.assertEqual(len(self.frontier), 2)
+        self.assertIn(nodes['0'], self.frontier)
+
+    def test_exhausted(self):
+        """Nodes without untried Actions leave the frontier."""
+        nodes = self.visit('', '0')
+        self.exhaust(nodes['0'])
+
+        self.assertNotIn(nodes['0'], self.frontier)
+        self.assertEqual(self.frontier.nodes(3), [nodes['']])
+
+    def test_route(self):
+        """Routes lead to the nearest Node with untried Actions."""
+        nodes = self.visit('', '0', '1', '00')
+        for page in ('', '0', '00'):
+            self.exhaust(nodes[page])
+
+        route = self.frontier.route(nodes['00'], 3)
+
+        self.assertEqual([(e.head, e.tail) for e in route],
+                         [(nodes['00'], nodes['0']), (nodes['0'], nodes['']),
+                          (nodes[''], nodes['1'])])
+        self.assertEqual(self.frontier.route(nodes['1'], 3), ())
+
+    def test_max_depth(self):
+        """Nodes beyond the max depth are not routed to."""
+        nodes = self.visit('', '0', '00')
+        self.exhaust(nodes[''])
+        self.exhaust(nodes['0'])
+
+        self.assertIsNone(self.frontier.route(nodes[''], 2))
+        self.assertEqual(self.frontier.nodes(2), [])
+        self.assertEqual(len(self.frontier.route(nodes[''], 3)), 2)
+
+
+class TestJournalWalking(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = Journal(Path(self.directory.name))
+        self.addCleanup(self.directory.cleanup)
+
+    def explore(self, application):
+        explorer = ApplicationExplorer(application, self.journal,
+                                       max_depth=4, frequency=0,
+                                       renderer=mock.Mock())
+        with self.assertLogs(level='INFO') as logs:
+            explorer.explore(60)
+
+        self.assertIn("All possible paths have been explored.",
+                      '\n'.join(logs.output))
+
+        return explorer
+
+    def test_walking(self):
+        """Known Edges are walked instead of restoring the device."""
+        application = FakeApplication(depth=3, width=2)
+        self.explore(application)
+
+        self.assertEqual(len(self.journal.nodes), application.pages)
+        self.assertLessEqual(application.restores, 1)
+
+    def test_reset(self):
+        """The device is restored when no route is known."""
+        application = FakeApplication(depth=3, width=2, back=False)
+        self.explore(application)
+
+        self.assertEqual(len(self.journal.nodes), application.pages)
+        self.assertGreater(application.restores, 1)
+
+    def test_diverged(self):
+        """The explorer resets once the route diverges."""
+        application = FakeApplication(depth=1, width=2)
+        explorer = ApplicationExplorer(application, self.journal,
+                                       renderer=mock.Mock())
+        root = self.journal.new_node(application.state(''))
+        child = self.journal.new_node(application.state('0'))
+        self.journal.new_edge(root, root.state.actions[0], child)
+        self.journal.current_node = child
+        self.journal.new_edge(child, child.state.actions[-1], root)
+        for action in available_actions(child.state):
+            action.score = 0
+
+        self.assertTrue(explorer.plan_route())
+        self.assertIsNone(explorer.follow_route(root))
+        self.assertTrue(explorer.resetted)
+        self.assertIs(explorer.reset_node, root)
+        self.assertEqual(application.restores, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import io
+import base64
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from murphy.journal import Journal, Metadata
+from murphy.journal import render
+
+from fakes import FakeGraphviz, make_chain
+
+
+class TestTemplates(unittest.TestCase):
+    def test_fragments(self):
+        """The template is split in literals and replacement fields."""
+        fragments = render.template_fragments(render.JOURNAL_TEMPLATE_PATH)
+        fields = [f for _, f in fragments if f is not None]
+        template = render.load_template(render.JOURNAL_TEMPLATE_PATH)
+
+        self.assertEqual(''.join(l for l, _ in fragments),
+                         template.format(**{f: '' for f in fields}))
+        self.assertTrue({'image', 'map', 'modals', 'scripts'} <= set(fields))
+
+    def test_cached(self):
+        """Templates are read once."""
+        render.load_template(render.MODAL_TEMPLATE_PATH)
+
+        with mock.patch.object(Path, 'open') as open_template:
+            render.load_template(render.MODAL_TEMPLATE_PATH)
+
+        self.assertFalse(open_template.called)
+
+
+class TestStreaming(unittest.TestCase):
+    def test_embedded_chunks(self):
+        """The embedded image is encoded in chunks without padding."""
+        data = bytes(range(256)) * 10
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory).joinpath('image.png')
+            path.write_bytes(data)
+            html = io.StringIO()
+
+            with mock.patch.object(render, 'EMBED_CHUNK', 3 * 7):
+                render.write_image(html, path, True)
+
+        self.assertEqual(html.getvalue(),
+                         render.EMBED_IMAGE + base64.b64encode(data).decode())
+
+    def test_modals(self):
+        """A modal and its script are written for every Metadata."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory)
+            journal = Journal(path)
+            nodes = make_chain(journal, 2)
+            nodes[0].metadata.add(Metadata('node', 'node text', path))
+            nodes[0].edges[0].metadata.add(Metadata('edge', 'a < b', path))
+
+            with mock.patch.object(render, 'run_graphviz',
+                                   side_effect=FakeGraphviz()):
+                page = journal.render(format='html').read_text()
+
+        for identifier in ('0meta0', '01meta0'):
+            self.assertIn('id="modal-%s"' % identifier, page)
+            self.assertIn('var modal_%s' % identifier, page)
+        self.assertIn('a &lt; b', page)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import gc
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from murphy.journal import Journal
+from murphy.journal import render
+
+from fakes import FakeInterpreter, make_chain, make_state
+
+
+class TestImagePaths(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.journal = Journal(self.path)
+        self.nodes = make_chain(self.journal, 3)
+        self.addCleanup(self.directory.cleanup)
+
+    def test_recorded(self):
+        """Dumped and loaded Nodes and Edges know their image paths."""
+        self.journal.dump()
+        loaded = Journal(self.path)
+        loaded.load(FakeInterpreter())
+
+        for journal in (self.journal, loaded):
+            for node in journal.nodes:
+                self.assertTrue(node.image.exists())
+                self.assertTrue(all(e.image.exists() for e in node.edges))
+
+    def test_stored_image(self):
+        """Stored images are rendered as they are."""
+        self.journal.dump()
+
+        with mock.patch.object(render, 'render_image') as render_image:
+            image = render.find_image(self.nodes[1], self.path)
+
+        self.assertEqual(image, self.nodes[1].image)
+        self.assertFalse(render_image.called)
+
+    def test_delta_image(self):
+        """Delta encoded images are rendered once in the render store."""
+        self.journal.keyframe_interval = 3
+        self.journal.dump()
+        node = self.nodes[1]
+
+        self.assertIsNone(node.image)
+
+        with mock.patch.object(render, 'render_image',
+                               wraps=render.render_image) as render_image:
+            first = render.find_image(node, self.path)
+            second = render.find_image(node, self.path)
+
+        self.assertEqual(first, second)
+        self.assertEqual(render_image.call_count, 1)
+        self.assertIn(self.path.joinpath('images', 'render'), first.parents)
+
+    def test_cache_released(self):
+        """The cached renders are dropped with their State."""
+        node = self.journal.new_node(make_state(3))
+        render.find_image(node, self.path)
+        key = id(node.state)
+
+        self.assertIn(key, render.RENDERED_IMAGES)
+
+        self.journal.nodes.remove(node)
+        del node
+        gc.collect()
+
+        self.assertNotIn(key, render.RENDERED_IMAGES)
+
+    def test_not_patched(self):
+        """The model objects are left untouched."""
+        render.find_image(self.nodes[0], self.path)
+
+        self.assertFalse(hasattr(self.nodes[0].state, 'rendered_image'))
+
+
+if __name__ == '__main__':
+    unittest.main()
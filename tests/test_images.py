@@ -0,0 +1,68 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+from murphy.journal import Journal
+from murphy.journal.images import ImageStore, image_digest
+
+from fakes import make_chain, make_image
+
+
+class TestImageStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.store = ImageStore(self.path.joinpath('images'))
+        self.addCleanup(self.directory.cleanup)
+
+    def test_content_addressed(self):
+        """Images are named after the digest of their pixels."""
+        image = make_image('content')
+        path = self.store.store(image)
+
+        self.assertEqual(path.stem, image_digest(image))
+        self.assertEqual(path.parent.name, path.stem[:2])
+        self.assertIn(image_digest(image), self.store)
+
+        with Image.open(str(path)) as stored:
+            self.assertEqual(image_digest(stored), image_digest(image))
+
+    def test_deduplicated(self):
+        """Equal images are written once."""
+        first, new = self.store.add(make_image('same'))
+        second, again = self.store.add(make_image('same'))
+
+        self.assertEqual(first, second)
+        self.assertTrue(new)
+        self.assertFalse(again)
+        self.assertEqual(len(list(self.path.rglob('*.png'))), 1)
+
+    def test_distinct(self):
+        """Different images are stored in different files."""
+        first = self.store.store(make_image('first'))
+        second = self.store.store(make_image('second'))
+
+        self.assertNotEqual(first, second)
+
+    def test_no_temporary_files(self):
+        """Images are written atomically leaving no temporary files."""
+        self.store.store(make_image('atomic'))
+
+        self.assertEqual(list(self.path.rglob('*.tmp')), [])
+
+    def test_journal_dump(self):
+        """Images shared by the Journal Nodes and Edges are stored once."""
+        journal = Journal(self.path)
+        make_chain(journal, 3)
+        journal.dump()
+
+        # 3 Node images, the Next and Back Buttons images
+        self.assertEqual(
+            len(list(self.path.joinpath('images').rglob('*.png'))), 5)
+        self.assertEqual(list(self.path.glob('node*/*.png')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
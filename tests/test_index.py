@@ -0,0 +1,104 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from murphy.journal import Journal
+from murphy.journal.index import JournalIndex
+from murphy.journal.journal import node_depths
+
+from fakes import make_chain, make_state
+
+
+class TestJournalIndex(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = Journal(Path(self.directory.name))
+        self.addCleanup(self.directory.cleanup)
+
+    def random_graph(self, nodes, edges, seed=42):
+        generator = random.Random(seed)
+        nodes = [self.journal.new_node(make_state(i)) for i in range(nodes)]
+
+        for _ in range(edges):
+            head, tail = generator.choice(nodes), generator.choice(nodes)
+            self.journal.new_edge(head, head.state.actions[0], tail)
+
+        return nodes
+
+    def test_distances(self):
+        """Distances match a breadth first search from every Node."""
+        nodes = self.random_graph(40, 70)
+        index = JournalIndex(nodes)
+
+        for source in nodes:
+            self.assertEqual(index.distances(source), node_depths(source))
+
+    def test_reachability(self):
+        """Reachability matches a breadth first search from every Node."""
+        nodes = self.random_graph(40, 70, seed=7)
+        index = JournalIndex(nodes)
+
+        for source in nodes:
+            reachable = set(node_depths(source))
+
+            self.assertEqual(set(index.reachable_nodes(source)), reachable)
+            for target in nodes:
+                self.assertEqual(index.reachable(source, target),
+                                 target in reachable)
+
+    def test_find_path(self):
+        """Paths are the shortest sequences of Edges between the Nodes."""
+        nodes = make_chain(self.journal, 5)
+        index = self.journal.index
+
+        path = index.find_path(nodes[4], nodes[1])
+        self.assertEqual([(e.head.index, e.tail.index) for e in path],
+                         [(4, 3), (3, 2), (2, 1)])
+        self.assertEqual(index.find_path(nodes[2], nodes[2]), ())
+        self.assertEqual(index.distance(nodes[0], nodes[4]), 4)
+
+    def test_unreachable(self):
+        nodes = make_chain(self.journal, 2)
+        orphan = self.journal.new_node(make_state(2))
+        index = self.journal.index
+
+        self.assertIsNone(index.find_path(nodes[0], orphan))
+        self.assertFalse(index.reachable(nodes[0], orphan))
+        with self.assertRaises(LookupError):
+            index.distance(nodes[0], orphan)
+
+    def test_rebuilt(self):
+        """The Journal index is rebuilt once the graph changes."""
+        nodes = make_chain(self.journal, 2)
+        index = self.journal.index
+
+        self.assertIs(self.journal.index, index)
+
+        orphan = self.journal.new_node(make_state(2))
+        self.assertIsNot(self.journal.index, index)
+
+        self.journal.new_edge(nodes[1], nodes[1].state.actions[0], orphan)
+        self.assertTrue(self.journal.index.reachable(nodes[0], orphan))
+
+    def test_unknown_node(self):
+        """Nodes not indexed raise LookupError."""
+        index = JournalIndex(make_chain(self.journal, 2))
+        node = self.journal.new_node(make_state(2))
+
+        with self.assertRaises(LookupError):
+            index.distances(node)
+
+    def test_cache_size(self):
+        """The cached search trees are bounded."""
+        nodes = self.random_graph(10, 20)
+        index = JournalIndex(nodes, cache_size=3)
+
+        for node in nodes:
+            index.distances(node)
+
+        self.assertEqual(len(index._trees), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import json
+import tempfile
+import unittest
+import multiprocessing
+from pathlib import Path
+from unittest import mock
+
+from murphy.journal import Journal
+from murphy.journal import merge
+
+from fakes import FakeInterpreter, make_chain, make_state
+
+
+class TestMerge(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.addCleanup(self.directory.cleanup)
+
+    def source(self, name, count, keyframe_interval=None):
+        journal = Journal(self.path.joinpath(name))
+        if keyframe_interval is not None:
+            journal.keyframe_interval = keyframe_interval
+        make_chain(journal, count)
+        journal.dump()
+
+        return str(journal.path)
+
+    def merge(self, sources, processes=1):
+        journal = Journal(self.path.joinpath('merged'))
+        mapping = journal.merge(sources, FakeInterpreter,
+                                processes=processes)
+
+        merged = Journal(journal.path)
+        merged.load(FakeInterpreter())
+
+        return mapping, merged
+
+    def assertChain(self, journal, count):
+        self.assertEqual([str(n.state) for n in journal.nodes],
+                         ['Page %d' % i for i in range(count)])
+        self.assertEqual(
+            sorted((e.head.index, e.tail.index, e.action.text)
+                   for n in journal.nodes for e in n.edges),
+            sorted([(i, i + 1, 'Next') for i in range(count - 1)] +
+                   [(i + 1, i, 'Back') for i in range(count - 1)]))
+
+    def test_merge(self):
+        """Equivalent Nodes are merged, Edges are not duplicated."""
+        mapping, merged = self.merge([self.source('a', 4),
+                                      self.source('b', 6)])
+
+        self.assertChain(merged, 6)
+        self.assertEqual(len(mapping), 10)
+        self.assertEqual([mapping[1, i] for i in range(6)], list(range(6)))
+        self.assertEqual([mapping[0, i] for i in range(4)], list(range(4)))
+
+    def test_content_addressed(self):
+        """Each distinct image is stored once."""
+        self.merge([self.source('a', 4), self.source('b', 4)])
+        images = self.path.joinpath('merged', 'images')
+
+        # the Next and Back Buttons look the same on every page
+        self.assertEqual(len([p for p in images.rglob('*') if p.is_file()]),
+                         4 + 2)
+
+    def test_delta_sources(self):
+        """Delta encoded sources are merged with the plain ones."""
+        _, merged = self.merge([self.source('a', 5, keyframe_interval=3),
+                                self.source('b', 3)])
+
+        self.assertChain(merged, 5)
+        for node in merged.nodes:
+            self.assertEqual(node.state, make_state(node.index))
+
+    def test_window_images(self):
+        """Nodes recording their window image are merged as well."""
+        source = self.path.joinpath('baseline')
+
+        for index in range(3):
+            state = make_state(index)
+            path = source.joinpath('node%d' % index)
+            path.mkdir(parents=True)
+            state.window.image.save(str(path.joinpath('window.png')))
+            description = dict(state.serialize(),
+                               window=str(path.joinpath('window.png')))
+            with path.joinpath('state.json').open('w') as state_file:
+                json.dump(description, state_file)
+
+        mapping, merged = self.merge([self.source('a', 2), str(source)])
+
+        self.assertEqual(len(merged.nodes), 3)
+        self.assertEqual(mapping[1, 1], 1)
+        self.assertEqual(merged.nodes[2].state, make_state(2))
+
+    def test_processes(self):
+        """The States are compared within a pool of spawned processes."""
+        context = multiprocessing.get_context('spawn')
+
+        with mock.patch.object(merge.multiprocessing, 'Pool', context.Pool):
+            _, merged = self.merge([self.source('a', 3),
+                                    self.source('b', 4)], processes=2)
+
+        self.assertChain(merged, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
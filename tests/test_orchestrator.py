@@ -0,0 +1,168 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from murphy.journal import ConcurrentJournal
+from murphy.agents.application import available_actions
+from murphy.agents.orchestrator import (Orchestrator, Worker, Claims,
+                                        ClaimedFrontier, SharedJournal)
+
+from fakes import FakeApplication, make_state
+
+
+class TestClaims(unittest.TestCase):
+    def test_claims(self):
+        """Each owner holds one claim at most."""
+        claims = Claims()
+        first, second = object(), object()
+
+        claims.claim('a', first)
+        claims.claim('b', first)
+
+        self.assertTrue(claims.taken('b', second))
+        self.assertFalse(claims.taken('a', second))
+        self.assertFalse(claims.taken('b', first))
+        self.assertTrue(claims.outstanding(second))
+        self.assertFalse(claims.outstanding(first))
+
+        claims.release(first)
+
+        self.assertFalse(claims.outstanding(second))
+
+
+class OrchestratorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = ConcurrentJournal(Path(self.directory.name))
+        self.addCleanup(self.directory.cleanup)
+
+    def orchestrator(self, applications, max_depth=4):
+        orchestrator = Orchestrator(applications, self.journal,
+                                    max_depth=max_depth, frequency=0,
+                                    renderer=mock.Mock())
+        self.addCleanup(orchestrator.close)
+
+        return orchestrator
+
+
+class TestClaimedFrontier(OrchestratorTestCase):
+    def test_claimed(self):
+        """Nodes claimed by other Workers are out of the frontier."""
+        claims = Claims()
+        node = self.journal.new_node(make_state(0))
+        mine = ClaimedFrontier(SharedJournal(self.journal),
+                               available_actions, claims, 'mine')
+        other = ClaimedFrontier(SharedJournal(self.journal),
+                                available_actions, claims, 'other')
+
+        claims.claim(node, 'mine')
+
+        self.assertIn(node, mine)
+        self.assertNotIn(node, other)
+
+
+class TestOrchestrator(OrchestratorTestCase):
+    def test_explore(self):
+        """The Workers explore the application once, together."""
+        applications = [FakeApplication(depth=3, width=2) for _ in range(3)]
+        orchestrator = self.orchestrator(applications)
+
+        orchestrator.explore(60)
+
+        self.assertEqual(len(self.journal.nodes), applications[0].pages)
+        self.assertEqual(sum(w.discovered for w in orchestrator.workers),
+                         applications[0].pages)
+        self.assertTrue(all(a.performed for a in applications))
+        self.assertEqual(len({str(n.state) for n in self.journal.nodes}),
+                         applications[0].pages)
+
+    def test_shared_scores(self):
+        """The shared Action scores are never overdrawn."""
+        applications = [FakeApplication(depth=2, width=2) for _ in range(2)]
+        self.orchestrator(applications).explore(60)
+
+        for node in self.journal.nodes:
+            for action in node.state.actions:
+                self.assertGreaterEqual(action.score, 0)
+
+    def test_setup(self):
+        """Workers save their initial State and reset through it."""
+        applications = [FakeApplication(depth=1), FakeApplication(depth=1)]
+        orchestrator = self.orchestrator(applications)
+
+        for worker in orchestrator.workers:
+            worker.setup()
+
+        self.assertEqual([a.saves for a in applications], [1, 1])
+        self.assertEqual(len(self.journal.nodes), 1)
+        self.assertEqual([w.discovered for w in orchestrator.workers],
+                         [1, 0])
+
+        worker = orchestrator.workers[1]
+        applications[1].page = '0'
+        worker.reset()
+
+        self.assertEqual(applications[1].page, '')
+        self.assertEqual(applications[1].restores, 1)
+        self.assertEqual(applications[0].restores, 0)
+
+    def test_failure(self):
+        """A failing Worker releases its claims."""
+        orchestrator = self.orchestrator([FakeApplication(depth=1)])
+        worker = orchestrator.workers[0]
+        orchestrator.claims.claim('node', worker)
+
+        with mock.patch.object(Worker, 'explore', side_effect=ValueError), \
+                self.assertLogs('murphy.agents.orchestrator', level='ERROR'):
+            orchestrator.explore(60)
+
+        self.assertFalse(orchestrator.claims.outstanding(None))
+
+
+class TestWorker(OrchestratorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.application = FakeApplication(depth=1)
+        self.claims = Claims()
+        self.worker = Worker(self.application, SharedJournal(self.journal),
+                             self.claims, frequency=0, renderer=mock.Mock())
+        self.worker.setup()
+
+    def test_waiting(self):
+        """Workers wait for the claims of the others to be released."""
+        self.claims.claim(self.journal.initial_node, self)
+        self.claims.claim(self.journal.initial_node, self.worker)
+
+        with self.assertLogs(level='INFO'):
+            self.assertFalse(self.worker.explored())
+        self.assertFalse(self.claims.taken(self.journal.initial_node, self))
+
+        self.claims.release(self)
+
+        self.assertTrue(self.worker.explored())
+
+    def test_equivalent_action(self):
+        """Actions of the shared States are performed on the own device."""
+        other = FakeApplication(depth=1).state('')
+        self.worker.current_state()
+
+        self.assertTrue(self.worker.perform(other.actions[1]))
+        self.assertEqual(self.application.page, '1')
+
+        with self.assertLogs(level='INFO'):
+            self.assertFalse(self.worker.perform(
+                FakeApplication(depth=0).state('').actions[0]))
+
+    def test_teardown(self):
+        """The claims are released and the initial State discarded."""
+        self.claims.claim(self.journal.initial_node, self.worker)
+
+        self.worker.teardown()
+
+        self.assertFalse(self.claims.outstanding(None))
+        self.assertEqual(self.worker.initial_state.discards, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
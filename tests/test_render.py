@@ -0,0 +1,55 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from murphy.journal import Journal
+
+from fakes import FakeGraphviz, make_chain
+
+
+class TestRenderHTML(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.journal = Journal(self.path)
+        self.nodes = make_chain(self.journal, 3)
+        self.graphviz = FakeGraphviz()
+
+        patcher = mock.patch('murphy.journal.render.run_graphviz',
+                             side_effect=self.graphviz)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+    def test_single_run(self):
+        """The image and the map are rendered by a single Graphviz run."""
+        html_path = self.journal.render(format='html')
+
+        self.assertEqual(len(self.graphviz.commands), 1)
+        command = self.graphviz.commands[0]
+        self.assertIn('-Tpng', command)
+        self.assertIn('-Tcmapx', command)
+
+        self.assertEqual(html_path, self.path.joinpath('journal.html'))
+        self.assertIn('<map id="journal"', html_path.read_text())
+        self.assertEqual(list(self.path.glob('*.cmapx')), [])
+        self.assertTrue(list(self.path.glob('journal*.png')))
+
+    def test_embedded(self):
+        """The embedded image is inlined and its file removed."""
+        html_path = self.journal.render(format='html_embedded')
+
+        self.assertIn('data:image/png;base64,', html_path.read_text())
+        self.assertEqual(list(self.path.glob('journal*.png')), [])
+
+    def test_dot_format(self):
+        """Other formats are rendered as they are."""
+        path = self.journal.render(format='svg')
+
+        self.assertEqual(path.read_text(), 'svg')
+        self.assertEqual(self.graphviz.commands[0].count('-Tsvg'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
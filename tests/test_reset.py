@@ -0,0 +1,176 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from murphy.journal import Journal
+from murphy.agents import reset
+from murphy.agents.reset import (ResetStrategy, CheapestReset, StateReset,
+                                 EscapeReset, closest_route)
+
+from fakes import make_chain, make_state
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeStrategy(ResetStrategy):
+    """Takes `latency` seconds, fails while `failures` are left."""
+    def __init__(self, name, latency, clock, node, failures=0):
+        self.name = name
+        self.latency = latency
+        self.clock = clock
+        self.node = node
+        self.failures = failures
+        self.calls = 0
+
+    def reset(self, targets):
+        self.calls += 1
+        self.clock.now += self.latency
+
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("%s failed" % self.name)
+
+        return self.node, ()
+
+
+class TestCheapestReset(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(reset.time, 'monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def strategies(self, *specs):
+        return [FakeStrategy(name, latency, self.clock, name, failures)
+                for name, latency, failures in specs]
+
+    def test_untried_first(self):
+        """Untried strategies are tried first in the given order."""
+        fast, slow = self.strategies(('fast', 1, 0), ('slow', 10, 0))
+        strategy = CheapestReset((slow, fast))
+
+        self.assertEqual(strategy.ranking(), [slow, fast])
+
+    def test_cheapest(self):
+        """Once measured, the cheapest strategy is chosen."""
+        fast, slow = self.strategies(('fast', 1, 0), ('slow', 10, 0))
+        strategy = CheapestReset((slow, fast))
+        strategy.stats[slow].record(10, True)
+        strategy.stats[fast].record(1, True)
+
+        self.assertEqual(strategy.reset([]), ('fast', ()))
+        self.assertEqual(strategy.stats[fast].attempts, 2)
+        self.assertEqual(strategy.stats[fast].mean_latency, 1)
+        self.assertEqual(slow.calls, 0)
+
+    def test_fallback(self):
+        """Failing strategies fall back to the next cheapest one."""
+        flaky, slow = self.strategies(('flaky', 1, 1), ('slow', 10, 0))
+        strategy = CheapestReset((flaky, slow))
+
+        with self.assertLogs('murphy.agents.reset', level='WARNING'):
+            self.assertEqual(strategy.reset([]), ('slow', ()))
+
+        self.assertEqual(strategy.stats[flaky].successes, 0)
+        self.assertEqual(strategy.stats[flaky].attempts, 1)
+        self.assertEqual(strategy.stats[slow].successes, 1)
+
+    def test_success_rate(self):
+        """Unreliable strategies cost more than their latency."""
+        flaky, steady = self.strategies(('flaky', 2, 3), ('steady', 3, 0))
+        strategy = CheapestReset((flaky, steady))
+
+        with self.assertLogs('murphy.agents.reset', level='WARNING'):
+            for _ in range(3):
+                strategy.reset([])
+
+        self.assertEqual(strategy.ranking(), [steady, flaky])
+        self.assertEqual(strategy.stats[steady].cost, 3 / (4 / 5))
+
+    def test_all_failed(self):
+        strategies = self.strategies(('first', 1, 1), ('second', 1, 1))
+        strategy = CheapestReset(strategies)
+
+        with self.assertLogs('murphy.agents.reset', level='WARNING'):
+            with self.assertRaises(RuntimeError):
+                strategy.reset([])
+
+
+class FakeKeyboard:
+    def __init__(self):
+        self.pressed = []
+
+    def press(self, key):
+        self.pressed.append(key)
+
+
+class TestStrategies(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = Journal(Path(self.directory.name))
+        self.nodes = make_chain(self.journal, 4)
+        self.addCleanup(self.directory.cleanup)
+
+    def test_closest_route(self):
+        route = closest_route(self.journal, self.nodes[1],
+                              [self.nodes[0], self.nodes[3]])
+
+        self.assertEqual([e.tail for e in route], [self.nodes[0]])
+        self.assertIsNone(closest_route(
+            self.journal, self.nodes[1],
+            [self.journal.new_node(make_state(4))]))
+
+    def test_state_reset(self):
+        """The external State is restored and routed from its Node."""
+        state = make_state(1)
+        strategy = StateReset(self.journal, state, self.nodes[1])
+
+        node, route = strategy.reset([self.nodes[3]])
+
+        self.assertIs(node, self.nodes[1])
+        self.assertEqual([e.tail for e in route],
+                         [self.nodes[2], self.nodes[3]])
+        self.assertEqual(state.restores, 1)
+
+    def escape(self, states, attempts=3):
+        """EscapeReset over an interpreter returning the given States."""
+        states = iter(states)
+        interpreter = mock.Mock()
+        interpreter.interpret_state.side_effect = lambda: next(states)
+        interpreter.control.keyboard = FakeKeyboard()
+
+        return EscapeReset(self.journal, interpreter,
+                           attempts=attempts, delay=0)
+
+    def test_escape(self):
+        """Escape is pressed until a known Node leads to the targets."""
+        strategy = self.escape([make_state(9), make_state(2)])
+
+        node, route = strategy.reset([self.nodes[3]])
+
+        self.assertIs(node, self.nodes[2])
+        self.assertEqual(len(route), 1)
+        self.assertEqual(strategy.keyboard.pressed, ['esc', 'esc'])
+
+    def test_escape_initial(self):
+        """Without targets only the initial Node is accepted."""
+        strategy = self.escape([make_state(2), make_state(0)])
+
+        self.assertEqual(strategy.reset([]), (self.nodes[0], ()))
+
+    def test_escape_failed(self):
+        strategy = self.escape([make_state(9)] * 2, attempts=2)
+
+        with self.assertRaises(RuntimeError):
+            strategy.reset([self.nodes[3]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import time
+import threading
+import unittest
+
+from murphy.journal.scheduler import RenderScheduler, journal_signature
+
+
+class FakeJournal:
+    """Journal counting its renderings."""
+    def __init__(self):
+        self.nodes = []
+        self.renders = 0
+        self.rendered = threading.Event()
+
+    def add(self):
+        self.nodes.append(FakeNode())
+
+    def render(self, format):
+        self.renders += 1
+        self.rendered.set()
+
+        return format
+
+
+class FakeNode:
+    def __init__(self):
+        self.edges = []
+        self.metadata = set()
+
+
+class TestRenderScheduler(unittest.TestCase):
+    def setUp(self):
+        self.journal = FakeJournal()
+
+    def scheduler(self, interval):
+        scheduler = RenderScheduler(self.journal, interval=interval)
+        scheduler.start()
+        self.addCleanup(scheduler.close)
+
+        return scheduler
+
+    def test_coalesced(self):
+        """Requests within the interval are served by a single render."""
+        scheduler = self.scheduler(60)
+        self.journal.add()
+        scheduler.render()
+
+        for _ in range(10):
+            self.journal.add()
+            scheduler.request()
+
+        time.sleep(0.2)
+        self.assertEqual(self.journal.renders, 1)
+
+        # the pending requests are served on close
+        scheduler.close()
+        self.assertEqual(self.journal.renders, 2)
+
+    def test_forced(self):
+        """Forced requests are served without waiting for the interval."""
+        scheduler = self.scheduler(60)
+        self.journal.add()
+
+        scheduler.request(force=True)
+
+        self.assertTrue(self.journal.rendered.wait(5))
+
+    def test_render(self):
+        """On demand renders block until served."""
+        scheduler = self.scheduler(60)
+        self.journal.add()
+
+        start = time.monotonic()
+        scheduler.render()
+
+        self.assertEqual(self.journal.renders, 1)
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_unchanged(self):
+        """Renders of an unchanged Journal are skipped."""
+        scheduler = self.scheduler(0)
+        self.journal.add()
+
+        scheduler.render()
+        scheduler.render()
+        self.journal.add()
+        scheduler.render()
+
+        self.assertEqual(self.journal.renders, 2)
+
+    def test_signature(self):
+        """The signature reflects new Nodes, Edges and Metadata."""
+        self.journal.add()
+        signature = journal_signature(self.journal)
+
+        self.journal.nodes[0].edges.append(FakeNode())
+        self.assertNotEqual(journal_signature(self.journal), signature)
+
+    def test_close(self):
+        """Closing without pending requests does not render."""
+        scheduler = self.scheduler(60)
+        scheduler.close()
+
+        self.assertFalse(scheduler.running)
+        self.assertEqual(self.journal.renders, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
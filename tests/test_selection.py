@@ -0,0 +1,65 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from murphy.journal import Journal
+
+from fakes import make_chain, make_state, viewer_journal
+
+
+class TestSelection(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.journal = Journal(self.path)
+        self.nodes = make_chain(self.journal, 5)
+        self.isolated = self.journal.new_node(make_state(5))
+        self.addCleanup(self.directory.cleanup)
+
+    def indexes(self, nodes):
+        return [n.index for n in nodes]
+
+    def test_path_to(self):
+        """The shortest path from the initial Node is selected."""
+        self.assertEqual(self.indexes(self.journal.path_to(self.nodes[3])),
+                         [0, 1, 2, 3])
+        self.assertEqual(self.indexes(self.journal.path_to(self.nodes[0])),
+                         [0])
+
+        with self.assertRaises(LookupError):
+            self.journal.path_to(self.isolated)
+
+    def test_neighbourhood(self):
+        """Nodes within the given hops are selected in both directions."""
+        self.assertEqual(
+            self.indexes(self.journal.neighbourhood(self.nodes[2])),
+            [1, 2, 3])
+        self.assertEqual(
+            self.indexes(self.journal.neighbourhood(self.nodes[0], 2)),
+            [0, 1, 2])
+        self.assertEqual(
+            self.indexes(self.journal.neighbourhood(self.isolated, 3)), [5])
+
+    def test_nodes_since(self):
+        self.assertEqual(self.indexes(self.journal.nodes_since(4)), [4, 5])
+
+    def test_render(self):
+        """Selections are rendered under their own name without dumping,
+        only the Edges among the selected Nodes are shown.
+
+        """
+        selection = self.journal.neighbourhood(self.nodes[2])
+        html_path = self.journal.render(format='viewer', nodes=selection)
+        journal = viewer_journal(html_path)
+
+        self.assertEqual(html_path.name, 'selection_viewer.html')
+        self.assertEqual([n['id'] for n in journal['nodes']], [1, 2, 3])
+        self.assertEqual(sorted((e['head'], e['tail'])
+                                for e in journal['edges']),
+                         [(1, 2), (2, 1), (2, 3), (3, 2)])
+        self.assertEqual(list(self.path.glob('node*')), [])
+        self.assertFalse(self.path.joinpath('journal_viewer.html').exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,259 @@
+import sys
+import json
+import types
+import unittest
+from unittest import mock
+
+try:
+    import libvirt
+except ImportError:  # the libvirt state is tested against fakes
+    libvirt = types.ModuleType('libvirt')
+    libvirt.libvirtError = type('libvirtError', (Exception, ), {})
+    libvirt.virConnect = libvirt.virDomain = object
+    sys.modules['libvirt'] = libvirt
+
+from murphy.automation.interfaces import DeviceState
+from murphy.automation.snapshots import SnapshotManager, SnapshotBudget
+from murphy.automation.libvirt.state import LibvirtState
+
+
+DOMAIN_XML = """
+<domain type='kvm'>
+  <devices>
+    <disk type='file' device='disk'>
+      <source file='/images/system.qcow2'/>
+    </disk>
+    <disk type='file' device='cdrom'>
+      <source file='/images/setup.iso'/>
+    </disk>
+  </devices>
+</domain>
+"""
+
+
+class FakeDeviceState(DeviceState):
+    """Records the operations, the saved states wrap the snapshot names."""
+    def __init__(self, size=None):
+        self.saved = []
+        self.restored = []
+        self.discarded = []
+        self.failing = False
+        self._size = size
+
+    def save(self, name=None):
+        if self.failing:
+            raise RuntimeError("Unable to save")
+
+        self.saved.append(name)
+
+        return 'device-%s' % name
+
+    def restore(self, state):
+        self.restored.append(state)
+
+    def discard(self, state):
+        self.discarded.append(state)
+
+    def size(self, state):
+        if self._size is None:
+            raise NotImplementedError()
+
+        return self._size
+
+
+class TestSnapshotManager(unittest.TestCase):
+    def manager(self, device=None, **kwargs):
+        self.device = device if device is not None else FakeDeviceState()
+        manager = SnapshotManager(self.device, **kwargs)
+        self.addCleanup(manager.close)
+
+        return manager
+
+    def save(self, manager, count):
+        names = []
+
+        for _ in range(count):
+            manager.touch()
+            names.append(manager.save())
+            manager.wait()
+
+        return names
+
+    def test_background(self):
+        """Snapshots are taken in background, named after their id."""
+        manager = self.manager()
+        name = manager.save()
+        manager.wait()
+
+        self.assertEqual(self.device.saved, [name])
+
+        manager.restore(name)
+
+        self.assertEqual(self.device.restored, ['device-%s' % name])
+        self.assertEqual(manager.snapshots[name].restores, 1)
+
+    def test_count_budget(self):
+        """The least useful snapshots are evicted, the first one is kept."""
+        manager = self.manager(budget=SnapshotBudget(3, None))
+        first, second, third = self.save(manager, 3)
+        manager.restore(second)
+
+        fourth, = self.save(manager, 1)
+
+        self.assertEqual(set(manager.snapshots), {first, second, fourth})
+        self.assertEqual(self.device.discarded, ['device-%s' % third])
+        with self.assertRaises(RuntimeError):
+            manager.restore(third)
+
+    def test_size_budget(self):
+        """Snapshots are evicted once they exceed the disk space."""
+        manager = self.manager(FakeDeviceState(size=100),
+                               budget=SnapshotBudget(None, 250))
+        first, second, third = self.save(manager, 3)
+
+        self.assertEqual(set(manager.snapshots), {first, third})
+        self.assertEqual(manager.size, 200)
+
+    def test_pinned(self):
+        """Pinned snapshots are never evicted."""
+        manager = self.manager(budget=SnapshotBudget(2, None))
+        first, second = self.save(manager, 2)
+        manager.pin(second)
+
+        third, fourth = self.save(manager, 2)
+
+        self.assertEqual(set(manager.snapshots), {first, second, fourth})
+        self.assertEqual(self.device.discarded, ['device-%s' % third])
+
+    def test_unknown(self):
+        """Snapshots unknown to the manager are restored by name."""
+        manager = self.manager()
+        manager.restore('previous')
+
+        self.assertEqual(self.device.restored, ['previous'])
+
+    def test_discard(self):
+        manager = self.manager()
+        name, = self.save(manager, 1)
+        manager.discard(name)
+        manager.wait()
+
+        self.assertEqual(self.device.discarded, ['device-%s' % name])
+        with self.assertRaises(RuntimeError):
+            manager.restore(name)
+
+    def test_failure(self):
+        """Snapshots which could not be taken cannot be restored."""
+        device = FakeDeviceState()
+        device.failing = True
+        manager = self.manager(device)
+
+        with self.assertLogs('murphy.automation.snapshots', level='ERROR'):
+            name, = self.save(manager, 1)
+
+        with self.assertRaises(RuntimeError):
+            manager.restore(name)
+
+    def test_touch(self):
+        """Only the first notification after a snapshot is relevant."""
+        manager = self.manager()
+        manager.save()
+
+        self.assertTrue(manager.touch())
+        self.assertFalse(manager.touch())
+
+        manager.checkpoint()
+
+        self.assertTrue(manager.touch())
+
+
+class TestCheckpoints(unittest.TestCase):
+    def setUp(self):
+        self.device = FakeDeviceState()
+        self.manager = SnapshotManager(self.device, checkpoints=2)
+        self.addCleanup(self.manager.close)
+
+    def test_claimed(self):
+        """Saving an unaltered device claims the latest checkpoint."""
+        checkpoint = self.manager.checkpoint()
+
+        self.assertEqual(self.manager.checkpoint(), checkpoint)
+        self.assertEqual(self.manager.save(), checkpoint)
+
+        self.manager.wait()
+
+        self.assertEqual(self.device.saved, [checkpoint])
+        self.assertFalse(self.manager.snapshots[checkpoint].checkpoint)
+        self.assertTrue(self.manager.snapshots[checkpoint].pinned)
+
+    def test_altered(self):
+        """Checkpoints of an altered device are not claimed."""
+        checkpoint = self.manager.checkpoint()
+        self.manager.touch()
+        name = self.manager.save()
+
+        self.manager.wait()
+
+        self.assertNotEqual(name, checkpoint)
+        self.assertEqual(self.device.saved, [checkpoint, name])
+
+    def test_pool(self):
+        """The oldest unclaimed checkpoints are discarded."""
+        checkpoints = []
+
+        for _ in range(3):
+            checkpoints.append(self.manager.checkpoint())
+            self.manager.touch()
+        self.manager.wait()
+
+        self.assertEqual(self.device.discarded,
+                         ['device-%s' % checkpoints[0]])
+        self.assertEqual(set(self.manager.snapshots), set(checkpoints[1:]))
+
+    def test_evicted_first(self):
+        """Unclaimed checkpoints are evicted before the snapshots."""
+        self.manager.budget = SnapshotBudget(3, None)
+        first = self.manager.save()
+        self.manager.touch()
+        second = self.manager.save()
+        self.manager.touch()
+        checkpoint = self.manager.checkpoint()
+        self.manager.touch()
+        self.manager.wait()
+
+        self.manager.save()
+        self.manager.wait()
+
+        self.assertNotIn(checkpoint, self.manager.snapshots)
+        self.assertIn(first, self.manager.snapshots)
+        self.assertIn(second, self.manager.snapshots)
+
+
+class TestLibvirtSize(unittest.TestCase):
+    def setUp(self):
+        domain = mock.Mock()
+        domain.XMLDesc.return_value = DOMAIN_XML
+        self.state = LibvirtState(lambda: domain, qemu_img='qemu-img')
+
+    def info(self, allocated, memory):
+        return json.dumps({
+            'actual-size': allocated,
+            'snapshots': [{'name': 'first', 'vm-state-size': memory},
+                          {'name': 'other', 'vm-state-size': 1}]}).encode()
+
+    def test_size(self):
+        """The memory or the disk growth, whichever is larger, is counted."""
+        with mock.patch('subprocess.check_output', side_effect=[
+                self.info(1000, 300), self.info(1900, 300),
+                self.info(2000, 300)]) as check_output:
+            self.assertEqual(self.state.size('first'), 300)
+            self.assertEqual(self.state.size('first'), 900)
+            self.assertEqual(self.state.size('first'), 300)
+
+        check_output.assert_called_with(
+            ('qemu-img', 'info', '-U', '--output=json',
+             '/images/system.qcow2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
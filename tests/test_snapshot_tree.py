@@ -0,0 +1,152 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from murphy.journal import Journal
+from murphy.agents.snapshots import SnapshotTree, SnapshotPolicy
+
+from fakes import make_chain, make_state
+
+
+class TestSnapshotPolicy(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = Journal(Path(self.directory.name))
+        self.nodes = make_chain(self.journal, 8)
+        self.policy = SnapshotPolicy(min_depth=2, min_spacing=2,
+                                     min_actions=2, max_snapshots=2)
+        self.tree = SnapshotTree(self.journal, self.policy)
+        self.addCleanup(self.directory.cleanup)
+
+    def test_depth(self):
+        """Shallow Nodes are not worth a snapshot."""
+        self.assertFalse(self.policy.worth(self.tree, self.nodes[1], 2))
+        self.assertTrue(self.policy.worth(self.tree, self.nodes[2], 2))
+
+    def test_actions(self):
+        """Nodes with few untried Actions are not worth a snapshot."""
+        self.assertFalse(self.policy.worth(self.tree, self.nodes[3], 1))
+
+    def test_spacing(self):
+        """Nodes close to a saved ancestor are not worth a snapshot."""
+        self.tree.save(self.nodes[2], 2)
+
+        self.assertFalse(self.policy.worth(self.tree, self.nodes[3], 2))
+        self.assertTrue(self.policy.worth(self.tree, self.nodes[4], 2))
+
+    def test_max_snapshots(self):
+        """No more than max_snapshots are taken."""
+        self.tree.save(self.nodes[2], 2)
+        self.tree.save(self.nodes[4], 2)
+
+        self.assertFalse(self.policy.worth(self.tree, self.nodes[6], 2))
+
+    def test_unreachable(self):
+        """Nodes not reachable from the initial one are not saved."""
+        orphan = self.journal.new_node(make_state(8))
+
+        self.assertFalse(self.policy.worth(self.tree, orphan, 2))
+
+
+class TestSnapshotTree(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = Journal(Path(self.directory.name))
+        self.nodes = make_chain(self.journal, 8)
+        self.tree = SnapshotTree(self.journal, SnapshotPolicy())
+        self.addCleanup(self.directory.cleanup)
+
+    def test_save(self):
+        """Saved Nodes are linked to their nearest saved ancestor."""
+        self.assertFalse(self.tree.save(self.nodes[0], 2))
+        self.assertTrue(self.tree.save(self.nodes[2], 2))
+        self.assertFalse(self.tree.save(self.nodes[2], 2))
+        self.assertTrue(self.tree.save(self.nodes[5], 2))
+
+        self.assertEqual(self.tree.nodes, [self.nodes[i] for i in (0, 2, 5)])
+        self.assertEqual(self.tree.parents, {self.nodes[2]: self.nodes[0],
+                                             self.nodes[5]: self.nodes[2]})
+        self.assertEqual(self.nodes[2].state.saves, 1)
+
+    def test_save_failure(self):
+        """Nodes whose state cannot be saved are not added."""
+        self.nodes[2].state.save = mock.Mock(side_effect=RuntimeError)
+
+        self.assertFalse(self.tree.save(self.nodes[2], 2))
+        self.assertEqual(self.tree.parents, {})
+
+    def test_nearest_ancestor(self):
+        self.tree.save(self.nodes[3], 2)
+
+        self.assertEqual(self.tree.nearest_ancestor(self.nodes[5]),
+                         (self.nodes[3], 2))
+        self.assertEqual(self.tree.nearest_ancestor(self.nodes[1]),
+                         (self.nodes[0], 1))
+        with self.assertRaises(LookupError):
+            self.tree.nearest_ancestor(self.nodes[6], max_distance=2)
+
+    def test_restore(self):
+        """The saved Node closest to the targets is restored."""
+        self.tree.save(self.nodes[2], 2)
+        self.tree.save(self.nodes[5], 2)
+
+        node, route = self.tree.restore([self.nodes[7], self.nodes[4]])
+
+        self.assertIs(node, self.nodes[5])
+        self.assertEqual([e.tail for e in route], [self.nodes[4]])
+        self.assertEqual(self.nodes[5].state.restores, 1)
+
+    def test_restore_initial(self):
+        """The initial Node is restored if no target is reachable."""
+        self.tree.save(self.nodes[2], 2)
+
+        node, route = self.tree.restore([])
+
+        self.assertIs(node, self.nodes[0])
+        self.assertEqual(route, ())
+        self.assertEqual(self.nodes[0].state.restores, 1)
+
+    def test_restore_evicted(self):
+        """Snapshots which cannot be restored are dropped."""
+        self.tree.save(self.nodes[2], 2)
+        self.tree.save(self.nodes[5], 2)
+        self.nodes[5].state.restore = mock.Mock(side_effect=RuntimeError)
+
+        node, route = self.tree.restore([self.nodes[6]])
+
+        self.assertIs(node, self.nodes[2])
+        self.assertEqual(len(route), 4)
+        self.assertEqual(self.tree.parents, {self.nodes[2]: self.nodes[0]})
+
+    def test_drop_relinks(self):
+        """The children of a dropped snapshot are linked to its parent."""
+        self.tree.save(self.nodes[2], 2)
+        self.tree.save(self.nodes[5], 2)
+        self.nodes[2].state.restore = mock.Mock(side_effect=RuntimeError)
+
+        self.tree.restore([self.nodes[3]])
+
+        self.assertEqual(self.tree.parents, {self.nodes[5]: self.nodes[0]})
+
+    def test_initial_failure(self):
+        """Failing to restore the initial Node is an error."""
+        self.nodes[0].state.restore = mock.Mock(side_effect=RuntimeError)
+
+        with self.assertRaises(RuntimeError):
+            self.tree.restore([self.nodes[1]])
+
+    def test_discard(self):
+        """Discarding keeps the initial snapshot only."""
+        self.tree.save(self.nodes[2], 2)
+        self.tree.save(self.nodes[5], 2)
+
+        self.tree.discard()
+
+        self.assertEqual(self.tree.nodes, [self.nodes[0]])
+        self.assertEqual([n.state.discards for n in self.nodes[:6]],
+                         [0, 0, 1, 0, 0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from PIL import Image
+
+from murphy.journal import Journal
+from murphy.journal.render import build_graph
+from murphy.journal.images import ImageStore, ThumbnailStore
+
+from fakes import make_chain, make_image
+
+
+class TestThumbnailStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.images = ImageStore(self.path.joinpath('images'))
+        self.thumbnails = ThumbnailStore(self.path.joinpath('thumbnails'))
+        self.addCleanup(self.directory.cleanup)
+
+    def test_downscaled(self):
+        """Thumbnails fit within the size keeping the aspect ratio."""
+        source = self.images.store(make_image('large', (1280, 720)))
+
+        with Image.open(str(self.thumbnails.thumbnail(source))) as image:
+            self.assertEqual(image.size, (320, 180))
+
+    def test_named_after_source(self):
+        """Thumbnails are named after their source image digest."""
+        source = self.images.store(make_image('source'))
+        thumbnail = self.thumbnails.thumbnail(source)
+
+        self.assertEqual(thumbnail.stem, source.stem)
+        self.assertIn('320x240', thumbnail.parts)
+
+    def test_cached(self):
+        """Each source image is scaled down once."""
+        source = self.images.store(make_image('cached', (640, 480)))
+        self.thumbnails.thumbnail(source)
+
+        with mock.patch.object(ThumbnailStore, 'write') as write:
+            self.thumbnails.thumbnail(source)
+
+        self.assertFalse(write.called)
+
+
+class TestGraphThumbnails(unittest.TestCase):
+    def test_graph(self):
+        """The graph shows the thumbnails and links the full images."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory)
+            journal = Journal(path)
+            nodes = make_chain(journal, 2)
+            journal.dump()
+
+            source = build_graph(nodes, path).source
+
+            for node in nodes:
+                image = node.image.relative_to(path).as_posix()
+                self.assertIn('images/thumbnails/320x240/%s/%s' % (
+                    node.image.parent.name, node.image.name), source)
+                self.assertIn('HREF="%s"' % image, source)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from PIL import Image
+
+from murphy.journal import Journal
+from murphy.journal.encoding import ENCODINGS
+from murphy.journal.tiles import render_tiles, max_level, tiles_count
+
+from fakes import FakeGraphviz, make_chain
+
+
+class TestTiles(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.journal = Journal(self.path)
+        self.nodes = make_chain(self.journal, 3)
+        self.graphviz = FakeGraphviz(size=(600, 400))
+
+        for module in ('render', 'tiles'):
+            patcher = mock.patch('murphy.journal.%s.run_graphviz' % module,
+                                 side_effect=self.graphviz)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+    def tile_size(self, level, column, row):
+        path = self.path.joinpath('journal_files', str(level),
+                                  '%d_%d.png' % (column, row))
+
+        with Image.open(str(path)) as tile:
+            return tile.size
+
+    def test_pyramid(self):
+        """Each level halves the one above down to a single pixel."""
+        render_tiles(self.nodes, self.path, tile_size=256)
+        levels = max_level(600, 400)
+        tiles = self.path.joinpath('journal_files')
+
+        self.assertEqual(levels, 10)
+        self.assertEqual(sorted(int(p.name) for p in tiles.iterdir()),
+                         list(range(levels + 1)))
+        self.assertEqual(len(list(tiles.joinpath('10').iterdir())), 3 * 2)
+        self.assertEqual(len(list(tiles.joinpath('9').iterdir())), 2 * 1)
+
+        self.assertEqual(self.tile_size(10, 2, 1), (600 - 512, 400 - 256))
+        self.assertEqual(self.tile_size(9, 1, 0), (300 - 256, 200))
+        self.assertEqual(self.tile_size(0, 0, 0), (1, 1))
+
+    def test_deepest_level_only(self):
+        """Graphviz lays out the graph once and renders the deepest
+        level strips only, the lower levels are downsampled.
+
+        """
+        render_tiles(self.nodes, self.path, tile_size=256)
+        strips = [c for c in self.graphviz.commands if c[0] == 'neato']
+
+        self.assertEqual(len(self.graphviz.commands), 1 + len(strips))
+        self.assertEqual(len(strips), tiles_count(400, 10, 10, 256))
+        self.assertEqual(list(self.path.glob('*.layout')), [])
+        self.assertEqual(list(self.path.rglob('strip*')), [])
+
+    def test_descriptor(self):
+        """The DZI descriptor and the HTML page are written."""
+        html_path = render_tiles(self.nodes, self.path, tile_size=256)
+        descriptor = self.path.joinpath('journal.dzi').read_text()
+
+        self.assertIn('TileSize="256"', descriptor)
+        self.assertIn('Width="600" Height="400"', descriptor)
+        self.assertIn('"levels": 10', html_path.read_text())
+
+    def test_unsupported_encoding(self):
+        """Tiles fall back to PNG for formats browsers cannot show."""
+        render_tiles(self.nodes, self.path, encoding=ENCODINGS['raw'],
+                     tile_size=256)
+
+        self.assertTrue(
+            self.path.joinpath('journal_files', '0', '0_0.png').exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
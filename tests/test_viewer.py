@@ -0,0 +1,55 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from murphy.journal import Journal, Metadata
+
+from fakes import make_chain, viewer_journal
+
+
+class TestViewer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.journal = Journal(self.path)
+        self.nodes = make_chain(self.journal, 3)
+        self.addCleanup(self.directory.cleanup)
+
+    def test_graph(self):
+        """The page describes the Nodes and Edges without Graphviz."""
+        with mock.patch('murphy.journal.render.run_graphviz') as graphviz:
+            html_path = self.journal.render(format='viewer')
+
+        journal = viewer_journal(html_path)
+
+        self.assertFalse(graphviz.called)
+        self.assertEqual([n['id'] for n in journal['nodes']], [0, 1, 2])
+        self.assertEqual(sorted((e['head'], e['tail'], e['action'])
+                                for e in journal['edges']),
+                         [(0, 1, 'Next'), (1, 0, 'Back'),
+                          (1, 2, 'Next'), (2, 1, 'Back')])
+
+    def test_images(self):
+        """Images and thumbnails are referenced relative to the Journal."""
+        journal = viewer_journal(self.journal.render(format='viewer'))
+
+        for node in journal['nodes']:
+            self.assertTrue(self.path.joinpath(node['image']).exists())
+            self.assertTrue(self.path.joinpath(node['thumbnail']).exists())
+        for edge in journal['edges']:
+            self.assertTrue(self.path.joinpath(edge['image']).exists())
+
+    def test_escaped(self):
+        """Metadata cannot close the script embedding the Journal."""
+        self.nodes[0].metadata.add(
+            Metadata('title', '</script><script>', Path('meta.png')))
+        html_path = self.journal.render(format='viewer')
+
+        self.assertNotIn('</script><script>', html_path.read_text())
+        self.assertEqual(viewer_journal(html_path)['nodes'][0]['metadata'],
+                         [{'title': 'title', 'text': '</script><script>'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+import sys
+import enum
+import types
+import unittest
+from unittest import mock
+from contextlib import contextmanager
+
+try:
+    import virtualbox.library
+except ImportError:  # the state is tested against fakes
+    class MachineState(enum.Enum):
+        powered_off = 1
+        saved = 2
+        aborted = 4
+        running = 5
+        stopping = 9
+
+    class SessionState(enum.Enum):
+        unlocked = 1
+        locked = 2
+
+    class AdditionsRunLevelType(enum.IntEnum):
+        none = 0
+        system = 1
+        userland = 2
+        desktop = 3
+
+    virtualbox = types.ModuleType('virtualbox')
+    virtualbox.library = types.ModuleType('virtualbox.library')
+    virtualbox.library.MachineState = MachineState
+    virtualbox.library.SessionState = SessionState
+    virtualbox.library.AdditionsRunLevelType = AdditionsRunLevelType
+    virtualbox.library_ext = types.SimpleNamespace(
+        machine=types.SimpleNamespace(IMachine=object))
+    sys.modules['virtualbox'] = virtualbox
+    sys.modules['virtualbox.library'] = virtualbox.library
+
+try:
+    import lxml.etree
+except ImportError:  # required by the VirtualBox load only
+    lxml = types.ModuleType('lxml')
+    lxml.etree = types.ModuleType('lxml.etree')
+    sys.modules['lxml'] = lxml
+    sys.modules['lxml.etree'] = lxml.etree
+
+from virtualbox.library import MachineState, SessionState
+from virtualbox.library import AdditionsRunLevelType
+
+from murphy.automation.virtualbox import state
+from murphy.automation.virtualbox.state import VirtualboxState, poll
+
+
+class Clock:
+    """Replaces the time module, sleeping advances the clock."""
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Sequence:
+    """Attribute stepping through its values at every read,
+    the last value is kept.
+
+    """
+    def __init__(self, *values):
+        self.values = list(values)
+
+    def __get__(self, instance, owner):
+        if len(self.values) > 1:
+            return self.values.pop(0)
+
+        return self.values[0]
+
+
+def fake_machine(states, session_states=(SessionState.unlocked, ),
+                 run_levels=(AdditionsRunLevelType.desktop, )):
+    """Machine whose state, session state and Guest Additions run level
+    step through the given values.
+
+    """
+    guest = type('Guest', (), {
+        'additions_run_level': Sequence(*run_levels)})()
+    machine = type('Machine', (), {
+        'state': Sequence(*states),
+        'session_state': Sequence(*session_states)})()
+    machine.session = mock.Mock()
+    machine.session.console.guest = guest
+    machine.launch_vm_process = mock.Mock()
+
+    @contextmanager
+    def create_session():
+        yield machine.session
+
+    machine.create_session = create_session
+
+    return machine
+
+
+class TestRestore(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(state, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def restore(self, machine, **kwargs):
+        device = VirtualboxState(lambda: machine, **kwargs)
+        device.restore('snapshot')
+
+        return device
+
+    def test_running(self):
+        """A running machine is powered down before restoring."""
+        machine = fake_machine(
+            (MachineState.running, MachineState.stopping,
+             MachineState.powered_off, MachineState.powered_off,
+             MachineState.running),
+            run_levels=(AdditionsRunLevelType.system,
+                        AdditionsRunLevelType.desktop))
+
+        device = self.restore(machine)
+
+        session = machine.session
+        self.assertTrue(session.console.power_down.called)
+        session.machine.find_snapshot.assert_called_with('snapshot')
+        session.machine.restore_snapshot.assert_called_with(
+            session.machine.find_snapshot.return_value)
+        self.assertTrue(machine.launch_vm_process.called)
+        self.assertEqual(device.restore_latency, self.clock.now)
+
+    def test_powered_off(self):
+        """A stopped machine is restored right away."""
+        machine = fake_machine((MachineState.saved, MachineState.saved,
+                                MachineState.running))
+
+        self.restore(machine)
+
+        self.assertFalse(machine.session.console.power_down.called)
+        self.assertEqual(self.clock.now, 0)
+
+    def test_polled(self):
+        """The restore lasts as long as the machine takes to be ready."""
+        machine = fake_machine(
+            (MachineState.powered_off, ) * 4 + (MachineState.running, ),
+            session_states=(SessionState.locked, SessionState.locked,
+                            SessionState.unlocked),
+            run_levels=(AdditionsRunLevelType.none,
+                        AdditionsRunLevelType.system,
+                        AdditionsRunLevelType.desktop))
+
+        device = self.restore(machine)
+
+        self.assertEqual(self.clock.sleeps, [state.POLL_INTERVAL] * 4)
+        self.assertEqual(device.restore_latency, self.clock.now)
+
+    def test_locked(self):
+        """A session never released is an error."""
+        machine = fake_machine((MachineState.powered_off, ),
+                               session_states=(SessionState.locked, ))
+
+        with self.assertRaises(RuntimeError):
+            self.restore(machine)
+
+        self.assertFalse(machine.launch_vm_process.called)
+
+    def test_not_running(self):
+        machine = fake_machine((MachineState.powered_off, ))
+
+        with self.assertRaises(RuntimeError):
+            self.restore(machine, ready_timeout=5)
+
+    def test_additions_timeout(self):
+        """The restore completes if the Guest Additions are not ready."""
+        machine = fake_machine(
+            (MachineState.powered_off, MachineState.powered_off,
+             MachineState.running),
+            run_levels=(AdditionsRunLevelType.userland, ))
+
+        with self.assertLogs('murphy.automation.virtualbox.state',
+                             level='WARNING'):
+            device = self.restore(machine, ready_timeout=5)
+
+        self.assertGreater(device.restore_latency, 5)
+
+
+class TestPoll(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(state, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_ready(self):
+        values = iter((False, False, True))
+
+        self.assertTrue(poll(lambda: next(values), 10, interval=1))
+        self.assertEqual(self.clock.sleeps, [1, 1])
+
+    def test_timeout(self):
+        self.assertFalse(poll(lambda: False, 3, interval=1))
+        self.assertEqual(self.clock.now, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from murphy.journal import Journal
+from murphy.journal.writer import JournalWriter
+
+from fakes import FakeInterpreter, make_chain, make_state
+
+
+class TestJournalWriter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.journal = Journal(self.path)
+        self.journal.writer = JournalWriter(self.path)
+        self.journal.writer.start()
+        self.addCleanup(self.directory.cleanup)
+        self.addCleanup(self.journal.writer.close)
+
+    def test_background_writes(self):
+        """Nodes and Edges are written as they are added."""
+        nodes = make_chain(self.journal, 3)
+        self.journal.writer.flush()
+
+        self.assertTrue(all(n.path.joinpath('state.json').exists()
+                            for n in nodes))
+        self.assertTrue(all(e.path.joinpath('edge.json').exists()
+                            for n in nodes for e in n.edges))
+
+        loaded = Journal(self.path)
+        loaded.load(FakeInterpreter())
+        self.assertEqual(len(loaded.nodes), 3)
+        self.assertEqual(sum(len(n.edges) for n in loaded.nodes), 4)
+
+    def test_image_paths(self):
+        """The stored image paths are recorded once written."""
+        node = self.journal.new_node(make_state(0))
+        self.journal.writer.flush()
+
+        with node.path.joinpath('state.json').open() as state_file:
+            self.assertEqual(json.load(state_file)['window'],
+                             str(node.image))
+
+    def test_sync(self):
+        """A sync flush synchronizes the files written since the last one."""
+        with mock.patch('murphy.journal.writer.fsync') as fsync:
+            self.journal.new_node(make_state(0))
+            self.journal.writer.flush()
+            self.journal.writer.flush(sync=True)
+
+            self.assertEqual(fsync.call_count, 0)
+
+            self.journal.new_node(make_state(1))
+            self.journal.writer.flush(sync=True)
+
+            # the state and the new image of the second Node
+            self.assertEqual(fsync.call_count, 2)
+
+    def test_error(self):
+        """Writing errors are raised by the next flush only."""
+        with mock.patch('murphy.journal.writer.write_node',
+                        side_effect=OSError('disk full')):
+            self.journal.new_node(make_state(0))
+
+            with self.assertRaises(RuntimeError):
+                self.journal.writer.flush()
+
+        self.journal.writer.flush()
+
+    def test_close(self):
+        """Closing flushes the queue, closing again does nothing."""
+        writer = self.journal.writer
+        node = self.journal.new_node(make_state(0))
+        writer.close()
+
+        self.assertFalse(writer.running)
+        self.assertTrue(node.path.joinpath('state.json').exists())
+        writer.close()
+
+    def test_not_started(self):
+        """Closing a writer never started does nothing,
+        flushing it raises RuntimeError.
+
+        """
+        writer = JournalWriter(self.path)
+        writer.close()
+
+        with self.assertRaises(RuntimeError):
+            writer.flush()
+
+
+if __name__ == '__main__':
+    unittest.main()